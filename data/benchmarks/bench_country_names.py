@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark for country name standardization
+
+Times standardize_country_names on synthetic country columns of increasing size
+and reports the per-row cost, which should stay flat as the row count grows.
+Every distinct name is first resolved in a warm-up run, reported separately and
+kept out of the per-row figures, since fuzzy resolution of unknown names is a
+one-off cost that the in-memory memo amortizes. The stage cache is disabled, so
+data/.cache is neither read nor written.
+The previous per-variant .loc implementation can be timed alongside for reference.
+
+Usage: python bench_country_names.py [--sizes 10000 100000 ...] [--legacy-max ROWS]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import transform_data  # noqa: E402
+from transform_data import get_country_mappings, standardize_country_names  # noqa: E402
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+
+def build_name_pool():
+    """Collect standard names, known variants and messy spellings of both"""
+    name_mapping, country_codes = get_country_mappings()
+    pool = list(country_codes) + list(name_mapping)
+    messy = [f"{name}*" for name in pool[::3]]
+    messy += [f" {name.upper()} " for name in pool[1::5]]
+    unknown = ["Atlantis", "Utopia*", "Freedonia"]
+    return np.array(pool + messy + unknown, dtype=object)
+
+
+def legacy_standardize(df, country_col="country"):
+    """Reference copy of the previous per-variant .loc implementation"""
+    name_mapping, country_codes = get_country_mappings()
+    df[country_col] = df[country_col].astype(str).str.replace(r"\*$", "", regex=True)
+    for variant, standard in name_mapping.items():
+        df.loc[df[country_col] == variant, country_col] = standard
+    df["country_code"] = df[country_col].map(country_codes)
+    return df
+
+
+def time_call(func, df):
+    """Run func on a copy of df with stdout silenced and return elapsed seconds"""
+    df = df.copy()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(df)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--legacy-max",
+        type=int,
+        default=1_000_000,
+        help="Largest row count to also time with the legacy implementation (0 disables)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Keep the persistent resolution memo out of the measurements
+    transform_data.CACHE_ENABLED = False
+
+    rng = np.random.default_rng(args.seed)
+    pool = build_name_pool()
+
+    warm_up = time_call(standardize_country_names, pd.DataFrame({"country": pool}))
+    print(f"Warm-up: {len(pool):,} distinct names resolved in {warm_up:.3f} s")
+
+    print(f"{'rows':>12} {'seconds':>10} {'ns/row':>10} {'legacy ns/row':>14}")
+    for size in args.sizes:
+        df = pd.DataFrame({"country": pool[rng.integers(0, len(pool), size)]})
+        elapsed = time_call(standardize_country_names, df)
+        legacy = ""
+        if size <= args.legacy_max:
+            legacy = f"{time_call(legacy_standardize, df) / size * 1e9:14.1f}"
+        print(f"{size:>12,} {elapsed:>10.3f} {elapsed / size * 1e9:>10.1f} {legacy}")
+
+
+if __name__ == "__main__":
+    main()
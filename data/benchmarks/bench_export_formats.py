@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the happiness_data export formats
+
+Compares the records export (to_json(orient="records")) with the columnar export
+(encode_columnar) on size, compressed size and parse time, and checks that the
+columnar payload decodes back to exactly the same records. When Node.js is
+available, parse and decode time is also measured in JavaScript, with a port of
+decode_columnar. Times are medians over the repeats, after as many warm-up runs.
+
+Usage: python bench_export_formats.py [--repeat N]
+"""
+
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from transform_data import (  # noqa: E402
+    decode_columnar,
+    encode_columnar,
+    merge_datasets,
+    round_for_export,
+)
+
+# JavaScript port of decode_columnar, timed against JSON.parse of the records
+NODE_SCRIPT = """
+import { readFileSync } from 'node:fs';
+const decodeColumn = (column) => {
+  if (column.encoding === 'dictionary') {
+    const { dictionary } = column;
+    return column.codes.map((code) => (code >= 0 ? dictionary[code] : null));
+  }
+  if (column.encoding === 'scaled') {
+    const { scale } = column;
+    return column.values.map((value) => (value === null ? null : value / scale));
+  }
+  return column.values;
+};
+const decodeColumnar = (payload) => {
+  const names = payload.columns.map((column) => column.name);
+  const columns = payload.columns.map(decodeColumn);
+  const rows = new Array(payload.length);
+  for (let i = 0; i < payload.length; i += 1) {
+    const row = {};
+    names.forEach((name, j) => { row[name] = columns[j][i]; });
+    rows[i] = row;
+  }
+  return rows;
+};
+const [recordsPath, columnarPath, repeat] = process.argv.slice(1);
+const recordsText = readFileSync(recordsPath, 'utf8');
+const columnarText = readFileSync(columnarPath, 'utf8');
+const median = (fn) => {
+  const timings = [];
+  for (let i = 0; i < 2 * Number(repeat); i += 1) {
+    const start = performance.now();
+    fn();
+    timings.push(performance.now() - start);
+  }
+  const measured = timings.slice(Number(repeat)).sort((a, b) => a - b);
+  return measured[Math.floor(measured.length / 2)];
+};
+console.log(JSON.stringify({
+  records: median(() => JSON.parse(recordsText)),
+  columnar: median(() => decodeColumnar(JSON.parse(columnarText))),
+}));
+"""
+
+
+def median_time(func, repeat):
+    """Return the median of `repeat` runs of func, after as many warm-up runs, in ms"""
+    for _ in range(repeat):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def node_timings(records_text, columnar_text, repeat):
+    """Time JSON.parse (+ decodeColumnar) in Node.js, or return None if unavailable"""
+    if shutil.which("node") is None:
+        return None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        records_path = Path(tmp) / "records.json"
+        columnar_path = Path(tmp) / "columnar.json"
+        records_path.write_text(records_text)
+        columnar_path.write_text(columnar_text)
+        result = subprocess.run(
+            [
+                "node",
+                "--input-type=module",
+                "-e",
+                NODE_SCRIPT,
+                "--",
+                str(records_path),
+                str(columnar_path),
+                str(repeat),
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = round_for_export(merge_datasets())
+
+    records_text = data.to_json(orient="records")
+    columnar_text = json.dumps(encode_columnar(data), separators=(",", ":"))
+
+    decoded = decode_columnar(json.loads(columnar_text))
+    if decoded != json.loads(records_text):
+        raise SystemExit("Columnar payload does not decode to the records export")
+
+    node = node_timings(records_text, columnar_text, args.repeat)
+    rows = [
+        ("records", records_text, lambda: json.loads(records_text)),
+        (
+            "columnar",
+            columnar_text,
+            lambda: decode_columnar(json.loads(columnar_text)),
+        ),
+    ]
+
+    print(f"{len(data)} rows, {len(data.columns)} columns; decoded payload matches records")
+    print(f"{'format':<10} {'bytes':>10} {'gzip bytes':>11} {'py parse ms':>12} {'node parse ms':>14}")
+    for name, text, parse in rows:
+        gzipped = len(gzip.compress(text.encode(), compresslevel=9))
+        node_ms = f"{node[name]:14.2f}" if node else f"{'n/a':>14}"
+        print(
+            f"{name:<10} {len(text.encode()):>10,} {gzipped:>11,} "
+            f"{median_time(parse, args.repeat):>12.2f} {node_ms}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Memory report for the merged panel schema
+
+Builds the merged panel from synthetic inputs (see bench_pipeline.py) at each scale
+and compares memory_usage(deep=True) of the compact schema produced by
+merge_datasets with the legacy one (object strings, float64 factors, int64 year),
+per column and in total.
+
+Usage: python bench_memory.py [--scale COUNTRIES YEARS ROWS ...] [--seed N]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_pipeline import generate_inputs, pipeline_paths  # noqa: E402
+from transform_data import (  # noqa: E402
+    CATEGORICAL_COLUMNS,
+    FACTOR_COLUMNS,
+    merge_datasets,
+)
+
+DEFAULT_SCALES = [(1, 1, 1), (4, 3, 4), (16, 3, 4)]
+
+
+def legacy_schema(panel):
+    """The panel with the dtypes merge_datasets produced before compaction"""
+    legacy = panel.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in legacy.columns:
+            legacy[col] = legacy[col].astype(object)
+    for col in FACTOR_COLUMNS:
+        if col in legacy.columns:
+            legacy[col] = legacy[col].astype("float64")
+    legacy["year"] = legacy["year"].astype("int64")
+    return legacy
+
+
+def memory_report(scale, seed):
+    """
+    Merge the synthetic inputs for one scale and measure both schemas.
+
+    Returns:
+        tuple: (panel rows, DataFrame of bytes per column for each schema)
+    """
+    with tempfile.TemporaryDirectory(prefix="happiscope-bench-") as tmp:
+        dirs, _ = generate_inputs(Path(tmp), scale, seed)
+        with pipeline_paths(dirs), contextlib.redirect_stdout(io.StringIO()):
+            panel = merge_datasets()
+
+    usage = pd.DataFrame(
+        {
+            "legacy": legacy_schema(panel).memory_usage(deep=True, index=False),
+            "compact": panel.memory_usage(deep=True, index=False),
+        }
+    )
+    usage["dtype"] = panel.dtypes.astype(str)
+    return len(panel), usage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--scale",
+        type=float,
+        nargs=3,
+        action="append",
+        metavar=("COUNTRIES", "YEARS", "ROWS"),
+        help="Scale factors relative to the bundled inputs; may be repeated",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scales = [tuple(scale) for scale in args.scale] if args.scale else DEFAULT_SCALES
+
+    for scale in scales:
+        rows, usage = memory_report(scale, args.seed)
+        label = " x ".join(f"{factor:g}" for factor in scale)
+        print(f"\nScale {label}: {rows:,} panel rows")
+        print(f"{'column':<22} {'compact dtype':<14} {'legacy KB':>10} {'compact KB':>11}")
+        for column, row in usage.iterrows():
+            print(
+                f"{column:<22} {row['dtype']:<14} {row['legacy'] / 1024:>10.1f} "
+                f"{row['compact'] / 1024:>11.1f}"
+            )
+        legacy, compact = usage["legacy"].sum(), usage["compact"].sum()
+        print(
+            f"{'total':<37} {legacy / 1024:>10.1f} {compact / 1024:>11.1f} "
+            f"({compact / legacy:.0%} of legacy)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for the transform pipeline on synthetic inputs
+
+Generates happiness, HDI and population inputs in the shapes of the bundled files
+(the same headers and per-year column-name variants, alias and starred country
+spellings, HDI aggregate rows without a country code, population region rows) and
+times standardize_country_names, handle_missing_happiness_scores, merge_datasets,
+export_data and evaluate_validation_rules at each scale. A scale multiplies the
+bundled shape by three factors:
+
+  countries  country count; units beyond the known countries are generated as
+             subnational regions of them (no ISO code, like unmapped names)
+  years      year span, ending at the last bundled year (12 approximates monthly data)
+  rows       out-of-scope rows the readers must discard: HDI aggregates and
+             history before the first year, population region rows
+
+Inputs are seeded and the results file has a fixed layout with no timestamps, so
+two runs differ only in their timings and can be diffed directly.
+
+Usage: python bench_pipeline.py [--scale COUNTRIES YEARS ROWS ...] [--repeat N]
+                                [--output PATH] [--seed N]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import transform_data  # noqa: E402
+from transform_data import (  # noqa: E402
+    discover_years,
+    evaluate_validation_rules,
+    export_data,
+    get_country_mappings,
+    handle_missing_happiness_scores,
+    load_happiness_reports,
+    merge_datasets,
+    standardize_country_names,
+)
+
+SOURCES = ("happiness", "hdi", "population")
+DEFAULT_SCALES = [(1, 1, 1), (4, 1, 1), (1, 3, 1), (4, 3, 4), (16, 3, 4)]
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "pipeline_results.json"
+
+# Shape of the bundled inputs
+BASE_COUNTRIES = 150
+BASE_YEARS = 10
+LAST_YEAR = 2024
+HDI_HISTORY_YEARS = 25
+HDI_LAG_YEARS = 2
+MISSING_REPORT_RATE = 0.08
+ALIAS_RATE = 0.3
+STARRED_RATE = 0.05
+
+CONTINENTS = ["Africa", "Asia", "Australia", "Europe", "North America", "South America"]
+
+HDI_AGGREGATES = [
+    ("World", "OWID_WRL"),
+    ("Africa", ""),
+    ("Asia", ""),
+    ("Europe", ""),
+    ("North America", ""),
+    ("Oceania", ""),
+    ("South America", ""),
+    ("European Union (27)", ""),
+    ("High-income countries", ""),
+    ("Low-income countries", ""),
+    ("Lower-middle-income countries", ""),
+    ("Upper-middle-income countries", ""),
+    ("Very high human development (UNDP)", ""),
+    ("High human development (UNDP)", ""),
+    ("Medium human development (UNDP)", ""),
+    ("Low human development (UNDP)", ""),
+    ("Arab States (UNDP)", ""),
+    ("East Asia and the Pacific (UNDP)", ""),
+    ("Europe and Central Asia (UNDP)", ""),
+    ("Latin America and the Caribbean (UNDP)", ""),
+    ("South Asia (UNDP)", ""),
+    ("Sub-Saharan Africa (UNDP)", ""),
+]
+
+POPULATION_REGIONS = [
+    ("World", "World"),
+    ("Africa", "Region"),
+    ("Asia", "Region"),
+    ("Europe", "Region"),
+    ("Latin America and the Caribbean", "Region"),
+    ("Northern America", "Region"),
+    ("Oceania", "Region"),
+    ("Sub-Saharan Africa", "SDG region"),
+    ("Eastern Europe", "Subregion"),
+    ("South-Eastern Asia", "Subregion"),
+    ("High-income countries", "Income Group"),
+    ("Low-income countries", "Income Group"),
+]
+
+
+def bundled_happiness_headers():
+    """Header variants of the bundled happiness reports, in year order"""
+    headers = []
+    for year in discover_years(transform_data.HAPPINESS_DIR, "{year}_report.csv"):
+        path = transform_data.HAPPINESS_DIR / f"{year}_report.csv"
+        headers.append(list(pd.read_csv(path, nrows=0).columns))
+    return headers
+
+
+def build_countries(rng, factor):
+    """
+    Pick the synthetic country list for a countries factor.
+
+    Returns:
+        DataFrame with the standard name, its alias spellings and a fixed continent
+    """
+    name_mapping, country_codes = get_country_mappings()
+    aliases = {}
+    for variant, standard in name_mapping.items():
+        aliases.setdefault(standard, []).append(variant)
+
+    standard_names = np.array(list(country_codes), dtype=object)
+    known = rng.choice(
+        standard_names, size=min(BASE_COUNTRIES, len(standard_names)), replace=False
+    )
+
+    count = max(1, round(BASE_COUNTRIES * factor))
+    names = list(known[:count])
+    for index in range(count - len(names)):
+        names.append(f"{known[index % len(known)]} Region {index // len(known) + 1}")
+
+    return pd.DataFrame(
+        {
+            "name": names,
+            "aliases": [aliases.get(name, []) for name in names],
+            "continent": rng.choice(CONTINENTS, size=len(names)),
+            "loc_id": np.arange(len(names)) + 4,
+        }
+    )
+
+
+def spell_names(rng, countries):
+    """Spell each country as it might appear in one input file"""
+    names = countries["name"].to_numpy(dtype=object).copy()
+    use_alias = rng.random(len(names)) < ALIAS_RATE
+    for i in np.flatnonzero(use_alias):
+        options = countries["aliases"].iat[i]
+        if options:
+            names[i] = options[rng.integers(len(options))]
+    starred = rng.random(len(names)) < STARRED_RATE
+    names[starred] = [f"{name}*" for name in names[starred]]
+    return names
+
+
+def write_happiness_reports(rng, countries, years, directory):
+    """Write one report per year, cycling through the bundled header variants"""
+    headers = bundled_happiness_headers()
+    rows = 0
+    for offset, year in enumerate(years):
+        header = headers[offset % len(headers)]
+        present = rng.random(len(countries)) >= MISSING_REPORT_RATE
+        subset = countries[present]
+        report = {}
+        for column in header:
+            if column == "country":
+                report[column] = spell_names(rng, subset)
+            elif column == "continent":
+                report[column] = subset["continent"].to_numpy()
+            elif column == "happiness_score":
+                report[column] = rng.uniform(2.5, 8.0, len(subset))
+            else:
+                report[column] = rng.uniform(0.0, 2.0, len(subset))
+        frame = pd.DataFrame(report).sort_values(
+            "happiness_score", ascending=False, ignore_index=True
+        )
+        frame.to_csv(directory / f"{year}_report.csv", index=False)
+        rows += len(frame)
+    return rows
+
+
+def write_hdi_file(rng, countries, years, rows_factor, directory):
+    """Write the long-format HDI file, including aggregate entities and history"""
+    _, country_codes = get_country_mappings()
+    history = round(HDI_HISTORY_YEARS * rows_factor)
+    hdi_years = np.arange(years[0] - history, years[-1] - HDI_LAG_YEARS + 1)
+
+    aggregates = []
+    for copy in range(max(1, round(rows_factor))):
+        suffix = f" {copy + 1}" if copy else ""
+        aggregates += [(name + suffix, code) for name, code in HDI_AGGREGATES]
+
+    country_hdi_codes = countries["name"].map(country_codes).fillna("")
+    entities = list(zip(spell_names(rng, countries), country_hdi_codes))
+    entities += aggregates
+    entities.sort()
+
+    names = np.repeat([name for name, _ in entities], len(hdi_years))
+    codes = np.repeat([code for _, code in entities], len(hdi_years))
+    frame = pd.DataFrame(
+        {
+            "Entity": names,
+            "Code": codes,
+            "Year": np.tile(hdi_years, len(entities)),
+            "Human Development Index": rng.uniform(0.3, 0.96, len(names)).round(3),
+        }
+    )
+    frame.to_csv(directory / "human-development-index.csv", index=False)
+    return len(frame)
+
+
+def write_population_files(rng, countries, years, rows_factor, directory):
+    """Write one UN population file per year, with region rows mixed in"""
+    regions = []
+    for copy in range(max(1, round(rows_factor))):
+        suffix = f" {copy + 1}" if copy else ""
+        regions += [(name + suffix, kind) for name, kind in POPULATION_REGIONS]
+
+    rows = 0
+    for year in years:
+        pop_male = rng.uniform(50, 700_000, len(countries)).round(3)
+        pop_female = (pop_male * rng.uniform(0.9, 1.1, len(countries))).round(3)
+        frame = pd.DataFrame(
+            {
+                "LocID": countries["loc_id"].to_numpy(),
+                "LocTypeName": "Country/Area",
+                "ParentID": rng.choice([910.0, 913.0, 920.0, 5501.0], len(countries)),
+                "Location": spell_names(rng, countries),
+                "PopMale": pop_male,
+                "PopFemale": pop_female,
+                "PopTotal": (pop_male + pop_female).round(3),
+                "PopDensity": rng.uniform(2, 1500, len(countries)).round(3),
+            }
+        )
+        region_frame = pd.DataFrame(
+            {
+                "LocID": 900 + np.arange(len(regions)),
+                "LocTypeName": [kind for _, kind in regions],
+                "ParentID": 1.0,
+                "Location": [name for name, _ in regions],
+                "PopMale": rng.uniform(1e5, 4e6, len(regions)).round(3),
+                "PopFemale": rng.uniform(1e5, 4e6, len(regions)).round(3),
+                "PopTotal": rng.uniform(2e5, 8e6, len(regions)).round(3),
+                "PopDensity": rng.uniform(2, 500, len(regions)).round(3),
+            }
+        )
+        frame = pd.concat([frame, region_frame], ignore_index=True)
+        frame.to_csv(directory / f"population_{year}.csv", index=False)
+        rows += len(frame)
+    return rows
+
+
+def generate_inputs(root, scale, seed):
+    """
+    Generate a full synthetic input tree under root for one scale.
+
+    Returns:
+        dict: Row counts written per source
+    """
+    countries_factor, years_factor, rows_factor = scale
+    rng = np.random.default_rng(seed)
+    countries = build_countries(rng, countries_factor)
+    span = max(1, round(BASE_YEARS * years_factor))
+    years = list(range(LAST_YEAR - span + 1, LAST_YEAR + 1))
+
+    dirs = {name: root / name for name in ("happiness", "hdi", "population", "output")}
+    for directory in dirs.values():
+        directory.mkdir(parents=True)
+
+    return dirs, {
+        "countries": len(countries),
+        "years": len(years),
+        "happiness_rows": write_happiness_reports(
+            rng, countries, years, dirs["happiness"]
+        ),
+        "hdi_rows": write_hdi_file(rng, countries, years, rows_factor, dirs["hdi"]),
+        "population_rows": write_population_files(
+            rng, countries, years, rows_factor, dirs["population"]
+        ),
+    }
+
+
+@contextlib.contextmanager
+def pipeline_paths(dirs):
+    """Point the pipeline at a generated input tree, with the stage cache off"""
+    names = (
+        "HAPPINESS_DIR",
+        "HDI_DIR",
+        "POPULATION_DIR",
+        "OUTPUT_DIR",
+        "SHARD_DIR",
+        "CACHE_ENABLED",
+    )
+    saved = {name: getattr(transform_data, name) for name in names}
+    transform_data.HAPPINESS_DIR = dirs["happiness"]
+    transform_data.HDI_DIR = dirs["hdi"]
+    transform_data.POPULATION_DIR = dirs["population"]
+    transform_data.OUTPUT_DIR = dirs["output"]
+    transform_data.SHARD_DIR = dirs["output"] / "shards"
+    transform_data.CACHE_ENABLED = False
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(transform_data, name, value)
+
+
+def best_time(func, make_args, repeat):
+    """Best of repeat timed calls with stdout silenced; argument setup is not timed"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        args = make_args()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func(*args)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def timing(seconds, rows):
+    """Timing entry with a per-row cost"""
+    return {
+        "seconds": round(seconds, 4),
+        "rows": rows,
+        "ns_per_row": round(seconds / rows * 1e9, 1) if rows else None,
+    }
+
+
+def read_names(path, column):
+    """Read the raw country-name column of one input file as a 'country' frame"""
+    return pd.read_csv(path, usecols=[column]).rename(columns={column: "country"})
+
+
+def run_scale(scale, repeat, seed):
+    """Generate inputs for one scale and time each pipeline function on them"""
+    with tempfile.TemporaryDirectory(prefix="happiscope-bench-") as tmp:
+        dirs, inputs = generate_inputs(Path(tmp), scale, seed)
+        with pipeline_paths(dirs):
+            names = pd.concat(
+                [
+                    read_names(path, "country")
+                    for path in sorted(dirs["happiness"].glob("*_report.csv"))
+                ]
+                + [read_names(dirs["hdi"] / "human-development-index.csv", "Entity")]
+                + [
+                    read_names(path, "Location")
+                    for path in sorted(dirs["population"].glob("population_*.csv"))
+                ],
+                ignore_index=True,
+            )
+            standardize_seconds, _ = best_time(
+                standardize_country_names, lambda: (names.copy(),), repeat
+            )
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                reports = load_happiness_reports(
+                    discover_years(dirs["happiness"], "{year}_report.csv")
+                )
+            missing_seconds, panel = best_time(
+                handle_missing_happiness_scores, lambda: (reports.copy(),), repeat
+            )
+
+            merge_seconds, merged = best_time(merge_datasets, tuple, repeat)
+            export_seconds, _ = best_time(export_data, lambda: (merged,), repeat)
+            validate_seconds, _ = best_time(
+                evaluate_validation_rules, lambda: (merged,), repeat
+            )
+            output_bytes = sum(
+                path.stat().st_size
+                for path in dirs["output"].rglob("*")
+                if path.is_file()
+            )
+
+    return {
+        "scale": dict(zip(("countries", "years", "rows"), scale)),
+        "inputs": inputs,
+        "outputs": {"panel_rows": len(merged), "export_bytes": output_bytes},
+        "timings": {
+            "standardize_country_names": timing(standardize_seconds, len(names)),
+            "handle_missing_happiness_scores": timing(missing_seconds, len(panel)),
+            "merge_datasets": timing(
+                merge_seconds,
+                sum(inputs[f"{source}_rows"] for source in SOURCES),
+            ),
+            "export_data": timing(export_seconds, len(merged)),
+            "evaluate_validation_rules": timing(validate_seconds, len(merged)),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--scale",
+        type=float,
+        nargs=3,
+        action="append",
+        metavar=("COUNTRIES", "YEARS", "ROWS"),
+        help="Scale factors relative to the bundled inputs; may be repeated",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    scales = [tuple(scale) for scale in args.scale] if args.scale else DEFAULT_SCALES
+
+    results = []
+    print(
+        f"{'scale (c x y x r)':<18} {'panel rows':>11} {'standardize':>12} "
+        f"{'missing':>9} {'merge':>9} {'export':>9} {'validate':>9}"
+    )
+    for scale in scales:
+        result = run_scale(scale, args.repeat, args.seed)
+        results.append(result)
+        timings = result["timings"]
+        label = " x ".join(f"{factor:g}" for factor in scale)
+        print(
+            f"{label:<18} {result['outputs']['panel_rows']:>11,} "
+            f"{timings['standardize_country_names']['seconds']:>12.3f} "
+            f"{timings['handle_missing_happiness_scores']['seconds']:>9.3f} "
+            f"{timings['merge_datasets']['seconds']:>9.3f} "
+            f"{timings['export_data']['seconds']:>9.3f} "
+            f"{timings['evaluate_validation_rules']['seconds']:>9.3f}"
+        )
+
+    report = {
+        "benchmark": "pipeline",
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+        },
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
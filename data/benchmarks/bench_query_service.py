@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for the query service
+
+Starts query_service on a free local port and drives it with concurrent keep-alive
+clients issuing a seeded mix of recurring /data queries (year, country code and
+continent filters with and without column projection). Reports throughput and latency
+percentiles, first with the response cache disabled and then with it enabled, and
+exits non-zero if the cached p95 latency misses the target.
+
+Usage: python bench_query_service.py [--clients N] [--requests N] [--distinct N]
+                                     [--target-p95-ms MS]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from query_service import load_service_state, start_service  # noqa: E402
+from transform_data import merge_datasets, round_for_export  # noqa: E402
+
+PROJECTIONS = [
+    "",
+    "country,year,score",
+    "country,country_code,year,score,hdi,population",
+    "country,year,gdp_per_capita,social_support,life_expectancy,freedom",
+]
+
+
+def query_mix(state, count, distinct, seed):
+    """
+    Seeded list of /data request targets over the values in the dataset.
+
+    Requests are drawn from a pool of distinct queries, so that as in real dashboard
+    traffic the same queries recur and the response cache can serve them.
+    """
+    rng = random.Random(seed)
+    years = sorted(state["indexes"]["year"])
+    codes = sorted(state["indexes"]["code"])
+    continents = sorted(state["indexes"]["continent"])
+
+    pool = []
+    for _ in range(distinct):
+        params = {}
+        kind = rng.randrange(4)
+        if kind in (0, 3):
+            params["year"] = ",".join(rng.sample(years, rng.randint(1, 3)))
+        if kind in (1, 3):
+            params["code"] = ",".join(rng.sample(codes, rng.randint(1, 8)))
+        if kind == 2:
+            params["continent"] = rng.choice(continents)
+        projection = rng.choice(PROJECTIONS)
+        if projection:
+            params["columns"] = projection
+        pool.append("/data?" + urlencode(params, safe=","))
+    return [rng.choice(pool) for _ in range(count)]
+
+
+async def run_client(port, targets, latencies):
+    """Issue requests sequentially over one keep-alive connection"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for target in targets:
+        start = time.perf_counter()
+        writer.write(
+            f"GET {target} HTTP/1.1\r\nHost: localhost\r\n"
+            "Accept-Encoding: gzip\r\n\r\n".encode()
+        )
+        await writer.drain()
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in head.decode("latin-1").split("\r\n"):
+            name, _, value = line.partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        await reader.readexactly(length)
+        if not head.startswith(b"HTTP/1.1 200"):
+            status = head.splitlines()[0].decode()
+            raise SystemExit(f"Unexpected response for {target}: {status}")
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_load(data, cache_size, clients, requests, distinct, seed):
+    """Serve data with the given cache size and measure latencies under load"""
+    state = load_service_state(data, cache_size=cache_size)
+    server = await start_service(state, port=0)
+    port = server.sockets[0].getsockname()[1]
+    targets = query_mix(state, clients * requests, distinct, seed)
+
+    latencies = []
+    start = time.perf_counter()
+    async with server:
+        await asyncio.gather(
+            *(
+                run_client(port, targets[i::clients], latencies)
+                for i in range(clients)
+            )
+        )
+        elapsed = time.perf_counter() - start
+
+        # Let the server finish closing the connections the clients closed
+        await asyncio.gather(*state["connections"])
+
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50": np.percentile(ms, 50),
+        "p95": np.percentile(ms, 95),
+        "p99": np.percentile(ms, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=100, help="per client")
+    parser.add_argument(
+        "--distinct", type=int, default=200, help="distinct queries in the mix"
+    )
+    parser.add_argument("--target-p95-ms", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = round_for_export(merge_datasets())
+
+    print(f"{args.clients} clients x {args.requests} requests, {len(data)} rows")
+    print(f"{'cache':<10} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, cache_size in (("disabled", 0), ("enabled", 4096)):
+        result = asyncio.run(
+            run_load(
+                data,
+                cache_size,
+                args.clients,
+                args.requests,
+                args.distinct,
+                args.seed,
+            )
+        )
+        print(
+            f"{label:<10} {result['throughput']:>9.0f} {result['p50']:>8.2f} "
+            f"{result['p95']:>8.2f} {result['p99']:>8.2f}"
+        )
+
+    if result["p95"] > args.target_p95_ms:
+        raise SystemExit(
+            f"p95 latency {result['p95']:.2f} ms exceeds the "
+            f"{args.target_p95_ms:.0f} ms target"
+        )
+    print(f"p95 latency is within the {args.target_p95_ms:.0f} ms target")
+
+
+if __name__ == "__main__":
+    main()
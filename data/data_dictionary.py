@@ -1,7 +1,3 @@
-import pandas as pd
-import json
-from pathlib import Path
-
 """
 HappiScope Data Dictionary
 
@@ -9,6 +5,11 @@ This document provides definitions for all standardized fields used in the Happi
 It explains the meaning, range, source, and transformation process for each data field.
 """
 
+import json
+from pathlib import Path
+
+OUTPUT_DIR = Path(__file__).parent.parent / "docs" / "src" / "data"
+
 # Main dataset fields
 FIELD_DEFINITIONS = {
     # Core Happiness Report fields
@@ -37,6 +38,39 @@ FIELD_DEFINITIONS = {
     "population_category": "Categorization based on population size: Very Small, Small, Medium, Large, Very Large",
     # Derived metrics
     "weighted_score": "Happiness score weighted by population size",
+    # Data quality
+    "imputed": "Bitmask of the fields whose value was filled in from other years of the same country; bit i stands for the i-th entry of imputed_fields",
+}
+
+# Fields whose gaps are filled within each country, in the bit order of "imputed"
+IMPUTED_FIELDS = [
+    "gdp_per_capita",
+    "social_support",
+    "life_expectancy",
+    "freedom",
+    "corruption",
+    "generosity",
+    "hdi",
+    "population",
+    "score",
+]
+
+# Value ranges of the numeric fields, as (min, max) with None for an open bound.
+# Values outside the "valid" range contradict the definitions above; values outside
+# the "expected" range are possible but unusual enough to be reviewed.
+FIELD_RANGES = {
+    "score": {"valid": (0, 10), "expected": (2.5, 8.5)},
+    "gdp_per_capita": {"valid": (0, 10)},
+    "social_support": {"valid": (0, 10)},
+    "life_expectancy": {"valid": (0, 10)},
+    "freedom": {"valid": (0, 10)},
+    "corruption": {"valid": (0, 10)},
+    "generosity": {"valid": (0, 10)},
+    "hdi": {"valid": (0, 1)},
+    "population": {"valid": (0, None)},
+    "pop_male": {"valid": (0, None)},
+    "pop_female": {"valid": (0, None)},
+    "population_density": {"valid": (0, None)},
 }
 
 # Data sources with descriptions
@@ -67,23 +101,38 @@ TRANSFORMATION_NOTES = [
     "ISO 3166-1 alpha-3 country codes added for consistent identification",
     "Column names harmonized across all years of happiness reports",
     "Region and continent information standardized and filled where missing",
-    "Missing values filled using forward/backward filling within countries",
+    "Missing values filled within countries by linear interpolation between years (happiness score, HDI, population) or forward/backward filling (happiness factors), and flagged in the imputed bitmask",
     "Population categorized into 5 groups based on size thresholds",
     "Development categorized into 4 groups based on HDI thresholds",
     "Numerical columns rounded to 3 decimal places for efficiency",
+    "Ranks and percentiles of the score and each factor computed per year, globally and within each continent, and exported with the top-10 leaderboards",
+    "Most similar countries of each country found per year by Euclidean distance between factor profiles (GDP, social support, life expectancy, freedom, corruption, generosity, HDI) standardized within the year",
 ]
 
-# Export this information as JSON for potential use in the web application
-if __name__ == "__main__":
-    output_dir = Path(__file__).parent.parent / "docs" / "src" / "data"
 
+def export_data_dictionary(output_dir=OUTPUT_DIR):
+    """
+    Export this information as JSON for potential use in the web application
+
+    Returns:
+        Path: The data_dictionary.json file that was written
+    """
     data_dict = {
         "fields": FIELD_DEFINITIONS,
+        "ranges": FIELD_RANGES,
+        "imputed_fields": IMPUTED_FIELDS,
         "sources": DATA_SOURCES,
         "transformation_notes": TRANSFORMATION_NOTES,
     }
 
-    with open(output_dir / "data_dictionary.json", "w") as f:
+    path = Path(output_dir) / "data_dictionary.json"
+    with open(path, "w") as f:
         json.dump(data_dict, f, indent=2)
+        f.write("\n")
+
+    print(f"Data dictionary exported to {path}")
+    return path
 
-    print(f"Data dictionary exported to {output_dir / 'data_dictionary.json'}")
+
+if __name__ == "__main__":
+    export_data_dictionary()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+HappiScope command-line interface
+
+Subcommands:
+- build: Merge the source data, export the JSON files for the web application and
+  validate the result (the same as running transform_data.py)
+- export: Merge the source data and export the JSON files, without validation
+- validate: Merge the source data and evaluate the validation rules; exits with
+  status 1 if any rule reports an error
+- stats: Summarize the exported data from the exported files alone, checking them
+  against export_manifest.json; exits with status 1 if any file is missing or
+  differs from the manifest
+- dictionary: Export data_dictionary.json
+
+The pipeline, and with it pandas and NumPy, is imported only by the subcommands
+that run it, so stats and dictionary answer in tens of milliseconds and suit
+scripted health checks.
+
+Usage: python happiscope.py {build,export,validate,stats,dictionary} [options]
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+# Locations used by transform_data.py, repeated so that they are known without
+# importing the pipeline
+BASE_DIR = Path(__file__).parent
+OUTPUT_DIR = BASE_DIR.parent / "docs" / "src" / "data"
+EXPORT_MANIFEST = "export_manifest.json"
+VALIDATION_REPORT_PATH = BASE_DIR / "validation_report.json"
+PROFILE_REPORT_PATH = BASE_DIR / "profile_report.json"
+
+
+def add_export_arguments(parser):
+    """Add the options of the pipeline runs that export data"""
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only reprocess year files that are new or changed since the last incremental run",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and incrementally rebuild the outputs affected by each "
+        "change to the input files",
+    )
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        help="also export happiness_data.columnar.json, a dictionary-encoded column layout",
+    )
+    parser.add_argument(
+        "--sharded",
+        action="store_true",
+        help="also export per-year and per-country shards with a manifest under shards/",
+    )
+    parser.add_argument(
+        "--time-series-offsets",
+        action="store_true",
+        help="export time series as row ranges into happiness_data.json instead of a full copy",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=str(PROFILE_REPORT_PATH),
+        metavar="REPORT",
+        help="record per-stage time, CPU, peak memory and row counts to a JSON report "
+        "(default: data/profile_report.json)",
+    )
+    add_cache_argument(parser)
+
+
+def add_validation_arguments(parser):
+    """Add the options of the pipeline runs that validate data"""
+    parser.add_argument(
+        "--validation-report",
+        nargs="?",
+        const=str(VALIDATION_REPORT_PATH),
+        metavar="REPORT",
+        help="write the results of the validation rules to a JSON report "
+        "(default: data/validation_report.json)",
+    )
+
+
+def add_cache_argument(parser):
+    """Add the option disabling the stage cache"""
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="ignore and do not write the stage cache in data/.cache",
+    )
+
+
+def build(args):
+    """Export and validate the merged dataset"""
+    import transform_data
+
+    transform_data.run_pipeline(args)
+    return 0
+
+
+def export(args):
+    """Export the merged dataset without validating it"""
+    import transform_data
+
+    transform_data.run_pipeline(args, validate=False)
+    return 0
+
+
+def validate(args):
+    """Validate the merged dataset without exporting it"""
+    import transform_data
+
+    if args.no_cache:
+        transform_data.CACHE_ENABLED = False
+    report = transform_data.validate_data(report_path=args.validation_report)
+    return 1 if report["errors"] else 0
+
+
+def collect_stats(output_dir=OUTPUT_DIR, verify=False):
+    """
+    Summarize the exported data from the exported files.
+
+    Args:
+        output_dir: Directory the data was exported to
+        verify: Also compare the SHA-256 of every file with the manifest, rather
+            than only its size
+
+    Returns:
+        dict: Dataset summary, totals of the exported files, the files that are
+            missing or differ from the manifest, and the result of the last
+            validation run (if a report was written)
+
+    Raises:
+        SystemExit: If the data has not been exported
+    """
+    output_dir = Path(output_dir)
+    manifest_path = output_dir / EXPORT_MANIFEST
+    if not manifest_path.exists():
+        raise SystemExit(f"No export manifest at {manifest_path}; run the build first")
+    with open(manifest_path) as f:
+        files = json.load(f)["files"]
+    with open(output_dir / "happiness_data.json") as f:
+        rows = json.load(f)
+
+    years = sorted({row["year"] for row in rows})
+    stats = {
+        "rows": len(rows),
+        "countries": len({row["country"] for row in rows}),
+        "years": [years[0], years[-1]] if years else None,
+        "imputed_rows": sum(1 for row in rows if row.get("imputed")),
+        "happiest": None,
+    }
+
+    # The leaderboards index the best ranked rows, so no sorting is needed
+    leaderboards_path = output_dir / "leaderboards.json"
+    if years and leaderboards_path.exists():
+        with open(leaderboards_path) as f:
+            leaders = json.load(f).get(str(years[-1]), {}).get("World", {})
+        if leaders.get("score"):
+            best = rows[leaders["score"][0]]
+            stats["happiest"] = {
+                "country": best["country"],
+                "year": best["year"],
+                "score": best["score"],
+            }
+
+    problems = []
+    for name, entry in sorted(files.items()):
+        path = output_dir / name
+        if not path.exists():
+            problems.append(f"{name} is missing")
+        elif path.stat().st_size != entry["bytes"] or (
+            verify and hashlib.sha256(path.read_bytes()).hexdigest() != entry["sha256"]
+        ):
+            problems.append(f"{name} differs from the export manifest")
+    stats["files"] = {
+        "count": len(files),
+        **{
+            key: sum(entry.get(key, 0) for entry in files.values())
+            for key in ("bytes", "gzip", "br")
+        },
+        "problems": problems,
+    }
+
+    stats["validation"] = None
+    if VALIDATION_REPORT_PATH.exists():
+        with open(VALIDATION_REPORT_PATH) as f:
+            report = json.load(f)
+        stats["validation"] = {
+            "errors": report["errors"],
+            "warnings": report["warnings"],
+        }
+    return stats
+
+
+def stats(args):
+    """Print the summary of the exported data"""
+    summary = collect_stats(verify=args.verify)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        years = summary["years"]
+        print(
+            f"Rows: {summary['rows']} ({summary['countries']} countries, "
+            f"{years[0]}-{years[1]})"
+            if years
+            else f"Rows: {summary['rows']}"
+        )
+        print(f"Imputed rows: {summary['imputed_rows']}")
+        if summary["happiest"]:
+            happiest = summary["happiest"]
+            print(
+                f"Happiest country in {happiest['year']}: "
+                f"{happiest['country']} ({happiest['score']})"
+            )
+        files = summary["files"]
+        print(
+            f"Files: {files['count']} exported, {files['bytes'] / 1e6:.2f} MB "
+            f"(gzip {files['gzip'] / 1e6:.2f} MB, br {files['br'] / 1e6:.2f} MB)"
+        )
+        if summary["validation"]:
+            print(
+                f"Last validation: {summary['validation']['errors']} errors, "
+                f"{summary['validation']['warnings']} warnings"
+            )
+        for problem in files["problems"]:
+            print(f"Warning: {problem}")
+    return 1 if summary["files"]["problems"] else 0
+
+
+def dictionary(args):
+    """Export data_dictionary.json"""
+    from data_dictionary import export_data_dictionary
+
+    export_data_dictionary()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subcommands.add_parser("build", help=build.__doc__)
+    add_export_arguments(build_parser)
+    add_validation_arguments(build_parser)
+    build_parser.set_defaults(run=build)
+
+    export_parser = subcommands.add_parser("export", help=export.__doc__)
+    add_export_arguments(export_parser)
+    export_parser.set_defaults(run=export)
+
+    validate_parser = subcommands.add_parser("validate", help=validate.__doc__)
+    add_validation_arguments(validate_parser)
+    add_cache_argument(validate_parser)
+    validate_parser.set_defaults(run=validate)
+
+    stats_parser = subcommands.add_parser("stats", help=stats.__doc__)
+    stats_parser.add_argument(
+        "--json", action="store_true", help="print the summary as JSON"
+    )
+    stats_parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="compare file contents with the manifest hashes, not only their sizes",
+    )
+    stats_parser.set_defaults(run=stats)
+
+    dictionary_parser = subcommands.add_parser("dictionary", help=dictionary.__doc__)
+    dictionary_parser.set_defaults(run=dictionary)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
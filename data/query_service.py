@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+HappiScope Query Service
+
+A small HTTP service answering filtered queries over the merged dataset, so the web
+application can fetch just the rows and columns it needs instead of the full
+happiness_data.json. Built on asyncio and the standard library only; the dataset is
+loaded once from merge_datasets() (using the stage cache) at startup.
+
+Endpoints:
+- GET /data: Rows of the merged dataset as JSON records, in the same format as
+  happiness_data.json. Optional comma-separated filters: year, code (ISO country
+  codes), continent, and columns (projection, in the requested order).
+  Example: /data?year=2019,2020&continent=Europe&columns=country,year,score
+- GET /top: The best ranked rows of a year, in rank order, from the prebuilt
+  leaderboards. Parameters: year (required), field (score or a factor, default
+  score), continent (default: global ranking), k (at most 10) and columns.
+  Example: /top?year=2020&continent=Europe&field=freedom&k=5
+- GET /meta: Available columns, years, country codes and continents
+
+Responses carry weak ETags (If-None-Match is answered with 304), are gzip-compressed
+when the client accepts it, and are cached in memory per normalized query.
+
+Usage: python query_service.py [--host HOST] [--port PORT] [--cache-size N]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import functools
+import gzip
+import hashlib
+import io
+import json
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from transform_data import (
+    LEADERBOARD_SIZE,
+    LEADERBOARD_WORLD,
+    RANK_FIELDS,
+    TRANSFORM_VERSION,
+    build_leaderboards,
+    build_rankings,
+    merge_datasets,
+    round_for_export,
+)
+
+# Columns that can be filtered on, keyed by query parameter
+FILTER_COLUMNS = {"year": "year", "code": "country_code", "continent": "continent"}
+
+DEFAULT_CACHE_SIZE = 256
+MAX_HEADER_BYTES = 16 * 1024
+KEEP_ALIVE_SECONDS = 15
+GZIP_LEVEL = 6
+
+STATUS_REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+}
+
+
+def build_indexes(data):
+    """
+    Precompute row positions for every value of the filterable columns.
+
+    Args:
+        data: Merged dataset with a default RangeIndex
+
+    Returns:
+        dict: Query parameter -> {value as string: sorted array of row positions}
+    """
+    indexes = {}
+    for param, column in FILTER_COLUMNS.items():
+        if column not in data.columns:
+            continue
+        positions = data.groupby(column, observed=True, sort=True).indices
+        indexes[param] = {
+            str(value): np.sort(rows) for value, rows in positions.items()
+        }
+    return indexes
+
+
+def load_service_state(data=None, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Load the dataset and build everything the request handler needs.
+
+    Args:
+        data: Merged dataset to serve (default: the rounded output of merge_datasets)
+        cache_size: Number of responses kept in the in-memory cache (0 disables it)
+
+    Returns:
+        dict: Dataset, indexes, leaderboards, dataset digest, the /meta response,
+            the response cache and the tasks serving open connections
+    """
+    if data is None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = round_for_export(merge_datasets())
+    data = data.reset_index(drop=True)
+
+    digest = hashlib.sha256(
+        TRANSFORM_VERSION.encode() + data.to_json(orient="split").encode()
+    ).hexdigest()
+
+    indexes = build_indexes(data)
+
+    # Available columns and filter values, served by /meta
+    meta = {"columns": list(data.columns), "rows": len(data)}
+    meta.update((param, sorted(index)) for param, index in indexes.items())
+
+    return {
+        "data": data,
+        "indexes": indexes,
+        "leaderboards": build_leaderboards(data, build_rankings(data)),
+        "digest": digest,
+        "meta": prepare_response(digest, json.dumps(meta)),
+        "cache": OrderedDict(),
+        "cache_size": cache_size,
+        "connections": set(),
+    }
+
+
+def parse_query(state, query_string):
+    """
+    Normalize a /data query string into a hashable cache key.
+
+    Args:
+        state: Output of load_service_state
+        query_string: Raw query string of the request
+
+    Returns:
+        tuple: (filters, columns) where filters is a tuple of (param, sorted values)
+            and columns is a tuple of projected column names (empty for all)
+
+    Raises:
+        ValueError: On unknown parameters or columns
+    """
+    params = parse_qs(query_string, keep_blank_values=True)
+    filters = []
+    columns = ()
+    for param, raw_values in sorted(params.items()):
+        values = [v.strip() for raw in raw_values for v in raw.split(",") if v.strip()]
+        if param == "columns":
+            columns = parse_columns(state, values)
+        elif param in state["indexes"]:
+            filters.append((param, tuple(sorted(set(values)))))
+        else:
+            raise ValueError(f"Unknown query parameter: {param}")
+    return tuple(filters), columns
+
+
+def parse_columns(state, values):
+    """Validate a column projection, dropping repeated columns"""
+    unknown = [col for col in values if col not in state["data"].columns]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(values))
+
+
+def parse_top_query(state, query_string):
+    """
+    Normalize a /top query string into a hashable cache key.
+
+    Args:
+        state: Output of load_service_state
+        query_string: Raw query string of the request
+
+    Returns:
+        tuple: ("top", year, scope, field, k, columns) where scope is a continent
+            or LEADERBOARD_WORLD
+
+    Raises:
+        ValueError: On missing, unknown or invalid parameters
+    """
+    params = {
+        param: values[-1].strip()
+        for param, values in parse_qs(query_string, keep_blank_values=True).items()
+    }
+    for param in params:
+        if param not in ("year", "continent", "field", "k", "columns"):
+            raise ValueError(f"Unknown query parameter: {param}")
+    if "year" not in params:
+        raise ValueError("Missing query parameter: year")
+    try:
+        year = int(params["year"])
+        k = int(params.get("k", LEADERBOARD_SIZE))
+    except ValueError:
+        raise ValueError("year and k must be integers")
+    if not 1 <= k <= LEADERBOARD_SIZE:
+        raise ValueError(f"k must be between 1 and {LEADERBOARD_SIZE}")
+    field = params.get("field", "score")
+    if field not in RANK_FIELDS:
+        raise ValueError(f"Unknown field: {field}")
+    scope = params.get("continent") or LEADERBOARD_WORLD
+    columns = parse_columns(
+        state, [col.strip() for col in params.get("columns", "").split(",") if col]
+    )
+    return "top", year, scope, field, k, columns
+
+
+def select_rows(state, filters):
+    """
+    Row positions matching every filter (any of the listed values per filter).
+
+    Returns:
+        ndarray of row positions in dataset order, or None if nothing is filtered
+    """
+    selected = None
+    for param, values in filters:
+        index = state["indexes"][param]
+        matches = [index[value] for value in values if value in index]
+        rows = np.unique(np.concatenate(matches)) if matches else np.empty(0, int)
+        selected = rows if selected is None else np.intersect1d(selected, rows)
+    return selected
+
+
+def prepare_response(digest, text):
+    """Encode a JSON response body, compress it once and derive its ETag"""
+    body = text.encode()
+    return {
+        "body": body,
+        "gzip": gzip.compress(body, compresslevel=GZIP_LEVEL),
+        "etag": f'W/"{digest[:16]}-{hashlib.sha256(body).hexdigest()[:16]}"',
+    }
+
+
+def etag_matches(etag, if_none_match):
+    """
+    Whether an If-None-Match header matches an ETag, using the weak comparison of
+    RFC 9110 (the W/ prefixes are ignored) and honouring "*"
+    """
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Whether an Accept-Encoding header accepts gzip with a non-zero q-value, either
+    by name (gzip or x-gzip) or through "*"
+    """
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def render_query(state, key):
+    """
+    Render the response for a normalized /data or /top query, using the response
+    cache.
+
+    Returns:
+        dict: JSON body, its gzip-compressed copy and the ETag
+    """
+    cache = state["cache"]
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+
+    data = state["data"]
+    if key[0] == "top":
+        _, year, scope, field, k, columns = key
+        leaders = state["leaderboards"].get(year, {}).get(scope, {}).get(field, [])
+        data = data.iloc[leaders[:k]]
+    else:
+        filters, columns = key
+        rows = select_rows(state, filters)
+        if rows is not None:
+            data = data.iloc[rows]
+    if columns:
+        data = data[list(columns)]
+
+    response = prepare_response(state["digest"], data.to_json(orient="records"))
+
+    if state["cache_size"] > 0:
+        cache[key] = response
+        if len(cache) > state["cache_size"]:
+            cache.popitem(last=False)
+    return response
+
+
+def build_response(state, method, target, headers):
+    """
+    Answer one request.
+
+    Args:
+        state: Output of load_service_state
+        method: HTTP method
+        target: Request target (path and query string)
+        headers: Request headers with lower-cased names
+
+    Returns:
+        tuple: (status, response headers dict, body bytes)
+    """
+    if method not in ("GET", "HEAD"):
+        return 405, {"Allow": "GET, HEAD"}, b""
+
+    url = urlsplit(target)
+    if url.path in ("/data", "/top"):
+        parse = parse_query if url.path == "/data" else parse_top_query
+        try:
+            key = parse(state, url.query)
+        except ValueError as error:
+            return 400, {}, json.dumps({"error": str(error)}).encode()
+        response = render_query(state, key)
+    elif url.path == "/meta":
+        response = state["meta"]
+    else:
+        return 404, {}, json.dumps({"error": f"Not found: {url.path}"}).encode()
+
+    response_headers = {"ETag": response["etag"], "Vary": "Accept-Encoding"}
+    if etag_matches(response["etag"], headers.get("if-none-match", "")):
+        return 304, response_headers, b""
+
+    body = response["body"]
+    if accepts_gzip(headers.get("accept-encoding", "")):
+        response_headers["Content-Encoding"] = "gzip"
+        body = response["gzip"]
+    return 200, response_headers, body
+
+
+def write_response(writer, status, headers, body=b""):
+    """Write the status line, headers and body of a response"""
+    lines = [f"HTTP/1.1 {status} {STATUS_REASONS[status]}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+
+
+async def handle_connection(state, reader, writer):
+    """Serve HTTP/1.1 requests on one connection until it is closed or idle"""
+    state["connections"].add(asyncio.current_task())
+    try:
+        while True:
+            try:
+                head = await asyncio.wait_for(
+                    reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_SECONDS
+                )
+            except (
+                asyncio.IncompleteReadError,
+                asyncio.LimitOverrunError,
+                asyncio.TimeoutError,
+                ConnectionError,
+            ):
+                break
+
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            try:
+                method, target, version = request_line.split(" ")
+            except ValueError:
+                body = json.dumps({"error": "Malformed request line"}).encode()
+                write_response(
+                    writer,
+                    400,
+                    {"Content-Length": str(len(body)), "Connection": "close"},
+                    body,
+                )
+                await writer.drain()
+                break
+            headers = {}
+            for line in header_lines:
+                name, _, value = line.partition(":")
+                if name:
+                    headers[name.strip().lower()] = value.strip()
+
+            status, response_headers, body = build_response(
+                state, method, target, headers
+            )
+            # No endpoint reads a request body, so a request carrying one closes the
+            # connection rather than leaving the body to be parsed as the next request
+            has_body = "transfer-encoding" in headers or headers.get(
+                "content-length", "0"
+            ) not in ("", "0")
+            keep_alive = (
+                version == "HTTP/1.1"
+                and headers.get("connection", "").lower() != "close"
+                and not has_body
+            )
+            response_headers.update(
+                {
+                    "Content-Type": "application/json",
+                    "Content-Length": str(len(body)),
+                    "Access-Control-Allow-Origin": "*",
+                    "Connection": "keep-alive" if keep_alive else "close",
+                }
+            )
+            write_response(
+                writer, status, response_headers, body if method != "HEAD" else b""
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+        with contextlib.suppress(ConnectionError):
+            await writer.wait_closed()
+        state["connections"].discard(asyncio.current_task())
+
+
+async def start_service(state, host="127.0.0.1", port=8765):
+    """
+    Start serving on host:port.
+
+    Returns:
+        asyncio.Server: The listening server (port 0 picks a free port)
+    """
+    return await asyncio.start_server(
+        functools.partial(handle_connection, state), host, port, limit=MAX_HEADER_BYTES
+    )
+
+
+async def serve(host, port, cache_size):
+    """Load the dataset and serve until interrupted"""
+    print("Loading merged dataset...")
+    state = load_service_state(cache_size=cache_size)
+    server = await start_service(state, host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Serving {len(state['data'])} rows on http://{address[0]}:{address[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1].strip())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE,
+        help="number of responses kept in memory (0 disables the cache)",
+    )
+    args = parser.parse_args()
+
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve(args.host, args.port, args.cache_size))
@@ -0,0 +1,117 @@
+"""
+Regression tests for transform_data.py
+
+Usage: python -m pytest data/tests
+"""
+
+import contextlib
+import io
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import transform_data  # noqa: E402
+from transform_data import (  # noqa: E402
+    HAPPINESS_DIR,
+    IMPUTED_FIELDS,
+    complete_happiness_panel,
+    discover_years,
+    fill_gaps,
+    handle_missing_happiness_scores,
+    load_happiness_reports,
+    resolve_country_name,
+)
+
+SCORE_BIT = 1 << IMPUTED_FIELDS.index("score")
+
+
+@pytest.fixture(autouse=True)
+def no_stage_cache(monkeypatch):
+    """Keep the tests from reading or writing data/.cache"""
+    monkeypatch.setattr(transform_data, "CACHE_ENABLED", False)
+
+
+def quiet(func, *args):
+    """Call func with its progress output suppressed"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+def test_grid_rows_leave_factors_missing_until_filled():
+    reports = pd.DataFrame(
+        {
+            "country": ["A", "A", "B"],
+            "country_code": ["AAA", "AAA", "BBB"],
+            "year": [2015, 2018, 2015],
+            "score": [5.0, 6.5, 4.0],
+            "freedom": [0.2, 0.5, 0.1],
+        }
+    )
+    panel = quiet(handle_missing_happiness_scores, reports)
+    reported = list(zip(reports["country"], reports["year"]))
+    inserted = panel[
+        [key not in reported for key in zip(panel["country"], panel["year"])]
+    ]
+    assert len(inserted) == 5
+
+    assert inserted["freedom"].isna().all()
+    assert (inserted["imputed"] & SCORE_BIT).all()
+
+    filled = fill_gaps(panel)
+    a = filled[filled["country"] == "A"].set_index("year")
+    assert a.loc[2016, "score"] == pytest.approx(5.5)
+    assert a.loc[2016, "freedom"] == pytest.approx(0.2)
+    assert a.loc[2016, "imputed"] & (1 << IMPUTED_FIELDS.index("freedom"))
+    assert a.loc[2015, "imputed"] == 0
+
+
+def test_every_grid_inserted_row_is_flagged():
+    reports = quiet(
+        load_happiness_reports, discover_years(HAPPINESS_DIR, "{year}_report.csv")
+    )
+    reported = pd.MultiIndex.from_frame(reports[["country", "year"]])
+    panel = fill_gaps(quiet(complete_happiness_panel, reports))
+
+    inserted = ~pd.MultiIndex.from_frame(panel[["country", "year"]]).isin(reported)
+    assert inserted.any()
+    assert np.all(panel.loc[inserted, "imputed"].to_numpy() != 0)
+    assert np.all(panel.loc[inserted, "imputed"].to_numpy() & SCORE_BIT)
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "World",
+        "Southern Africa",
+        "Northern America",
+        "Northern Africa",
+        "Western Asia",
+        "Sub-Saharan Africa",
+        "Middle East and North Africa",
+        "Latin America and Caribbean",
+        "Central and Eastern Europe",
+        "East Asia and Pacific",
+        "High income",
+        "European Union (27)",
+    ],
+)
+def test_region_and_aggregate_names_stay_unresolved(name):
+    assert quiet(resolve_country_name, name) == [name, None]
+
+
+@pytest.mark.parametrize(
+    "name, code",
+    [
+        ("Urugay", "URY"),
+        ("Phillipines", "PHL"),
+        ("Untied Kingdom", "GBR"),
+        ("Democratic Republic Congo", "COD"),
+    ],
+)
+def test_misspelled_country_names_still_resolve(name, code):
+    assert quiet(resolve_country_name, name)[1] == code
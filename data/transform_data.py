@@ -10,12 +10,27 @@ This script combines and transforms data from multiple sources:
 Output: JSON files optimized for the web application in a format ready for visualization
 """
 
+import argparse
+import contextlib
+import difflib
 import os
+import functools
+import gzip
+import hashlib
+import importlib.util
+import platform
+import re
+import time
+import tracemalloc
 import pandas as pd
 import json
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
 
+from data_dictionary import FIELD_RANGES, IMPUTED_FIELDS
+
 # Define paths
 BASE_DIR = Path(__file__).parent
 HAPPINESS_DIR = BASE_DIR / "happiness_score_data"
@@ -26,6 +41,265 @@ OUTPUT_DIR = Path(BASE_DIR.parent) / "docs" / "src" / "data"
 # Create output directory if it doesn't exist
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Stage cache: processed frames are stored as columnar artifacts keyed by a content
+# hash of their input files and of the pipeline code, so unchanged inputs are not
+# reprocessed. The code includes data_dictionary.py, whose IMPUTED_FIELDS sets the
+# bit order of the imputed column and whose FIELD_RANGES drive validation.
+CACHE_DIR = BASE_DIR / ".cache"
+CACHE_ENABLED = os.environ.get("HAPPISCOPE_CACHE", "1") != "0"
+CACHE_FORMAT = "parquet" if importlib.util.find_spec("pyarrow") else "pickle"
+TRANSFORM_SOURCES = [Path(__file__), BASE_DIR / "data_dictionary.py"]
+TRANSFORM_VERSION = hashlib.sha256(
+    b"".join(hashlib.sha256(path.read_bytes()).digest() for path in TRANSFORM_SOURCES)
+).hexdigest()
+
+_file_digests = {}
+_stage_results = {}
+
+
+def file_digest(path):
+    """
+    Compute the SHA-256 digest of a file, memoized on its size and modification time.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        str: Hex digest, or 'missing' if the file does not exist
+    """
+    path = Path(path)
+    if not path.exists():
+        return "missing"
+
+    stat = path.stat()
+    memo_key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _file_digests:
+        _file_digests[memo_key] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return _file_digests[memo_key]
+
+
+def stage_cache_key(stage, input_paths, *params):
+    """
+    Build the cache key for a pipeline stage.
+
+    Args:
+        stage: Stage name
+        input_paths: Files the stage reads
+        params: Any extra arguments that change the stage output
+
+    Returns:
+        str: Key combining the stage, the transform code version and the input contents
+    """
+    digest = hashlib.sha256(f"{stage}:{TRANSFORM_VERSION}:{params!r}".encode())
+    for path in sorted(Path(p) for p in input_paths):
+        digest.update(f"{input_file_key(path)}:{file_digest(path)}\n".encode())
+    return digest.hexdigest()[:20]
+
+
+def read_stage_artifact(path):
+    """Load a cached stage frame from disk"""
+    if path.suffix == ".parquet":
+        df = pd.read_parquet(path)
+        # Parquet returns missing strings as None; restore the NaN the pipeline produces
+        for col in df.select_dtypes(include="object").columns:
+            df[col] = df[col].fillna(np.nan)
+        return df
+    return pd.read_pickle(path)
+
+
+def write_stage_artifact(df, path):
+    """Atomically write a stage frame to disk, replacing older artifacts of the stage"""
+    stage = path.name.rsplit("-", 1)[0]
+    for stale in path.parent.glob(f"{stage}-*"):
+        stale.unlink()
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    if path.suffix == ".parquet":
+        df.to_parquet(tmp_path)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def cached_stage(input_paths):
+    """
+    Decorator caching a DataFrame-returning stage on disk and in memory.
+
+    Args:
+        input_paths: Callable returning the files the stage depends on; it receives the
+            stage arguments and is evaluated on every call so that newly added files
+            invalidate the cache
+
+    Returns:
+        Decorator for the stage function
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not CACHE_ENABLED:
+                return func(*args, **kwargs)
+
+            key = stage_cache_key(
+                func.__name__,
+                input_paths(*args, **kwargs),
+                args,
+                sorted(kwargs.items()),
+            )
+            if key in _stage_results:
+                return _stage_results[key].copy()
+
+            # Per-item stages (e.g. one call per year) get one artifact per argument set
+            label = "_".join([func.__name__, *map(str, args)])
+            suffix = ".parquet" if CACHE_FORMAT == "parquet" else ".pkl"
+            artifact = CACHE_DIR / f"{label}-{key}{suffix}"
+            if artifact.exists():
+                print(f"Using cached {label} ({artifact.name})")
+                df = read_stage_artifact(artifact)
+            else:
+                df = func(*args, **kwargs)
+                if not isinstance(df, pd.DataFrame):
+                    return df
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                write_stage_artifact(df, artifact)
+
+            _stage_results[key] = df
+            return df.copy()
+
+        return wrapper
+
+    return decorator
+
+
+def happiness_input_files():
+    """List the yearly happiness report files"""
+    return sorted(HAPPINESS_DIR.glob("*_report.csv"))
+
+
+def hdi_input_files():
+    """List the HDI source files"""
+    return [HDI_DIR / "human-development-index.csv"]
+
+
+def population_input_files():
+    """List the yearly population files"""
+    return sorted(POPULATION_DIR.glob("population_*.csv"))
+
+
+def all_input_files():
+    """List every source file the merged dataset depends on"""
+    return happiness_input_files() + hdi_input_files() + population_input_files()
+
+
+def input_file_key(path):
+    """Identify an input file by its source directory and name"""
+    return f"{path.parent.name}/{path.name}"
+
+
+# Profiling: with --profile, every pipeline stage records wall time, CPU time, peak
+# traced memory and row counts into a JSON report
+_profile = None
+
+
+def start_profiling():
+    """Enable stage profiling and memory tracing for the rest of the run"""
+    global _profile
+    _profile = {"stages": [], "stack": [], "peak": 0, "started": time.perf_counter()}
+    tracemalloc.start()
+
+
+@contextlib.contextmanager
+def profile_stage(name, rows_in=None):
+    """
+    Record wall time, CPU time, peak traced memory and row counts for a stage.
+
+    Does nothing unless start_profiling was called. Stages may nest; the peak memory
+    of a stage includes the peaks of the stages nested in it. Memory figures are
+    relative to the traced memory in use when the stage starts.
+
+    Args:
+        name: Stage name in the report
+        rows_in: Number of input rows, if known
+
+    Yields:
+        dict: The stage record; callers may set 'rows_out' or other fields on it
+    """
+    record = {"stage": name, "rows_in": rows_in, "rows_out": None}
+    if _profile is None:
+        yield record
+        return
+
+    stack = _profile["stack"]
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        stack[-1]["_peak"] = max(stack[-1]["_peak"], peak)
+    tracemalloc.reset_peak()
+
+    record.update(depth=len(stack), _peak=current, _start_memory=current)
+    stack.append(record)
+    _profile["stages"].append(record)
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        end_memory, peak = tracemalloc.get_traced_memory()
+        stack.pop()
+
+        stage_peak = max(record.pop("_peak"), peak)
+        start_memory = record.pop("_start_memory")
+        if stack:
+            stack[-1]["_peak"] = max(stack[-1]["_peak"], stage_peak)
+        _profile["peak"] = max(_profile["peak"], stage_peak)
+        record.update(
+            wall_seconds=round(wall, 6),
+            cpu_seconds=round(cpu, 6),
+            peak_traced_bytes=stage_peak - start_memory,
+            net_traced_bytes=end_memory - start_memory,
+        )
+
+
+def profile_note(**fields):
+    """Attach extra fields (e.g. rows_in) to the innermost running profiled stage"""
+    if _profile is not None and _profile["stack"]:
+        _profile["stack"][-1].update(fields)
+
+
+def profiled_stage(func):
+    """Decorator profiling a stage function; DataFrame results set rows_out"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with profile_stage(func.__name__) as record:
+            result = func(*args, **kwargs)
+            if isinstance(result, pd.DataFrame):
+                record["rows_out"] = len(result)
+            return result
+
+    return wrapper
+
+
+def write_profile_report(path):
+    """Write the collected stage records, in start order, with run metadata to JSON"""
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "transform_version": TRANSFORM_VERSION,
+        "cache_enabled": CACHE_ENABLED,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "total_wall_seconds": round(time.perf_counter() - _profile["started"], 6),
+        "peak_traced_bytes": max(_profile["peak"], tracemalloc.get_traced_memory()[1]),
+        "inputs": {
+            input_file_key(path): file_digest(path) for path in all_input_files()
+        },
+        "stages": _profile["stages"],
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Profile report written to {path}")
+
 
 # Country name standardization and ISO code mapping
 def get_country_mappings():
@@ -357,438 +631,665 @@ def get_country_mappings():
     return name_mapping, country_codes
 
 
-def standardize_country_names(df, country_col="country"):
+def normalize_country_key(name):
     """
-    Standardize country names in a dataframe and add ISO country codes.
+    Normalize a raw country name into the key used for resolver lookups.
+
+    Trailing asterisks (used in some reports to flag footnotes) are dropped,
+    runs of whitespace are collapsed and the result is case-folded.
 
     Args:
-        df: Pandas dataframe with a country column
-        country_col: Name of the country column (default: 'country')
+        name: Raw country name
 
     Returns:
-        DataFrame with standardized country names and added 'country_code' column
+        str: Normalized lookup key
+    """
+    return " ".join(str(name).rstrip("*").split()).casefold()
+
+
+def build_country_resolver():
+    """
+    Build the lookup table used to resolve country names and ISO codes in one step.
+
+    Every standard name and every known variant is indexed by its normalized key,
+    so a single lookup yields both the standard name and its ISO code.
+
+    Returns:
+        dict: Maps normalized names to (standard_name, country_code) tuples
     """
     name_mapping, country_codes = get_country_mappings()
 
-    # Remove asterisks from country names if present
-    if country_col in df.columns:
-        df[country_col] = (
-            df[country_col].astype(str).str.replace(r"\*$", "", regex=True)
+    resolver = {
+        normalize_country_key(name): (name, code)
+        for name, code in country_codes.items()
+    }
+    # Variants take precedence over identically spelled standard names
+    for variant, standard in name_mapping.items():
+        resolver[normalize_country_key(variant)] = (
+            standard,
+            country_codes.get(standard),
         )
 
-    # First standardize names
-    for variant, standard in name_mapping.items():
-        df.loc[df[country_col] == variant, country_col] = standard
+    return resolver
 
-    # Add country codes
-    df["country_code"] = df[country_col].map(country_codes)
 
-    # Log countries with missing codes
-    missing_codes = df[df["country_code"].isna()][country_col].unique()
-    if len(missing_codes) > 0:
-        print(f"Warning: Missing country codes for: {', '.join(missing_codes)}")
+# Built once at import time; shared by every call to standardize_country_names
+COUNTRY_RESOLVER = build_country_resolver()
 
-    return df
+# Words ignored when comparing names token by token ("The Gambia", "Korea, Republic of")
+NAME_STOPWORDS = {"the", "of", "and"}
 
+# Fuzzy matching scores the known names sharing the most character trigrams with the
+# input; the best must reach the threshold and lead any different country by the margin
+FUZZY_MATCH_CANDIDATES = 20
+FUZZY_MATCH_THRESHOLD = 0.85
+FUZZY_MATCH_MARGIN = 0.05
 
-def handle_missing_happiness_scores(df):
+# A fuzzy match must also agree word for word: every word of the input must pair
+# with a word of the candidate at least this similar (a typo, not another word), and
+# compass and region qualifiers must match exactly, so region names such as
+# "Southern Africa" or "Northern America" never resolve to a country
+FUZZY_TOKEN_THRESHOLD = 0.8
+REGION_WORDS = {
+    "north",
+    "northern",
+    "south",
+    "southern",
+    "east",
+    "eastern",
+    "west",
+    "western",
+    "central",
+    "middle",
+    "sub",
+}
+
+RESOLUTION_CACHE_PATH = CACHE_DIR / "country_resolutions.json"
+
+
+def name_tokens(key):
+    """Order-insensitive token signature of a normalized name, ignoring stopwords"""
+    return " ".join(sorted(set(re.findall(r"\w+", key)) - NAME_STOPWORDS))
+
+
+def name_trigrams(key):
+    """Character trigrams of a normalized name, padded so short names still match"""
+    padded = "  " + " ".join(re.findall(r"\w+", key)) + " "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def tokens_agree(key, candidate):
     """
-    Handle missing happiness scores using appropriate interpolation methods.
-    
-    Args:
-        df: DataFrame containing happiness data with potential missing values
-        
-    Returns:
-        DataFrame with interpolated missing values
+    Whether two normalized names have the same words up to typos, ignoring stopwords
+    and word order, with identical compass and region qualifiers (see REGION_WORDS)
     """
-    print("Handling missing happiness scores...")
-    
-    # Create a complete time series for each country
-    all_years = range(2015, 2025)
-    complete_data = []
-    
-    for country in df['country'].unique():
-        country_mask = df['country'] == country
-        country_data = df[country_mask].copy()
-        
-        # Create a complete time series for this country
-        country_years = country_data['year'].tolist()
-        missing_years = [year for year in all_years if year not in country_years]
-        
-        print(f"\nProcessing {country}:")
-        print(f"Available years: {country_years}")
-        print(f"Missing years: {missing_years}")
-        
-        # Create rows for missing years
-        for year in missing_years:
-            new_row = country_data.iloc[0].copy()  # Copy the first row as template
-            new_row['year'] = year
-            new_row['score'] = np.nan  # Set score to NaN for missing years
-            country_data = pd.concat([country_data, pd.DataFrame([new_row])], ignore_index=True)
-        
-        # Sort by year
-        country_data = country_data.sort_values('year')
-        print(f"Original scores: {country_data['score'].tolist()}")
-        
-        # Now we can properly interpolate missing values
-        if country_data['score'].isna().any():
-            # Use linear interpolation for missing values
-            interpolated_scores = country_data['score'].interpolate(method='linear')
-            country_data['score'] = interpolated_scores
-            
-            # For any remaining missing values at the start or end of the series,
-            # use forward/backward fill
-            country_data['score'] = country_data['score'].fillna(method='ffill').fillna(method='bfill')
-            
-            # # If there are still any missing values, use the global mean for that year
-            # if country_data['score'].isna().any():
-            #     year_means = df.groupby('year')['score'].mean()
-            #     for year in missing_years:
-            #         if year in year_means.index:
-            #             country_data.loc[country_data['year'] == year, 'score'] = year_means[year]
-            
-            print(f"Interpolated scores: {country_data['score'].tolist()}")
-        
-        complete_data.append(country_data)
-    
-    # Combine all country data
-    result_df = pd.concat(complete_data, ignore_index=True)
-    return result_df
+    words = set(re.findall(r"\w+", key)) - NAME_STOPWORDS
+    other = set(re.findall(r"\w+", candidate)) - NAME_STOPWORDS
+    if words & REGION_WORDS != other & REGION_WORDS:
+        return False
 
+    unpaired = other - words
+    for word in sorted(words - other):
+        match = next(
+            (
+                candidate_word
+                for candidate_word in sorted(unpaired)
+                if difflib.SequenceMatcher(None, word, candidate_word).ratio()
+                >= FUZZY_TOKEN_THRESHOLD
+            ),
+            None,
+        )
+        if match is None:
+            return False
+        unpaired.remove(match)
+    return not unpaired
 
-def process_happiness_data():
-    """Process happiness score data from all years and combine into one dataset"""
-    print("Processing happiness data...")
 
-    all_data = []
-    years = range(2015, 2025)
+def build_country_name_index(resolver):
+    """
+    Index the resolver keys for near-match lookups.
 
-    for year in years:
-        file_path = HAPPINESS_DIR / f"{year}_report.csv"
-        if not file_path.exists():
-            print(f"Warning: No data file found for {year}")
-            continue
+    Args:
+        resolver: Exact lookup table from build_country_resolver
 
-        df = pd.read_csv(file_path)
-
-        # Standardize column names (they may differ slightly between years)
-        column_mapping = {
-            "Country": "country",
-            "Country or region": "country",
-            "Country name": "country",
-            "Region": "region",
-            "Happiness Rank": "rank",
-            "Happiness Score": "score",
-            "Happiness.Score": "score",
-            "Happiness score": "score",
-            "happiness_score": "score",
-            "Score": "score",
-            "Ladder score": "score",
-            "Life Ladder": "score",
-            "GDP per capita": "gdp_per_capita",
-            "Economy..GDP.per.Capita.": "gdp_per_capita",
-            "Economy (GDP per Capita)": "gdp_per_capita",
-            "Explained by: GDP per capita": "gdp_per_capita",
-            "Log GDP per capita": "gdp_per_capita",
-            "gdp_per_capita": "gdp_per_capita",
-            "Social support": "social_support",
-            "Family": "social_support",
-            "Explained by: Social support": "social_support",
-            "social_support": "social_support",
-            "Health..Life.Expectancy.": "life_expectancy",
-            "Health (Life Expectancy)": "life_expectancy",
-            "Healthy Life Expectancy": "life_expectancy",
-            "Healthy life expectancy": "life_expectancy",
-            "Explained by: Healthy life expectancy": "life_expectancy",
-            "health": "life_expectancy",
-            "Freedom": "freedom",
-            "Freedom to make life choices": "freedom",
-            "Explained by: Freedom to make life choices": "freedom",
-            "freedom": "freedom",
-            "Trust..Government.Corruption.": "corruption",
-            "Trust (Government Corruption)": "corruption",
-            "Perceptions of corruption": "corruption",
-            "Explained by: Perceptions of corruption": "corruption",
-            "corruption": "corruption",
-            "Generosity": "generosity",
-            "Explained by: Generosity": "generosity",
-            "generosity": "generosity",
-            "Continent": "continent",
-            "continent": "continent",
-            "Dystopia Residual": "dystopia_residual",
-            "Explained by: Dystopia + residual": "dystopia_residual",
-            "dystopia_residual": "dystopia_residual",
-        }
+    Returns:
+        dict: 'tokens' maps token signatures to resolutions and 'trigrams' maps each
+            trigram to the keys containing it
+    """
+    tokens = {}
+    trigrams = {}
+    for key, resolution in resolver.items():
+        tokens.setdefault(name_tokens(key), set()).add(resolution)
+        for gram in name_trigrams(key):
+            trigrams.setdefault(gram, []).append(key)
 
-        # Rename columns based on mapping, ignore those not in the mapping
-        df = df.rename(
-            columns={col: column_mapping.get(col, col) for col in df.columns}
-        )
+    # A signature shared by different countries is ambiguous and never used
+    tokens = {
+        signature: resolutions.pop()
+        for signature, resolutions in tokens.items()
+        if len(resolutions) == 1
+    }
+    return {"tokens": tokens, "trigrams": trigrams}
 
-        # Keep only the columns we need
-        essential_columns = [
-            "country",
-            "score",
-            "gdp_per_capita",
-            "social_support",
-            "life_expectancy",
-            "freedom",
-            "corruption",
-            "generosity",
-            "dystopia_residual",
-        ]
 
-        # Add region or continent if they exist in the dataframe
-        if "region" in df.columns:
-            essential_columns.append("region")
-        if "continent" in df.columns:
-            essential_columns.append("continent")
+def build_code_index():
+    """
+    Build the reverse lookup from ISO code to every known name for that country.
 
-        # Filter to keep only columns that exist in the dataframe
-        existing_columns = [col for col in essential_columns if col in df.columns]
+    Returns:
+        dict: Maps ISO codes to lists of names, the standard name first
+    """
+    name_mapping, country_codes = get_country_mappings()
 
-        df = df[existing_columns].copy()
+    names_by_code = {code: [name] for name, code in country_codes.items()}
+    for variant, standard in name_mapping.items():
+        code = country_codes.get(standard)
+        if code is not None and variant not in names_by_code[code]:
+            names_by_code[code].append(variant)
+    return names_by_code
 
-        # Add year column
-        df["year"] = year
 
-        # Standardize country names and add country codes
-        df = standardize_country_names(df)
+COUNTRY_NAME_INDEX = build_country_name_index(COUNTRY_RESOLVER)
+COUNTRY_NAMES_BY_CODE = build_code_index()
 
-        all_data.append(df)
 
-    # Combine all years into a single dataframe
-    combined_df = pd.concat(all_data, ignore_index=True)
-    
-    # Handle missing happiness scores
-    combined_df = handle_missing_happiness_scores(combined_df)
+def country_names_for_code(code):
+    """
+    Return every known name for an ISO country code.
 
-    # Handle region and continent information
-    if "region" not in combined_df.columns and "continent" in combined_df.columns:
-        # If we have continent but not region, create a region mapping from continent
-        continent_to_region = {
-            "Europe": "Western Europe",
-            "North America": "North America",
-            "Australia": "Australia and New Zealand",
-            "Oceania": "Australia and New Zealand",
-            "Asia": "Eastern Asia",
-            "South America": "Latin America and Caribbean",
-            "Africa": "Sub-Saharan Africa",
-        }
-        combined_df["region"] = combined_df["continent"].map(continent_to_region)
-    elif "region" in combined_df.columns and "continent" not in combined_df.columns:
-        # If we have region but not continent, create a continent mapping
-        region_to_continent = {
-            "Western Europe": "Europe",
-            "North America": "North America",
-            "Australia and New Zealand": "Oceania",
-            "Middle East and Northern Africa": "Asia",
-            "Latin America and Caribbean": "South America",
-            "Southeastern Asia": "Asia",
-            "Central and Eastern Europe": "Europe",
-            "Eastern Asia": "Asia",
-            "Sub-Saharan Africa": "Africa",
-            "Southern Asia": "Asia",
-            "Central America": "North America",  # Added Central America mapping
-        }
-        combined_df["continent"] = combined_df["region"].map(region_to_continent)
+    Args:
+        code: ISO 3166-1 alpha-3 code
 
-    # If we have region data for some countries, fill missing region data based on country-region mapping
-    if "region" in combined_df.columns:
-        # Create country-region mapping from non-null values
-        country_region_map = combined_df.dropna(subset=["region"])[
-            ["country", "region"]
-        ].drop_duplicates()
-        if not country_region_map.empty:
-            country_region_dict = country_region_map.set_index("country")[
-                "region"
-            ].to_dict()
-            # Fill missing region data
-            combined_df["region"] = combined_df.apply(
-                lambda row: (
-                    country_region_dict.get(row["country"])
-                    if pd.isna(row.get("region", None))
-                    else row.get("region", None)
-                ),
-                axis=1,
-            )
+    Returns:
+        list: The standard name followed by known variants (empty if the code is unknown)
+    """
+    return list(COUNTRY_NAMES_BY_CODE.get(code, []))
 
-    return combined_df
 
+def fuzzy_match_country(key):
+    """
+    Resolve a normalized name that has no exact entry in the resolver.
 
-def process_hdi_data():
-    """Process Human Development Index data"""
-    print("Processing HDI data...")
+    Names whose words match a known name in another order (or up to "the"/"of"/"and")
+    resolve directly. Otherwise the known names sharing the most character trigrams
+    with it and agreeing with it word for word (see tokens_agree) are scored by edit
+    similarity, and the best one is accepted only if it clears FUZZY_MATCH_THRESHOLD
+    and is not nearly tied with a different country.
 
-    # Read the HDI data
-    hdi_file = HDI_DIR / "human-development-index.csv"
-    if not hdi_file.exists():
-        print(f"Warning: HDI data file not found at {hdi_file}")
-        return pd.DataFrame()
+    Args:
+        key: Normalized name (see normalize_country_key)
+
+    Returns:
+        tuple: (standard_name, country_code), or None if there is no confident match
+    """
+    resolution = COUNTRY_NAME_INDEX["tokens"].get(name_tokens(key))
+    if resolution is not None:
+        return resolution
 
-    hdi_df = pd.read_csv(hdi_file)
+    shared = {}
+    for gram in name_trigrams(key):
+        for candidate in COUNTRY_NAME_INDEX["trigrams"].get(gram, ()):
+            shared[candidate] = shared.get(candidate, 0) + 1
 
-    # Rename columns for consistency
-    hdi_df = hdi_df.rename(
-        columns={"Entity": "country", "Year": "year", "Human Development Index": "hdi"}
+    candidates = sorted(shared, key=shared.get, reverse=True)[:FUZZY_MATCH_CANDIDATES]
+    scored = sorted(
+        (
+            (difflib.SequenceMatcher(None, key, candidate).ratio(), candidate)
+            for candidate in candidates
+            if tokens_agree(key, candidate)
+        ),
+        reverse=True,
     )
+    if not scored or scored[0][0] < FUZZY_MATCH_THRESHOLD:
+        return None
 
-    # Filter for the years we're interested in (2015-2024)
-    hdi_df = hdi_df[(hdi_df["year"] >= 2015) & (hdi_df["year"] <= 2024)]
-
-    # Filter out non-country entities (e.g., regions, continents)
-    non_country_patterns = [
-        "World",
-        "Very high human development",
-        "High human development",
-        "Medium human development",
-        "Low human development",
-        "income",
-        "OECD",
-        "Developing",
-        "Arab",
-        "ASEAN",
-        "Latin America",
-        "Caribbean",
-        "European",
-        "Union",
-        "East Asia",
-        "Central Asia",
-        "South Asia",
-        "Sub-Saharan",
-        "UNDP",
-        "region",
-        "Developed",
-        "Pacific",
-        "Small",
-    ]
+    best_score, best_key = scored[0]
+    best = COUNTRY_RESOLVER[best_key]
+    for score, candidate in scored[1:]:
+        if best_score - score >= FUZZY_MATCH_MARGIN:
+            break
+        if COUNTRY_RESOLVER[candidate][0] != best[0]:
+            return None
+    return best
 
-    # Create regex pattern to match any of the non-country patterns
-    non_country_regex = "|".join(non_country_patterns)
-    hdi_df = hdi_df[
-        ~hdi_df["country"].str.contains(non_country_regex, case=False, na=False)
-    ]
 
-    # Standardize country names and add country codes
-    hdi_df = standardize_country_names(hdi_df)
+def resolution_cache_version():
+    """
+    Fingerprint of everything a cached resolution depends on.
 
-    # Keep only records with valid country codes
-    hdi_df = hdi_df.dropna(subset=["country_code"])
+    Besides the resolver entries and thresholds, this includes TRANSFORM_VERSION,
+    so changes to the matching code (normalization, stopwords, token and trigram
+    scoring) also invalidate the memo.
+    """
+    payload = json.dumps(
+        [
+            TRANSFORM_VERSION,
+            sorted(COUNTRY_RESOLVER.items()),
+            FUZZY_MATCH_CANDIDATES,
+            FUZZY_MATCH_THRESHOLD,
+            FUZZY_MATCH_MARGIN,
+            FUZZY_TOKEN_THRESHOLD,
+            sorted(REGION_WORDS),
+        ]
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
 
-    return hdi_df[["country", "year", "hdi", "country_code"]]
 
+_resolution_memo = None
 
-def process_population_data():
-    """Process population data for all years"""
-    print("Processing population data...")
 
-    all_pop_data = []
-    years = range(2015, 2025)
+def load_resolution_memo():
+    """
+    Load memoized name resolutions, from the persistent cache file on first use.
 
-    for year in years:
-        file_path = POPULATION_DIR / f"population_{year}.csv"
-        if not file_path.exists():
-            print(f"Warning: No population data file found for {year}")
-            continue
+    The file is ignored when the stage cache is disabled or when the mappings or
+    fuzzy matching parameters have changed since it was written.
 
-        df = pd.read_csv(file_path)
-
-        # Extract country, male population, female population, and total population
-        # Look for the Location column for country names
-        if "Location" in df.columns:
-            # Check if PopDensity exists in the dataframe before selecting it
-            density_col = ["PopDensity"] if "PopDensity" in df.columns else []
-            pop_df = df[
-                ["Location", "PopMale", "PopFemale", "PopTotal"] + density_col
-            ].copy()
-
-            column_renames = {
-                "Location": "country",
-                "PopMale": "pop_male",
-                "PopFemale": "pop_female",
-                "PopTotal": "population",
-            }
+    Returns:
+        dict: Maps raw names to [standard_name, country_code] pairs
+    """
+    global _resolution_memo
+    if _resolution_memo is None:
+        _resolution_memo = {}
+        if CACHE_ENABLED and RESOLUTION_CACHE_PATH.exists():
+            with open(RESOLUTION_CACHE_PATH) as f:
+                cached = json.load(f)
+            if cached.get("version") == resolution_cache_version():
+                _resolution_memo = cached["resolutions"]
+    return _resolution_memo
 
-            # Add density if it exists
-            if "PopDensity" in df.columns:
-                column_renames["PopDensity"] = "population_density"
 
-            pop_df = pop_df.rename(columns=column_renames)
-        else:
-            print(f"Warning: Could not find Location column in {year} population data")
-            continue
+def save_resolution_memo():
+    """Persist the memoized name resolutions to the cache file"""
+    if not CACHE_ENABLED:
+        return
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = RESOLUTION_CACHE_PATH.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(
+            {"version": resolution_cache_version(), "resolutions": _resolution_memo},
+            f,
+            sort_keys=True,
+        )
+    os.replace(tmp_path, RESOLUTION_CACHE_PATH)
 
-        # Filter out non-country rows if possible
-        if "LocTypeName" in df.columns:
-            country_mask = df["LocTypeName"] == "Country/Area"
-            pop_df = pop_df[country_mask].copy()
 
-        # Add year column
-        pop_df["year"] = year
+def resolve_country_name(raw_name):
+    """
+    Resolve one raw country name to its standard name and ISO code.
 
-        # Standardize country names and add country codes
-        pop_df = standardize_country_names(pop_df)
+    Args:
+        raw_name: Raw country name
 
-        all_pop_data.append(pop_df)
+    Returns:
+        list: [standard_name, country_code]; unknown names are returned cleaned of
+            asterisks/extra whitespace with a None code
+    """
+    key = normalize_country_key(raw_name)
+    resolved = COUNTRY_RESOLVER.get(key)
+    if resolved is None:
+        resolved = fuzzy_match_country(key)
+        if resolved is not None:
+            print(f"Fuzzy matched country name '{raw_name}' to '{resolved[0]}'")
+    if resolved is None:
+        return [" ".join(raw_name.rstrip("*").split()), None]
+    return list(resolved)
 
-    # Combine all years
-    if all_pop_data:
-        # Get columns that exist in the first dataframe
-        columns_to_keep = ["country", "year", "country_code"]
-        for col in ["population", "pop_male", "pop_female", "population_density"]:
-            if col in all_pop_data[0].columns:
-                columns_to_keep.append(col)
 
-        combined_pop_df = pd.concat(all_pop_data, ignore_index=True)
-        return combined_pop_df[columns_to_keep]
-    else:
-        print("No population data found")
-        return pd.DataFrame()
+def resolve_country_names(names):
+    """
+    Resolve raw country names to standard names and ISO codes in one vectorized pass.
 
+    The column is factorized so that each distinct string is resolved only once,
+    after which the results are broadcast back to every row by position. Resolutions
+    are memoized across calls and runs (see load_resolution_memo), so only strings
+    never seen before go through the exact and fuzzy lookups.
 
-def merge_datasets():
-    """Merge all datasets on country and year"""
-    print("Merging all datasets...")
+    Args:
+        names: Sequence or Series of raw country names
 
-    # Get processed data
-    happiness_df = process_happiness_data()
-    hdi_df = process_hdi_data()
-    population_df = process_population_data()
+    Returns:
+        tuple: (standard_names, country_codes) as object arrays aligned with the input;
+            unknown names are returned cleaned of asterisks/extra whitespace with a NaN code
+    """
+    row_ids, uniques = pd.factorize(pd.Series(names, copy=False).astype(str))
 
-    # Merge happiness and HDI data
-    if not hdi_df.empty:
-        merged_df = pd.merge(
-            happiness_df, hdi_df, on=["country", "year", "country_code"], how="left"
-        )
-    else:
-        merged_df = happiness_df
+    memo = load_resolution_memo()
+    unique_names = np.empty(len(uniques), dtype=object)
+    unique_codes = np.full(len(uniques), np.nan, dtype=object)
+    added = False
+    for i, raw_name in enumerate(uniques):
+        resolved = memo.get(raw_name)
+        if resolved is None:
+            resolved = memo[raw_name] = resolve_country_name(raw_name)
+            added = True
+        unique_names[i], code = resolved
+        if code is not None:
+            unique_codes[i] = code
 
-    # Merge population data
-    if not population_df.empty:
-        merged_df = pd.merge(
-            merged_df, population_df, on=["country", "year", "country_code"], how="left"
-        )
+    if added:
+        save_resolution_memo()
 
-    # Fill missing values for better visualization
-    for col in [
-        "gdp_per_capita",
-        "social_support",
-        "life_expectancy",
-        "freedom",
-        "corruption",
-        "generosity",
-        "hdi",
-        "population",
-    ]:
-        if col in merged_df.columns:
-            # For each country, forward/backward fill missing values
-            # Use ffill() and bfill() instead of fillna(method='ffill') to avoid FutureWarning
-            merged_df[col] = merged_df.groupby("country")[col].transform(
-                lambda x: x.ffill().bfill()
-            )
+    return unique_names.take(row_ids), unique_codes.take(row_ids)
 
-    # Create continent mapping based on regions if continent column doesn't already exist
-    if "continent" not in merged_df.columns and "region" in merged_df.columns:
+
+def standardize_country_names(df, country_col="country"):
+    """
+    Standardize country names in a dataframe and add ISO country codes.
+
+    Args:
+        df: Pandas dataframe with a country column
+        country_col: Name of the country column (default: 'country')
+
+    Returns:
+        DataFrame with standardized country names and added 'country_code' column
+    """
+    names, codes = resolve_country_names(df[country_col])
+    df[country_col] = names
+    df["country_code"] = codes
+
+    # Log countries with missing codes
+    missing_codes = pd.unique(names[pd.isna(codes)])
+    if len(missing_codes) > 0:
+        print(f"Warning: Missing country codes for: {', '.join(missing_codes)}")
+
+    return df
+
+
+# Columns copied from a country's first record into the rows added for its missing
+# years; every other column of those rows is missing until filled
+GRID_IDENTITY_COLUMNS = ["country", "country_code", "region", "continent"]
+
+
+def handle_missing_happiness_scores(df, year_span=None):
+    """
+    Handle missing happiness scores using appropriate interpolation methods.
+
+    The panel is extended to the full (country x year) grid spanned by the data,
+    with rows for absent years that carry only the identity columns of each
+    country's first record and leave every measured value missing, so that
+    fill_gaps fills and flags the factors. Scores are then linearly interpolated
+    within each country, and any gaps left at the start or end of a series are
+    filled forward/backward.
+
+    Args:
+        df: DataFrame containing happiness data with potential missing values
+        year_span: Optional (first_year, last_year) grid bounds; defaults to the
+            years present in df
+
+    Returns:
+        DataFrame with interpolated missing values, ordered by country then year,
+            and an 'imputed' column with the bit of 'score' set where it was filled
+    """
+    print("Handling missing happiness scores...")
+
+    if df.empty:
+        return df.reset_index(drop=True)
+
+    # Build the complete (country x year) grid from the years present in the data
+    countries = df["country"].unique()
+    first_year, last_year = year_span or (df["year"].min(), df["year"].max())
+    all_years = range(int(first_year), int(last_year) + 1)
+    full_grid = pd.MultiIndex.from_product(
+        [countries, all_years], names=["country", "year"]
+    )
+    present = pd.MultiIndex.from_frame(df[["country", "year"]])
+    missing = full_grid[~full_grid.isin(present)]
+
+    # Rows for missing years copy the identity of the country's first record; all
+    # measured values are left missing
+    identity = [col for col in GRID_IDENTITY_COLUMNS if col in df.columns]
+    templates = df[identity].drop_duplicates("country").set_index("country")
+    filler = templates.loc[missing.get_level_values("country")].reset_index()
+    filler["year"] = missing.get_level_values("year")
+
+    result = pd.concat([df, filler.reindex(columns=df.columns)], ignore_index=True)
+
+    # Order by country (first appearance) then year; lexsort is stable for ties
+    country_ids = pd.factorize(result["country"])[0]
+    order = np.lexsort((result["year"].to_numpy(), country_ids))
+    result = result.iloc[order].reset_index(drop=True)
+    country_ids = country_ids[order]
+
+    # Grouped linear interpolation on row position, matching Series.interpolate,
+    # followed by forward/backward fill at the ends of each series
+    score = result["score"].to_numpy(dtype=float)
+    valid = ~np.isnan(score)
+    positions = np.arange(len(result), dtype=float)
+
+    by_country = pd.DataFrame(
+        {"pos": np.where(valid, positions, np.nan), "score": score}
+    ).groupby(country_ids)
+    prev = by_country.ffill().to_numpy()
+    nxt = by_country.bfill().to_numpy()
+    prev_pos, prev_score = prev[:, 0], prev[:, 1]
+    next_pos, next_score = nxt[:, 0], nxt[:, 1]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (next_score - prev_score) / (next_pos - prev_pos)
+        interpolated = slope * (positions - prev_pos) + prev_score
+
+    filled = np.where(
+        valid,
+        score,
+        np.where(
+            np.isnan(prev_pos),
+            next_score,
+            np.where(np.isnan(next_pos), prev_score, interpolated),
+        ),
+    )
+    result["score"] = filled
+    result["imputed"] = np.where(
+        ~valid & ~np.isnan(filled), 1 << IMPUTED_FIELDS.index("score"), 0
+    ).astype(IMPUTED_DTYPE)
+
+    print(
+        f"Filled {int((~valid & ~np.isnan(filled)).sum())} missing scores "
+        f"across {len(countries)} countries ({all_years[0]}-{all_years[-1]})"
+    )
+
+    return result
+
+
+# Standardize column names (they may differ slightly between years)
+HAPPINESS_COLUMN_MAPPING = {
+    "Country": "country",
+    "Country or region": "country",
+    "Country name": "country",
+    "Region": "region",
+    "Happiness Rank": "rank",
+    "Happiness Score": "score",
+    "Happiness.Score": "score",
+    "Happiness score": "score",
+    "happiness_score": "score",
+    "Score": "score",
+    "Ladder score": "score",
+    "Life Ladder": "score",
+    "GDP per capita": "gdp_per_capita",
+    "Economy..GDP.per.Capita.": "gdp_per_capita",
+    "Economy (GDP per Capita)": "gdp_per_capita",
+    "Explained by: GDP per capita": "gdp_per_capita",
+    "Log GDP per capita": "gdp_per_capita",
+    "gdp_per_capita": "gdp_per_capita",
+    "Social support": "social_support",
+    "Family": "social_support",
+    "Explained by: Social support": "social_support",
+    "social_support": "social_support",
+    "Health..Life.Expectancy.": "life_expectancy",
+    "Health (Life Expectancy)": "life_expectancy",
+    "Healthy Life Expectancy": "life_expectancy",
+    "Healthy life expectancy": "life_expectancy",
+    "Explained by: Healthy life expectancy": "life_expectancy",
+    "health": "life_expectancy",
+    "Freedom": "freedom",
+    "Freedom to make life choices": "freedom",
+    "Explained by: Freedom to make life choices": "freedom",
+    "freedom": "freedom",
+    "Trust..Government.Corruption.": "corruption",
+    "Trust (Government Corruption)": "corruption",
+    "Perceptions of corruption": "corruption",
+    "Explained by: Perceptions of corruption": "corruption",
+    "corruption": "corruption",
+    "Generosity": "generosity",
+    "Explained by: Generosity": "generosity",
+    "generosity": "generosity",
+    "Continent": "continent",
+    "continent": "continent",
+    "Dystopia Residual": "dystopia_residual",
+    "Explained by: Dystopia + residual": "dystopia_residual",
+    "dystopia_residual": "dystopia_residual",
+}
+
+# Columns kept from each yearly report, after renaming
+HAPPINESS_COLUMNS = [
+    "country",
+    "score",
+    "gdp_per_capita",
+    "social_support",
+    "life_expectancy",
+    "freedom",
+    "corruption",
+    "generosity",
+    "dystopia_residual",
+    "region",
+    "continent",
+]
+
+# Pinned dtypes for every raw header that yields a kept column (headers that are
+# already standard names pass through the mapping unchanged)
+HAPPINESS_DTYPES = {
+    raw: str if standard in ("country", "region", "continent") else "float64"
+    for raw, standard in [(col, col) for col in HAPPINESS_COLUMNS]
+    + list(HAPPINESS_COLUMN_MAPPING.items())
+    if standard in HAPPINESS_COLUMNS
+}
+
+# Raw population columns the pipeline keeps, with their pinned dtypes
+POPULATION_DTYPES = {
+    "LocTypeName": str,
+    "Location": str,
+    "PopMale": "float64",
+    "PopFemale": "float64",
+    "PopTotal": "float64",
+    "PopDensity": "float64",
+}
+
+# Number of threads used to parse per-year files concurrently
+INGEST_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def discover_years(directory, pattern):
+    """
+    Find the years for which a per-year file exists.
+
+    Args:
+        directory: Directory holding the per-year files
+        pattern: File name pattern with a '{year}' placeholder
+
+    Returns:
+        list: Sorted years with a matching file
+    """
+    prefix, suffix = pattern.split("{year}")
+    years = []
+    for path in directory.glob(pattern.replace("{year}", "*")):
+        year = path.name[len(prefix) : len(path.name) - len(suffix)]
+        if year.isdigit():
+            years.append(int(year))
+    return sorted(years)
+
+
+def read_yearly_files(read_year, years):
+    """
+    Parse per-year files concurrently in a thread pool.
+
+    Args:
+        read_year: Function parsing one year's file into a DataFrame (or None to skip it)
+        years: Years to read
+
+    Returns:
+        list: Parsed frames in year order
+    """
+    with ThreadPoolExecutor(max_workers=INGEST_WORKERS) as pool:
+        frames = list(pool.map(read_year, years))
+    return [df for df in frames if df is not None]
+
+
+@cached_stage(lambda year: [HAPPINESS_DIR / f"{year}_report.csv"])
+def read_happiness_year(year):
+    """Read one yearly happiness report, loading only the kept columns with pinned dtypes"""
+    df = pd.read_csv(
+        HAPPINESS_DIR / f"{year}_report.csv",
+        usecols=lambda col: col in HAPPINESS_DTYPES,
+        dtype=HAPPINESS_DTYPES,
+    )
+
+    # Rename columns based on mapping, keeping those not in the mapping
+    df = df.rename(columns=HAPPINESS_COLUMN_MAPPING)
+
+    # Keep only the columns we need, in their canonical order
+    df = df[[col for col in HAPPINESS_COLUMNS if col in df.columns]].copy()
+
+    # Add year column
+    df["year"] = year
+    return df
+
+
+def load_happiness_reports(years):
+    """
+    Read the yearly happiness reports and combine them into one standardized frame.
+
+    Args:
+        years: Report years to load
+
+    Returns:
+        DataFrame with one row per reported country and year, before gap filling
+    """
+    all_data = read_yearly_files(read_happiness_year, years)
+
+    # Combine all years into a single dataframe
+    combined_df = pd.concat(all_data, ignore_index=True)
+
+    # Standardize country names and add country codes in one pass over all years
+    combined_df = standardize_country_names(combined_df)
+
+    # Keep country_code next to year, where the per-year frames used to place it
+    columns = [col for col in combined_df.columns if col != "country_code"]
+    columns.insert(columns.index("year") + 1, "country_code")
+    return combined_df[columns]
+
+
+def complete_happiness_panel(combined_df, year_span=None):
+    """
+    Fill score gaps and region/continent information in combined happiness reports.
+
+    Every step works within a single country, so the panel for a subset of countries
+    is identical to the matching rows of the panel for all countries.
+
+    Args:
+        combined_df: Output of load_happiness_reports, optionally filtered by country
+        year_span: Optional (first_year, last_year) bounds of the full report range
+
+    Returns:
+        DataFrame with one row per country and year
+    """
+    # Handle missing happiness scores
+    combined_df = handle_missing_happiness_scores(combined_df, year_span)
+
+    # Handle region and continent information
+    if "region" not in combined_df.columns and "continent" in combined_df.columns:
+        # If we have continent but not region, create a region mapping from continent
+        continent_to_region = {
+            "Europe": "Western Europe",
+            "North America": "North America",
+            "Australia": "Australia and New Zealand",
+            "Oceania": "Australia and New Zealand",
+            "Asia": "Eastern Asia",
+            "South America": "Latin America and Caribbean",
+            "Africa": "Sub-Saharan Africa",
+        }
+        combined_df["region"] = combined_df["continent"].map(continent_to_region)
+    elif "region" in combined_df.columns and "continent" not in combined_df.columns:
+        # If we have region but not continent, create a continent mapping
         region_to_continent = {
             "Western Europe": "Europe",
             "North America": "North America",
@@ -800,287 +1301,2823 @@ def merge_datasets():
             "Eastern Asia": "Asia",
             "Sub-Saharan Africa": "Africa",
             "Southern Asia": "Asia",
+            "Central America": "North America",  # Added Central America mapping
         }
+        combined_df["continent"] = combined_df["region"].map(region_to_continent)
 
-        # Add continent column based on region mapping
-        merged_df["continent"] = merged_df["region"].map(region_to_continent)
+    # If we have region data for some countries, fill missing region data based on country-region mapping
+    if "region" in combined_df.columns:
+        # Create country-region mapping from non-null values
+        country_region_map = combined_df.dropna(subset=["region"])[
+            ["country", "region"]
+        ].drop_duplicates()
+        if not country_region_map.empty:
+            country_region_dict = country_region_map.set_index("country")[
+                "region"
+            ].to_dict()
+            # Fill missing region data
+            combined_df["region"] = combined_df.apply(
+                lambda row: (
+                    country_region_dict.get(row["country"])
+                    if pd.isna(row.get("region", None))
+                    else row.get("region", None)
+                ),
+                axis=1,
+            )
 
-    # Fix continent name standardization issues - correct any variants of Africa
-    if "continent" in merged_df.columns:
-        # Standardize continent names, particularly for Africa
-        continent_standardization = {
-            "Afria": "Africa",
-            "African": "Africa",
-            # Add any other continent variants that need standardization
-        }
+    return combined_df
 
-        merged_df["continent"] = merged_df["continent"].replace(
-            continent_standardization
+
+@profiled_stage
+@cached_stage(happiness_input_files)
+def process_happiness_data():
+    """Process happiness score data from all years and combine into one dataset"""
+    print("Processing happiness data...")
+
+    years = discover_years(HAPPINESS_DIR, "{year}_report.csv")
+    if not years:
+        print(f"Warning: No happiness data files found in {HAPPINESS_DIR}")
+        return pd.DataFrame()
+
+    reports = load_happiness_reports(years)
+    profile_note(rows_in=len(reports))
+    return complete_happiness_panel(reports)
+
+
+# Key columns of an OWID indicator file; the one remaining column holds the values
+HDI_KEY_DTYPES = {"Entity": str, "Code": str, "Year": "int64"}
+HDI_KEY_COLUMNS = {"Entity": "country", "Year": "year"}
+HDI_CHUNK_ROWS = 100_000
+
+# OWID codes that stand for a country rather than an aggregate
+OWID_COUNTRY_CODES = {"OWID_KOS"}
+
+
+def classify_entity_code(code):
+    """
+    Classify an OWID entity by its code.
+
+    Countries carry an ISO 3166-1 alpha-3 code. Aggregates such as World carry an
+    OWID_ code, and regions and groupings (continents, income groups, UNDP regions)
+    have no code at all.
+
+    Args:
+        code: Value of the Code column (may be NaN)
+
+    Returns:
+        str: 'country', 'aggregate' or 'region'
+    """
+    if not isinstance(code, str) or not code.strip():
+        return "region"
+    if code.startswith("OWID_") and code not in OWID_COUNTRY_CODES:
+        return "aggregate"
+    return "country"
+
+
+def read_hdi_countries(hdi_file, first_year=None, last_year=None):
+    """
+    Read the country rows of an OWID HDI file within a year window.
+
+    The value column is found from the CSV header: it is the column besides Entity,
+    Code and Year, whatever the release names it. The file is read in chunks and
+    each chunk is filtered on year and entity kind before it is kept, so rows
+    outside the window or for aggregates are never accumulated. Entity codes are
+    classified once per distinct code, and rows are selected with a single
+    membership test against the country codes seen so far.
+
+    Args:
+        hdi_file: Path to the HDI CSV
+        first_year: First year to keep (None: no lower bound)
+        last_year: Last year to keep (None: no upper bound)
+
+    Returns:
+        tuple: (DataFrame with 'country', 'Code', 'year' and 'hdi' columns, number of
+            rows read), or (None, 0) if the header has no single value column
+    """
+    header = list(pd.read_csv(hdi_file, nrows=0).columns)
+    value_columns = [col for col in header if col not in HDI_KEY_DTYPES]
+    missing = [col for col in HDI_KEY_DTYPES if col not in header]
+    if missing or len(value_columns) != 1:
+        print(
+            f"Warning: Expected Entity, Code, Year and one value column in {hdi_file}, "
+            f"found {header}"
         )
+        return None, 0
+    value_column = value_columns[0]
 
-    # Calculate additional metrics for analysis
-    if "population" in merged_df.columns and "score" in merged_df.columns:
-        # Create population-weighted happiness score by year
-        merged_df["weighted_score"] = merged_df["score"] * merged_df["population"]
+    entity_kinds = {}
+    country_codes = set()
+    kept = []
+    rows_read = 0
+    for chunk in pd.read_csv(
+        hdi_file,
+        usecols=[*HDI_KEY_DTYPES, value_column],
+        dtype={**HDI_KEY_DTYPES, value_column: "float64"},
+        chunksize=HDI_CHUNK_ROWS,
+    ):
+        rows_read += len(chunk)
+        for code in chunk["Code"].unique():
+            if code not in entity_kinds:
+                entity_kinds[code] = classify_entity_code(code)
+                if entity_kinds[code] == "country":
+                    country_codes.add(code)
+
+        in_window = chunk["Year"].between(
+            -np.inf if first_year is None else first_year,
+            np.inf if last_year is None else last_year,
+        )
+        kept.append(chunk[in_window & chunk["Code"].isin(country_codes)])
+
+    hdi_df = pd.concat(kept, ignore_index=True)
+    return hdi_df.rename(columns={**HDI_KEY_COLUMNS, value_column: "hdi"}), rows_read
+
+
+@profiled_stage
+@cached_stage(lambda first_year=None, last_year=None: hdi_input_files())
+def process_hdi_data(first_year=None, last_year=None):
+    """
+    Process Human Development Index data
+
+    Args:
+        first_year: First year to keep, normally the first year of the happiness
+            reports (None: no lower bound)
+        last_year: Last year to keep, normally the last year of the happiness
+            reports (None: no upper bound)
+    """
+    print("Processing HDI data...")
+
+    # Read the HDI data
+    hdi_file = HDI_DIR / "human-development-index.csv"
+    if not hdi_file.exists():
+        print(f"Warning: HDI data file not found at {hdi_file}")
+        return pd.DataFrame()
+
+    # Keep country rows for the years we're interested in; regions, income groups
+    # and other aggregates are recognized by their missing or OWID_ codes
+    hdi_df, rows_read = read_hdi_countries(hdi_file, first_year, last_year)
+    profile_note(rows_in=rows_read)
+    if hdi_df is None:
+        return pd.DataFrame()
+
+    # Standardize country names and add country codes
+    hdi_df = standardize_country_names(hdi_df)
+
+    # Keep only records with valid country codes
+    hdi_df = hdi_df.dropna(subset=["country_code"])
+
+    return hdi_df[["country", "year", "hdi", "country_code"]]
+
+
+@cached_stage(lambda year: [POPULATION_DIR / f"population_{year}.csv"])
+def read_population_year(year):
+    """Read one yearly population file, loading only the kept columns with pinned dtypes"""
+    df = pd.read_csv(
+        POPULATION_DIR / f"population_{year}.csv",
+        usecols=lambda col: col in POPULATION_DTYPES,
+        dtype=POPULATION_DTYPES,
+    )
+
+    # Extract country, male population, female population, and total population
+    # Look for the Location column for country names
+    if "Location" not in df.columns:
+        print(f"Warning: Could not find Location column in {year} population data")
+        return None
+
+    column_renames = {
+        "Location": "country",
+        "PopMale": "pop_male",
+        "PopFemale": "pop_female",
+        "PopTotal": "population",
+        "PopDensity": "population_density",
+    }
+    pop_df = df[[col for col in column_renames if col in df.columns]].rename(
+        columns=column_renames
+    )
+
+    # Filter out non-country rows if possible
+    if "LocTypeName" in df.columns:
+        pop_df = pop_df[df["LocTypeName"] == "Country/Area"]
+
+    # Add year column
+    pop_df["year"] = year
+    return pop_df
+
+
+def load_population_reports(years):
+    """
+    Read the yearly population files and combine them into one standardized frame.
+
+    Args:
+        years: Population years to load
+
+    Returns:
+        DataFrame with one row per country and year
+    """
+    all_pop_data = read_yearly_files(read_population_year, years)
+
+    # Combine all years
+    if all_pop_data:
+        # Get columns that exist in the first dataframe
+        columns_to_keep = ["country", "year", "country_code"]
+        for col in ["population", "pop_male", "pop_female", "population_density"]:
+            if col in all_pop_data[0].columns:
+                columns_to_keep.append(col)
+
+        combined_pop_df = pd.concat(all_pop_data, ignore_index=True)
+
+        # Standardize country names and add country codes in one pass over all years
+        combined_pop_df = standardize_country_names(combined_pop_df)
+        return combined_pop_df[columns_to_keep]
+    else:
+        print("No population data found")
+        return pd.DataFrame()
+
+
+@profiled_stage
+@cached_stage(population_input_files)
+def process_population_data():
+    """Process population data for all years"""
+    print("Processing population data...")
+
+    population_df = load_population_reports(
+        discover_years(POPULATION_DIR, "population_{year}.csv")
+    )
+    profile_note(rows_in=len(population_df))
+    return population_df
+
+
+@profiled_stage
+@cached_stage(all_input_files)
+def merge_datasets():
+    """Merge all datasets on country and year"""
+    print("Merging all datasets...")
+
+    # Get processed data
+    happiness_df = process_happiness_data()
+    year_span = (
+        (int(happiness_df["year"].min()), int(happiness_df["year"].max()))
+        if not happiness_df.empty
+        else (None, None)
+    )
+    sources = [happiness_df, process_hdi_data(*year_span), process_population_data()]
+    profile_note(rows_in=sum(len(df) for df in sources))
+    return merge_frames(*sources)
+
+
+# Keys shared by every processed source
+PANEL_KEYS = ["country", "year", "country_code"]
+
+
+def build_country_dimension(frames):
+    """
+    Build the country dimension table of the sources to merge.
+
+    Rows are keyed on the resolved country: every row with a country code takes the
+    name of the first row carrying that code, so a country the sources spell
+    differently (e.g. "Democratic Republic of Congo" in the HDI data) still joins,
+    and rows without a code are keyed on their own name. Every resolved country gets
+    a dense integer id in order of first appearance. The ids of all frames are
+    assigned in the same single pass over their keys.
+
+    Args:
+        frames: Processed source frames with country and country_code columns
+
+    Returns:
+        tuple: (DataFrame of country and country_code indexed by country_id,
+            list with the country id array of each frame)
+    """
+    keys = pd.concat(
+        [df[["country", "country_code"]] for df in frames], ignore_index=True
+    )
+    name_ids, names = pd.factorize(keys["country"])
+    code_ids, codes = pd.factorize(keys["country_code"])
+
+    # Name of the first row of every code; writing in reverse leaves the first in
+    # place. Missing codes factorize to -1 and keep their own name.
+    coded = np.flatnonzero(code_ids >= 0)[::-1]
+    code_names = np.full(len(codes), -1, dtype=np.int64)
+    code_names[code_ids[coded]] = name_ids[coded]
+    resolved = np.where(code_ids >= 0, code_names[code_ids], name_ids)
+    ids, unique_names = pd.factorize(resolved)
+
+    # Code of every country, from the first of its rows that has one
+    country_codes = np.full(len(unique_names), -1, dtype=np.int64)
+    country_codes[ids[coded]] = code_ids[coded]
+    dimension = pd.DataFrame(
+        {
+            "country": names.take(unique_names),
+            "country_code": codes.take(
+                country_codes, allow_fill=True, fill_value=np.nan
+            ),
+        }
+    ).rename_axis("country_id")
+
+    bounds = np.cumsum([0] + [len(df) for df in frames])
+    return dimension, [ids[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def align_sources(panel, panel_ids, sources, source_ids, country_count):
+    """
+    Left-join sources onto a panel by positional alignment on (country id, year).
+
+    Panel rows are keyed once by their (country id, year) cell of a dense lookup
+    array; each source is then joined with one pass over its own rows and one gather
+    over the panel, so the cost stays linear however many sources are joined. Like
+    pd.merge(how="left") on PANEL_KEYS, source rows outside the panel are dropped and
+    panel rows without a source row get missing values. A source should hold at most
+    one row per country and year; of duplicates, the first row is used.
+
+    Args:
+        panel: Frame defining the rows of the result (the happiness panel)
+        panel_ids: Country id of every panel row
+        sources: Frames whose non-key columns are appended, in order
+        source_ids: Country id arrays of the sources
+        country_count: Number of rows of the country dimension table
+
+    Returns:
+        DataFrame: The panel rows with the source columns appended
+    """
+    panel = panel.reset_index(drop=True)
+    first_year = int(panel["year"].min())
+    span = int(panel["year"].max()) - first_year + 1
+    panel_cells = panel_ids * span + (panel["year"].to_numpy() - first_year)
+
+    columns = [panel]
+    for source, ids in zip(sources, source_ids):
+        if source.empty:
+            continue
+        source = source.reset_index(drop=True)
+        years = source["year"].to_numpy() - first_year
+        rows = np.flatnonzero((years >= 0) & (years < span))
+        cells = ids[rows] * span + years[rows]
+
+        unique_cells = np.unique(cells)
+        if len(unique_cells) < len(cells):
+            print(
+                f"Warning: {len(cells) - len(unique_cells)} duplicate country-year "
+                f"rows for {', '.join(c for c in source.columns if c not in PANEL_KEYS)}"
+                "; using the first of each"
+            )
+
+        # Source row of every cell, -1 where there is none; writing in reverse
+        # leaves the first of any duplicate rows in place
+        source_rows = np.full(country_count * span, -1, dtype=np.int64)
+        source_rows[cells[::-1]] = rows[::-1]
+
+        # Label -1 is absent from the source index and reindexes to missing values
+        values = source.drop(columns=PANEL_KEYS).reindex(source_rows[panel_cells])
+        columns.append(values.set_axis(panel.index))
+
+    return pd.concat(columns, axis=1)
+
+
+# Gap filling strategy per field of IMPUTED_FIELDS, applied within each country:
+# "linear" interpolates between the surrounding years with values and carries the
+# nearest value beyond them, "carry" carries the last value forward and the first
+# one backward, and "none" leaves the gaps missing
+FILL_STRATEGIES = {
+    "gdp_per_capita": "carry",
+    "social_support": "carry",
+    "life_expectancy": "carry",
+    "freedom": "carry",
+    "corruption": "carry",
+    "generosity": "carry",
+    "hdi": "linear",
+    "population": "linear",
+    # Interpolated with the year grid by handle_missing_happiness_scores
+    "score": "none",
+}
+IMPUTED_DTYPE = np.min_scalar_type((1 << len(IMPUTED_FIELDS)) - 1)
+
+
+def fill_gaps(df):
+    """
+    Fill missing values within each country following FILL_STRATEGIES.
+
+    All filled columns go through a single grouped ffill and bfill. For linear
+    interpolation the year of every value is carried along with it, so each gap is
+    interpolated from the values and years on either side.
+
+    Args:
+        df: Merged panel, with the rows of each country in year order
+
+    Returns:
+        DataFrame: The panel with its gaps filled and an 'imputed' column, a bitmask
+            with bit i set where IMPUTED_FIELDS[i] was filled in
+    """
+    fields = [
+        field
+        for field in IMPUTED_FIELDS
+        if field in df.columns and FILL_STRATEGIES.get(field, "none") != "none"
+    ]
+    linear = [field for field in fields if FILL_STRATEGIES[field] == "linear"]
+
+    values = df[fields]
+    missing = values.isna().to_numpy()
+    years = df["year"].to_numpy(dtype=np.float64)
+    carried = values.assign(
+        **{
+            f"{field}_year": np.where(missing[:, fields.index(field)], np.nan, years)
+            for field in linear
+        }
+    )
+    grouped = carried.groupby(pd.factorize(df["country"])[0], sort=False)
+    before, after = grouped.ffill(), grouped.bfill()
+    filled = before[fields].fillna(after[fields])
+
+    for field in linear:
+        start, stop = before[f"{field}_year"], after[f"{field}_year"]
+        interpolated = before[field] + (after[field] - before[field]) * (
+            (years - start) / (stop - start)
+        )
+        filled[field] = filled[field].mask(stop > start, interpolated)
+
+    df[fields] = filled
+    imputed = missing & filled.notna().to_numpy()
+    bits = np.array([1 << IMPUTED_FIELDS.index(field) for field in fields], dtype=int)
+    # Bits set by earlier stages (the score of handle_missing_happiness_scores) stay
+    previous = df["imputed"].to_numpy() if "imputed" in df.columns else 0
+    df["imputed"] = ((imputed @ bits) | previous).astype(IMPUTED_DTYPE)
+    return df
+
+
+def merge_frames(happiness_df, hdi_df, population_df):
+    """
+    Merge processed happiness, HDI and population frames and derive analysis columns.
+
+    Args:
+        happiness_df: Output of process_happiness_data
+        hdi_df: Output of process_hdi_data
+        population_df: Output of process_population_data
+
+    Returns:
+        DataFrame with one row per country and year of the happiness panel
+    """
+    # Join HDI and population data onto the happiness panel by integer country id
+    sources = [hdi_df, population_df]
+    dimension, (panel_ids, *source_ids) = build_country_dimension(
+        [happiness_df] + sources
+    )
+    merged_df = align_sources(
+        happiness_df, panel_ids, sources, source_ids, len(dimension)
+    )
+
+    # Fill missing values for better visualization
+    merged_df = fill_gaps(merged_df)
+
+    # Create continent mapping based on regions if continent column doesn't already exist
+    if "continent" not in merged_df.columns and "region" in merged_df.columns:
+        region_to_continent = {
+            "Western Europe": "Europe",
+            "North America": "North America",
+            "Australia and New Zealand": "Oceania",
+            "Middle East and Northern Africa": "Asia",
+            "Latin America and Caribbean": "South America",
+            "Southeastern Asia": "Asia",
+            "Central and Eastern Europe": "Europe",
+            "Eastern Asia": "Asia",
+            "Sub-Saharan Africa": "Africa",
+            "Southern Asia": "Asia",
+        }
+
+        # Add continent column based on region mapping
+        merged_df["continent"] = merged_df["region"].map(region_to_continent)
+
+    # Fix continent name standardization issues - correct any variants of Africa
+    if "continent" in merged_df.columns:
+        # Standardize continent names, particularly for Africa
+        continent_standardization = {
+            "Afria": "Africa",
+            "African": "Africa",
+            # Add any other continent variants that need standardization
+        }
+
+        merged_df["continent"] = merged_df["continent"].replace(
+            continent_standardization
+        )
+
+    # Calculate additional metrics for analysis
+    if "population" in merged_df.columns and "score" in merged_df.columns:
+        # Create population-weighted happiness score by year
+        merged_df["weighted_score"] = merged_df["score"] * merged_df["population"]
+
+        # Create a new population size category column for analysis
+        pop_bins = [0, 10e3, 50e3, 100e3, 500e3, float("inf")]
+        pop_labels = [
+            "Very Small (<10M)",
+            "Small (10-50M)",
+            "Medium (50-100M)",
+            "Large (100-500M)",
+            "Very Large (>500M)",
+        ]
+        merged_df["population_category"] = pd.cut(
+            merged_df["population"], bins=pop_bins, labels=pop_labels
+        )
+
+    # Add development category based on HDI if available
+    if "hdi" in merged_df.columns:
+        hdi_bins = [0, 0.55, 0.7, 0.8, 1.0]
+        hdi_labels = ["Low", "Medium", "High", "Very High"]
+        merged_df["development_category"] = pd.cut(
+            merged_df["hdi"], bins=hdi_bins, labels=hdi_labels
+        )
+
+    # Convert year column to integer to avoid int64 serialization issues
+    merged_df["year"] = merged_df["year"].astype(int)
+    merged_df["imputed"] = merged_df.pop("imputed")
+
+    return compact_panel(merged_df)
+
+
+# Compact in-memory schema of the merged panel. Factor scores are held at the 3
+# decimals they are exported with, which float32 represents exactly enough to round
+# back to the same values; population figures need more digits and stay float64.
+CATEGORICAL_COLUMNS = ["country", "country_code", "region", "continent"]
+FACTOR_COLUMNS = [
+    "score",
+    "gdp_per_capita",
+    "social_support",
+    "life_expectancy",
+    "freedom",
+    "generosity",
+    "corruption",
+    "dystopia_residual",
+    "hdi",
+]
+YEAR_DTYPE = "int16"
+
+
+def compact_panel(df):
+    """
+    Convert the merged panel to its compact schema.
+
+    Repeated strings become categoricals, factor scores become float32 (rounded to
+    3 decimals first) and the year becomes a small integer. Columns already in
+    their compact type are left as they are.
+
+    Args:
+        df: Merged panel
+
+    Returns:
+        DataFrame: The same panel using a fraction of the memory
+    """
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    for col in FACTOR_COLUMNS:
+        if col in df.columns and df[col].dtype != "float32":
+            df[col] = df[col].round(3).astype("float32")
+    if "year" in df.columns:
+        df["year"] = df["year"].astype(YEAR_DTYPE)
+    return df
+
+
+def round_for_export(data):
+    """Round numerical columns to 3 decimal places to reduce file size"""
+    # float32 factors are widened first so they serialize as their 3-decimal values
+    numeric_cols = data.select_dtypes(include=["float64", "float32"]).columns
+    for col in numeric_cols:
+        data[col] = data[col].astype("float64").round(3)
+    return data
+
+
+def json_records(df):
+    """Convert a frame to records for json.dump, writing missing values as null"""
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+# Scale applied to float columns in the columnar export; matches the 3-decimal rounding
+COLUMNAR_SCALE = 1000
+
+
+def encode_columnar(df):
+    """
+    Encode a frame as one array per column for compact JSON export.
+
+    String and categorical columns are dictionary-encoded: each distinct value is
+    stored once and rows hold its integer id (-1 for missing). Float columns, already
+    rounded to 3 decimals, are stored as integers scaled by COLUMNAR_SCALE. Integer
+    columns are stored as-is. Missing numbers are null.
+
+    Args:
+        df: Rounded dataset to encode
+
+    Returns:
+        dict: Payload following the columnar format read by decode_columnar
+    """
+    columns = []
+    for name in df.columns:
+        series = df[name]
+        if isinstance(series.dtype, pd.CategoricalDtype) and series.cat.ordered:
+            columns.append(
+                {
+                    "name": name,
+                    "encoding": "dictionary",
+                    "dictionary": [str(value) for value in series.cat.categories],
+                    "codes": series.cat.codes.tolist(),
+                }
+            )
+        elif series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype):
+            # Unordered categoricals are encoded like strings, in order of appearance
+            codes, uniques = pd.factorize(series)
+            columns.append(
+                {
+                    "name": name,
+                    "encoding": "dictionary",
+                    "dictionary": [str(value) for value in uniques],
+                    "codes": codes.tolist(),
+                }
+            )
+        elif pd.api.types.is_float_dtype(series.dtype):
+            scaled = np.rint(series.to_numpy() * COLUMNAR_SCALE)
+            columns.append(
+                {
+                    "name": name,
+                    "encoding": "scaled",
+                    "scale": COLUMNAR_SCALE,
+                    "values": [
+                        None if np.isnan(value) else int(value) for value in scaled
+                    ],
+                }
+            )
+        else:
+            columns.append(
+                {"name": name, "encoding": "plain", "values": series.tolist()}
+            )
+
+    return {"format": "columnar", "version": 1, "length": len(df), "columns": columns}
+
+
+def decode_columnar(payload):
+    """
+    Decode a columnar payload back into records.
+
+    This is the reference for the decoder contract; the web application does not
+    load the columnar export, and benchmarks/bench_export_formats.py times a
+    JavaScript port of this function.
+
+    Args:
+        payload: Output of encode_columnar (after a JSON round trip)
+
+    Returns:
+        list: One dict per row, as produced by to_json(orient="records")
+    """
+    names = []
+    arrays = []
+    for column in payload["columns"]:
+        names.append(column["name"])
+        if column["encoding"] == "dictionary":
+            dictionary = column["dictionary"]
+            arrays.append(
+                [dictionary[code] if code >= 0 else None for code in column["codes"]]
+            )
+        elif column["encoding"] == "scaled":
+            scale = column["scale"]
+            arrays.append(
+                [None if value is None else value / scale for value in column["values"]]
+            )
+        else:
+            arrays.append(column["values"])
+
+    return [dict(zip(names, row)) for row in zip(*arrays)]
+
+
+# Every exported file gets pre-compressed siblings that static hosts can serve directly;
+# brotli is optional and its .br copies are skipped when it is not installed
+EXPORT_MANIFEST = "export_manifest.json"
+COMPRESSED_SIBLINGS = {"gzip": ".gz", "br": ".br"}
+BROTLI_AVAILABLE = importlib.util.find_spec("brotli") is not None
+
+# Brotli's maximum quality compresses at well under 1 MB/s; files above this size
+# use a quality that is an order of magnitude faster for slightly larger output
+BROTLI_QUALITY = 11
+BROTLI_LARGE_FILE_BYTES = 2 << 20
+BROTLI_LARGE_FILE_QUALITY = 9
+
+# Watch mode leaves out the .br siblings of changed files (removing stale ones), as
+# brotli takes most of a rebuild; the next regular export writes the missing ones
+DEFER_BROTLI = False
+
+# Files published by the current export_data run, for the export manifest
+_exported_files = {}
+
+
+def file_sha256(path):
+    """SHA-256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_compressed(source, target, encoding):
+    """
+    Compress a file at the maximum level (for brotli, up to BROTLI_LARGE_FILE_BYTES).
+
+    The gzip header carries no file name or timestamp, so identical inputs always
+    produce identical compressed files.
+
+    Args:
+        source: File to compress
+        target: Compressed file to write
+        encoding: 'gzip' or 'br'
+    """
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        if encoding == "gzip":
+            with gzip.GzipFile(
+                filename="", mode="wb", fileobj=dst, compresslevel=9, mtime=0
+            ) as out:
+                for block in iter(lambda: src.read(1 << 20), b""):
+                    out.write(block)
+        else:
+            import brotli
+
+            large = os.path.getsize(source) > BROTLI_LARGE_FILE_BYTES
+            compressor = brotli.Compressor(
+                quality=BROTLI_LARGE_FILE_QUALITY if large else BROTLI_QUALITY
+            )
+            for block in iter(lambda: src.read(1 << 20), b""):
+                dst.write(compressor.process(block))
+            dst.write(compressor.finish())
+
+
+@contextlib.contextmanager
+def open_output(relative_path):
+    """
+    Open an exported file for writing, replacing it only if its content changes.
+
+    The content is written to a temporary file and hashed. If the existing file has
+    the same SHA-256 it is left untouched (keeping its modification time, so
+    downstream caches and rebuilds are not invalidated); otherwise the compressed
+    siblings are refreshed and the file is atomically replaced. The file is
+    recorded in the export manifest either way.
+
+    Args:
+        relative_path: Path of the file relative to OUTPUT_DIR
+
+    Yields:
+        Text file object to write the content to
+    """
+    path = OUTPUT_DIR / relative_path
+    os.makedirs(path.parent, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        with open(tmp_path, "w") as f:
+            yield f
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    digest = file_sha256(tmp_path)
+    size = tmp_path.stat().st_size
+    unchanged = (
+        path.exists() and path.stat().st_size == size and file_sha256(path) == digest
+    )
+    source = path if unchanged else tmp_path
+
+    entry = {"sha256": digest, "bytes": size}
+    for encoding, extension in COMPRESSED_SIBLINGS.items():
+        if encoding == "br" and not BROTLI_AVAILABLE:
+            continue
+        sibling = path.with_name(path.name + extension)
+        if encoding == "br" and DEFER_BROTLI and not (unchanged and sibling.exists()):
+            sibling.unlink(missing_ok=True)
+            continue
+        # Siblings are replaced before the file itself, so an interrupted run is
+        # redone in full by the next one
+        if not unchanged or not sibling.exists():
+            sibling_tmp = sibling.with_name(f".{sibling.name}.tmp")
+            write_compressed(source, sibling_tmp, encoding)
+            os.replace(sibling_tmp, sibling)
+        entry[encoding] = sibling.stat().st_size
+
+    if unchanged:
+        tmp_path.unlink()
+    else:
+        os.replace(tmp_path, path)
+
+    entry["changed"] = not unchanged
+    _exported_files[Path(relative_path).as_posix()] = entry
+
+
+def write_output(relative_path, text):
+    """Write an exported file to the output directory (see open_output)"""
+    with open_output(relative_path) as f:
+        f.write(text)
+
+
+def remove_output(relative_path):
+    """Delete an exported file that is no longer produced, with its compressed siblings"""
+    path = OUTPUT_DIR / relative_path
+    for extension in ["", *COMPRESSED_SIBLINGS.values()]:
+        path.with_name(path.name + extension).unlink(missing_ok=True)
+
+
+def write_export_manifest():
+    """
+    Write the manifest of the files published by the current export.
+
+    Each file is listed with its SHA-256, size and compressed sizes. Its 'hash' is
+    a short content hash a static host or client can use to version the file's URL
+    and serve it with long-lived cache headers.
+
+    Returns:
+        dict: The manifest that was written
+    """
+    files = {}
+    changed = 0
+    for name, entry in sorted(_exported_files.items()):
+        entry = dict(entry)
+        changed += entry.pop("changed")
+        files[name] = {"hash": entry["sha256"][:16], **entry}
+
+    manifest = {
+        "version": 1,
+        "encodings": [
+            encoding
+            for encoding in COMPRESSED_SIBLINGS
+            if encoding != "br" or BROTLI_AVAILABLE
+        ],
+        "files": files,
+    }
+    write_output(EXPORT_MANIFEST, json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+    print(
+        f"Exported {len(files)} files "
+        f"({changed} changed, {len(files) - changed} unchanged)"
+    )
+    return manifest
+
+
+def previous_manifest_entries():
+    """
+    Entries of the files listed in the current export manifest that still exist.
+
+    Returns:
+        dict: Relative path -> entry, in the form open_output records them
+    """
+    path = OUTPUT_DIR / EXPORT_MANIFEST
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        files = json.load(f)["files"]
+    return {
+        name: {
+            **{key: value for key, value in entry.items() if key != "hash"},
+            "changed": False,
+        }
+        for name, entry in files.items()
+        if name != EXPORT_MANIFEST and (OUTPUT_DIR / name).exists()
+    }
+
+
+# Sharded export: per-year and per-country slices of happiness_data plus a manifest
+SHARD_DIR = OUTPUT_DIR / "shards"
+
+
+def export_shards(data):
+    """
+    Write the dataset as per-year and per-country shards with a manifest.
+
+    Each shard holds the same records as happiness_data.json, restricted to one year
+    (shards/by_year/2024.json) or one country (shards/by_country/FIN.json), so a client
+    fetches only the slices it displays. Indicators stay as columns inside each shard,
+    so the shard count grows with years and countries only. shards/manifest.json lists
+    every shard with its row count, size and SHA-256 hash; shards that are no longer
+    produced are removed.
+
+    Args:
+        data: Rounded dataset to shard
+
+    Returns:
+        dict: The manifest that was written
+    """
+    # Countries without an ISO code are keyed by their name instead
+    shard_keys = {
+        "by_year": data["year"].astype(str),
+        "by_country": data["country_code"]
+        .astype(object)
+        .fillna(data["country"].astype(object))
+        .astype(str),
+    }
+
+    manifest = {"version": 1, "columns": list(data.columns), "shards": {}}
+    for kind, keys in shard_keys.items():
+        shard_dir = SHARD_DIR / kind
+        os.makedirs(shard_dir, exist_ok=True)
+
+        entries = {}
+        for key, shard in data.groupby(keys, sort=True):
+            payload = shard.to_json(orient="records")
+            filename = f"{key.replace('/', '_')}.json"
+            write_output(f"shards/{kind}/{filename}", payload)
+            payload = payload.encode()
+            entries[key] = {
+                "path": f"{kind}/{filename}",
+                "rows": int(len(shard)),
+                "bytes": len(payload),
+                "sha256": hashlib.sha256(payload).hexdigest(),
+            }
+
+        written = {Path(entry["path"]).name for entry in entries.values()}
+        for stale in shard_dir.glob("*.json"):
+            if stale.name not in written:
+                remove_output(f"shards/{kind}/{stale.name}")
+
+        manifest["shards"][kind] = entries
+
+    write_output("shards/manifest.json", json.dumps(manifest))
+
+    return manifest
+
+
+# Rows converted to records at a time when streaming time_series.json
+TIME_SERIES_BATCH_ROWS = 50_000
+
+
+def country_series_bounds(data):
+    """
+    Locate each country's time series in a single sorted pass.
+
+    Args:
+        data: Dataset with 'country' and 'year' columns
+
+    Returns:
+        tuple: (order, countries, bounds) where order sorts the rows by country (in
+            first-appearance order) then year, and bounds[i]:bounds[i + 1] is the
+            slice of the sorted rows belonging to countries[i]
+    """
+    country_ids, countries = pd.factorize(data["country"])
+    order = np.lexsort((data["year"].to_numpy(), country_ids))
+    sorted_ids = country_ids[order]
+    starts = np.flatnonzero(np.diff(sorted_ids)) + 1
+    bounds = np.concatenate([[0], starts, [len(sorted_ids)]]).astype(int)
+    return order, countries[sorted_ids[bounds[:-1]]], bounds
+
+
+def write_time_series(data, relative_path):
+    """
+    Stream time series data by country to a JSON object of {country: [records]}.
+
+    Countries are written one at a time, and records are materialized for at most
+    TIME_SERIES_BATCH_ROWS rows at once, so the whole mapping is never held in memory.
+
+    Args:
+        data: Rounded dataset
+        relative_path: Output file path relative to OUTPUT_DIR
+    """
+    order, countries, bounds = country_series_bounds(data)
+    sorted_data = data.iloc[order]
+
+    with open_output(relative_path) as f:
+        f.write("{")
+        group = 0
+        while group < len(countries):
+            # Convert a batch of whole countries to records in one call
+            last = int(
+                np.searchsorted(bounds, bounds[group] + TIME_SERIES_BATCH_ROWS, "right")
+            )
+            last = min(max(last - 1, group + 1), len(countries))
+            batch_start = bounds[group]
+            records = json_records(sorted_data.iloc[batch_start : bounds[last]])
+
+            for i in range(group, last):
+                if i:
+                    f.write(", ")
+                f.write(json.dumps(countries[i]))
+                f.write(": ")
+                f.write(
+                    json.dumps(
+                        records[bounds[i] - batch_start : bounds[i + 1] - batch_start]
+                    )
+                )
+            group = last
+        f.write("}")
+
+
+def write_time_series_offsets(data, relative_path):
+    """
+    Write each country's time series as a [start, stop) row range into happiness_data.json.
+
+    Args:
+        data: Rounded dataset, already grouped by country and sorted by year, in the
+            order it is written to happiness_data.json
+        relative_path: Output file path relative to OUTPUT_DIR
+    """
+    _, countries, bounds = country_series_bounds(data)
+    offsets = {
+        "source": "happiness_data.json",
+        "countries": {
+            country: [int(bounds[i]), int(bounds[i + 1])]
+            for i, country in enumerate(countries)
+        },
+    }
+    write_output(relative_path, json.dumps(offsets))
+
+
+# Choropleth map artifacts: the world-map.json topology joined with the per-year
+# values of MAP_FIELDS, at several simplification levels under maps/. Each level is
+# (minimum zoom, Douglas-Peucker tolerance in degrees, quantization grid size).
+MAP_SOURCE = "world-map.json"
+MAP_DIR = "maps"
+MAP_FIELDS = [
+    "score",
+    "gdp_per_capita",
+    "social_support",
+    "life_expectancy",
+    "freedom",
+    "generosity",
+    "corruption",
+]
+MAP_LEVELS = {
+    "low": (1, 0.5, 2_000),
+    "medium": (1.7, 0.15, 8_000),
+    "high": (3, 0.0, 100_000),
+}
+
+# Abbreviations used in the map's country names (Natural Earth), expanded before
+# the names are resolved to country codes
+MAP_NAME_ABBREVIATIONS = {
+    "Dem.": "Democratic",
+    "Eq.": "Equatorial",
+    "Fr.": "French",
+    "Herz.": "Herzegovina",
+    "Is.": "Islands",
+    "N.": "North",
+    "Rep.": "Republic",
+    "S.": "South",
+    "W.": "Western",
+}
+
+
+def decode_arcs(topology):
+    """Absolute coordinates of every arc of a quantized, delta-encoded topology"""
+    scale = np.array(topology["transform"]["scale"])
+    translate = np.array(topology["transform"]["translate"])
+    return [
+        np.cumsum(np.array(arc, dtype=np.int64), axis=0) * scale + translate
+        for arc in topology["arcs"]
+    ]
+
+
+def simplify_arc(points, tolerance):
+    """
+    Simplify an arc with the Douglas-Peucker algorithm.
+
+    The endpoints are always kept, so arcs shared by neighbouring countries stay
+    joined. Closed arcs (rings) keep at least the point farthest from the start and
+    the farthest point on either side of that chord, so no ring collapses below a
+    quadrilateral.
+
+    Args:
+        points: (n, 2) array of coordinates
+        tolerance: Maximum distance of a dropped point from the simplified line
+
+    Returns:
+        ndarray: The kept points, in order
+    """
+    if tolerance <= 0 or len(points) <= 2:
+        return points
+
+    def distances(start, stop):
+        inner = points[start + 1 : stop] - points[start]
+        dx, dy = points[stop] - points[start]
+        length = np.hypot(dx, dy)
+        if length == 0:
+            return np.hypot(inner[:, 0], inner[:, 1])
+        return np.abs(dx * inner[:, 1] - dy * inner[:, 0]) / length
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    spans = [(0, len(points) - 1)]
+    if np.array_equal(points[0], points[-1]):
+        far = int(np.argmax(np.hypot(*(points - points[0]).T)))
+        keep[far] = True
+        spans = []
+        for start, stop in ((0, far), (far, len(points) - 1)):
+            if stop - start >= 2:
+                mid = start + 1 + int(np.argmax(distances(start, stop)))
+                keep[mid] = True
+                spans += [(start, mid), (mid, stop)]
+
+    while spans:
+        start, stop = spans.pop()
+        if stop - start < 2:
+            continue
+        offsets = distances(start, stop)
+        i = int(np.argmax(offsets))
+        if offsets[i] > tolerance:
+            keep[start + 1 + i] = True
+            spans += [(start, start + 1 + i), (start + 1 + i, stop)]
+    return points[keep]
+
+
+def encode_arcs(arcs, bbox, quantization):
+    """
+    Quantize arcs to a grid over bbox and delta-encode them as TopoJSON arcs.
+
+    Points that fall in the same grid cell as their predecessor are dropped.
+
+    Args:
+        arcs: Arrays of absolute coordinates
+        bbox: [min_x, min_y, max_x, max_y] covering every arc
+        quantization: Number of grid positions along each axis
+
+    Returns:
+        tuple: (transform, arcs) of the quantized topology
+    """
+    low, high = np.array(bbox[:2]), np.array(bbox[2:])
+    scale = (high - low) / (quantization - 1)
+    encoded = []
+    for points in arcs:
+        grid = np.rint((points - low) / scale).astype(np.int64)
+        moved = np.any(np.diff(grid, axis=0) != 0, axis=1)
+        grid = grid[np.concatenate([[True], moved])]
+        if len(grid) == 1:
+            grid = np.repeat(grid, 2, axis=0)
+        encoded.append(np.diff(grid, axis=0, prepend=[[0, 0]]).tolist())
+    return {"scale": scale.tolist(), "translate": low.tolist()}, encoded
+
+
+@functools.lru_cache(maxsize=1)
+def map_level_arcs(source, source_sha256):
+    """
+    Simplified and quantized arcs of a topology file for every MAP_LEVELS entry.
+
+    The geometry only depends on the source file, so it is computed once per file
+    content (source_sha256) and reused by later exports in the same process.
+
+    Returns:
+        dict: Level name -> (transform, arcs)
+    """
+    with open(source) as f:
+        topology = json.load(f)
+    arcs = decode_arcs(topology)
+    return {
+        level: encode_arcs(
+            [simplify_arc(points, tolerance) for points in arcs],
+            topology["bbox"],
+            quantization,
+        )
+        for level, (_, tolerance, quantization) in MAP_LEVELS.items()
+    }
+
+
+def choropleth_values(data):
+    """
+    Per-year values of MAP_FIELDS for every country with an ISO code.
+
+    Args:
+        data: Rounded dataset
+
+    Returns:
+        dict: 'years', 'fields', and 'countries' mapping each country_code to its
+            name and, for each field, the list of its values by year (null where
+            missing)
+    """
+    fields = [field for field in MAP_FIELDS if field in data.columns]
+    rows = data[data["country_code"].notna()]
+    years = np.sort(rows["year"].unique())
+    code_ids, codes = pd.factorize(rows["country_code"].astype(str))
+    names = rows["country"].astype(str).to_numpy()[
+        np.unique(code_ids, return_index=True)[1]
+    ]
+
+    grid = np.full((len(codes), len(fields), len(years)), np.nan)
+    grid[code_ids, :, np.searchsorted(years, rows["year"].to_numpy())] = rows[
+        fields
+    ].to_numpy(dtype=np.float64)
+    grid = np.round(grid, 3)
+
+    return {
+        "years": [int(year) for year in years],
+        "fields": fields,
+        "countries": {
+            code: {
+                "name": name,
+                "values": [
+                    [None if np.isnan(value) else value for value in series]
+                    for series in grid[i].tolist()
+                ],
+            }
+            for i, (code, name) in enumerate(zip(codes, names))
+        },
+    }
+
+
+def export_choropleth_maps(data):
+    """
+    Write the choropleth map artifacts: one topology per MAP_LEVELS entry and the
+    values they display.
+
+    The countries of world-map.json are resolved to ISO codes from their names,
+    which become each geometry's 'code' property. maps/values.json holds the values
+    of MAP_FIELDS by year keyed by country_code (see choropleth_values), so the map
+    needs no client-side join, and is shared by every level: the level files hold
+    geometry only, and switching levels does not fetch the values again. The arcs
+    are simplified and re-quantized per level; since the countries and land
+    objects share arcs, borders stay seamless. maps/index.json names the values
+    file and lists the levels with the zoom from which each applies.
+
+    Args:
+        data: Rounded dataset
+
+    Returns:
+        dict: The index that was written, or None if the source topology is missing
+    """
+    source = OUTPUT_DIR / MAP_SOURCE
+    if not source.exists():
+        print(f"Warning: Map topology not found at {source}")
+        return None
+    with open(source) as f:
+        topology = json.load(f)
+
+    # Natural Earth names abbreviate some words ("Bosnia and Herz.")
+    countries = topology["objects"]["countries"]
+    names = [geometry["properties"]["name"] for geometry in countries["geometries"]]
+    _, codes = resolve_country_names(
+        [
+            " ".join(MAP_NAME_ABBREVIATIONS.get(word, word) for word in name.split())
+            for name in names
+        ]
+    )
+    countries = {
+        **countries,
+        "geometries": [
+            {
+                **geometry,
+                "properties": {
+                    "name": name,
+                    "code": code if isinstance(code, str) else None,
+                },
+            }
+            for geometry, name, code in zip(countries["geometries"], names, codes)
+        ],
+    }
+
+    values = choropleth_values(data)
+    values_payload = json.dumps(values, separators=(",", ":"))
+    write_output(f"{MAP_DIR}/values.json", values_payload)
+
+    level_arcs = map_level_arcs(source, file_sha256(source))
+    index = {
+        "version": 2,
+        "fields": values["fields"],
+        "years": values["years"],
+        "values": {"file": "values.json", "bytes": len(values_payload.encode())},
+        "levels": [],
+    }
+    for level, (min_zoom, _, _) in MAP_LEVELS.items():
+        transform, arcs = level_arcs[level]
+        payload = json.dumps(
+            {
+                "type": "Topology",
+                "bbox": topology["bbox"],
+                "transform": transform,
+                "objects": {
+                    "countries": countries,
+                    "land": topology["objects"]["land"],
+                },
+                "arcs": arcs,
+            },
+            separators=(",", ":"),
+        )
+        filename = f"world-{level}.json"
+        write_output(f"{MAP_DIR}/{filename}", payload)
+        index["levels"].append(
+            {
+                "name": level,
+                "file": filename,
+                "min_zoom": min_zoom,
+                "bytes": len(payload.encode()),
+            }
+        )
+
+    written = {entry["file"] for entry in index["levels"]}
+    for stale in (OUTPUT_DIR / MAP_DIR).glob("world-*.json"):
+        if stale.name not in written:
+            remove_output(f"{MAP_DIR}/{stale.name}")
+
+    write_output(f"{MAP_DIR}/index.json", json.dumps(index))
+    return index
+
+
+# Rankings of the score and factors among the countries of each year, globally and
+# within each continent. Ranks count from 1 for the highest value, with tied values
+# sharing the best rank; percentiles are the share of the ranked countries with a
+# value at or below a country's, rounded up to 1-100. 0 marks an unranked (missing)
+# value in both, so they fit in small unsigned integers.
+RANK_FIELDS = MAP_FIELDS
+RANK_SCOPES = {"": ["year"], "_continent": ["year", "continent"]}
+RANK_DTYPE = "uint16"
+PERCENTILE_DTYPE = "uint8"
+
+# Leaderboards: the best ranked countries per year, field and scope, where the
+# scope is a continent or LEADERBOARD_WORLD for the global ranking
+LEADERBOARD_SIZE = 10
+LEADERBOARD_WORLD = "World"
+
+
+def build_rankings(data):
+    """
+    Rank every country within its year, globally and within its continent.
+
+    Args:
+        data: Merged dataset
+
+    Returns:
+        DataFrame: Aligned with data, with the '{field}_rank' and
+            '{field}_percentile' columns of the global ranking and the
+            '{field}_continent_rank' and '{field}_continent_percentile' columns of
+            the ranking within the continent, for each of RANK_FIELDS
+    """
+    fields = [field for field in RANK_FIELDS if field in data.columns]
+    columns = {}
+    for suffix, keys in RANK_SCOPES.items():
+        if not set(keys) <= set(data.columns):
+            continue
+        grouped = data[fields].groupby(
+            [data[key] for key in keys], observed=True, sort=False
+        )
+        ranks = grouped.rank(method="min", ascending=False)
+        counts = grouped.transform("count")
+        percentiles = np.ceil(100 * (counts - ranks + 1) / counts)
+        for field in fields:
+            columns[f"{field}{suffix}_rank"] = (
+                ranks[field].fillna(0).to_numpy().astype(RANK_DTYPE)
+            )
+            columns[f"{field}{suffix}_percentile"] = (
+                percentiles[field].fillna(0).to_numpy().astype(PERCENTILE_DTYPE)
+            )
+    return pd.DataFrame(columns, index=data.index)
+
+
+def build_leaderboards(data, rankings):
+    """
+    Index the LEADERBOARD_SIZE best ranked rows per year, scope and field.
+
+    Args:
+        data: Merged dataset
+        rankings: Output of build_rankings for data
+
+    Returns:
+        dict: Year -> scope (LEADERBOARD_WORLD or a continent) -> field -> row
+            positions in data, best first (tied rows in data order)
+    """
+    years = data["year"].to_numpy()
+    scopes = {"": np.full(len(data), LEADERBOARD_WORLD, dtype=object)}
+    if "continent" in data.columns:
+        scopes["_continent"] = data["continent"].astype(object).to_numpy()
+
+    leaderboards = {}
+    for field in RANK_FIELDS:
+        for suffix, scope_names in scopes.items():
+            column = f"{field}{suffix}_rank"
+            if column not in rankings.columns:
+                continue
+            ranks = rankings[column].to_numpy()
+            rows = np.flatnonzero((ranks > 0) & (ranks <= LEADERBOARD_SIZE))
+            rows = rows[np.lexsort((ranks[rows], years[rows]))]
+            for row in rows.tolist():
+                leaders = (
+                    leaderboards.setdefault(int(years[row]), {})
+                    .setdefault(scope_names[row], {})
+                    .setdefault(field, [])
+                )
+                if len(leaders) < LEADERBOARD_SIZE:
+                    leaders.append(row)
+    return leaderboards
+
+
+# "Similar countries": for every country and year, the countries of the same year
+# with the nearest factor profile, by Euclidean distance between the profiles after
+# each field is standardized within the year. Distances are computed for
+# SIMILARITY_BATCH_ROWS rows against all the others at a time.
+SIMILARITY_FIELDS = [
+    "gdp_per_capita",
+    "social_support",
+    "life_expectancy",
+    "freedom",
+    "corruption",
+    "generosity",
+    "hdi",
+]
+SIMILAR_COUNT = 5
+SIMILARITY_BATCH_ROWS = 1024
+
+
+def nearest_neighbours(vectors, k, batch_rows=SIMILARITY_BATCH_ROWS):
+    """
+    Find the k nearest other vectors of every vector.
+
+    Squared distances come from |a|^2 + |b|^2 - 2ab, one matrix product per batch
+    of rows, so memory stays at batch_rows x len(vectors).
+
+    Args:
+        vectors: (n, d) array
+        k: Number of neighbours (capped at n - 1)
+        batch_rows: Rows whose distances are computed at once
+
+    Returns:
+        tuple: (positions, distances), (n, k) arrays of the neighbours of each
+            vector, nearest first (ties by position)
+    """
+    n = len(vectors)
+    k = min(k, n - 1)
+    positions = np.empty((n, max(k, 0)), dtype=np.int64)
+    distances = np.empty((n, max(k, 0)))
+    if k <= 0:
+        return positions, distances
+
+    norms = np.einsum("ij,ij->i", vectors, vectors)
+    for start in range(0, n, batch_rows):
+        stop = min(start + batch_rows, n)
+        squared = vectors[start:stop] @ vectors.T
+        squared *= -2
+        squared += norms
+        squared += norms[start:stop, None]
+        squared[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        nearest = np.argpartition(squared, k - 1, axis=1)[:, :k]
+        nearest_squared = np.take_along_axis(squared, nearest, axis=1)
+        order = np.lexsort((nearest, nearest_squared), axis=-1)
+        positions[start:stop] = np.take_along_axis(nearest, order, axis=1)
+        distances[start:stop] = np.sqrt(
+            np.maximum(np.take_along_axis(nearest_squared, order, axis=1), 0)
+        )
+    return positions, distances
+
+
+def build_similar_countries(data):
+    """
+    Index the SIMILAR_COUNT most similar countries of every row, within its year.
+
+    Only rows with every one of SIMILARITY_FIELDS present are indexed.
+
+    Args:
+        data: Merged dataset
+
+    Returns:
+        tuple: (neighbours, distances), lists aligned with data holding for each
+            indexed row the positions in data of its neighbours, nearest first,
+            and their distances; None for the other rows
+    """
+    fields = [field for field in SIMILARITY_FIELDS if field in data.columns]
+    values = data[fields].to_numpy(dtype=np.float64)
+    complete = np.flatnonzero(~np.isnan(values).any(axis=1))
+    years = data["year"].to_numpy()[complete]
+
+    neighbours = [None] * len(data)
+    distances = [None] * len(data)
+    for year in np.unique(years):
+        rows = complete[years == year]
+        profiles = values[rows]
+        spread = profiles.std(axis=0)
+        profiles = (profiles - profiles.mean(axis=0)) / np.where(spread > 0, spread, 1)
+        positions, year_distances = nearest_neighbours(profiles, SIMILAR_COUNT)
+        for row, near, distance in zip(
+            rows.tolist(),
+            rows[positions].tolist(),
+            np.round(year_distances, 3).tolist(),
+        ):
+            neighbours[row] = near
+            distances[row] = distance
+    return neighbours, distances
+
+
+# Dimensions and measures of the aggregate cube behind the summary exports
+CUBE_DIMENSIONS = ["continent", "development_category", "population_category", "year"]
+CUBE_MEASURES = [
+    "score",
+    "gdp_per_capita",
+    "social_support",
+    "life_expectancy",
+    "freedom",
+    "corruption",
+    "generosity",
+    "hdi",
+    "population",
+]
+
+# Columns that must all be present for a record to count as complete
+COMPLETE_RECORD_COLUMNS = ["score", "gdp_per_capita", "social_support", "freedom"]
+
+
+def build_aggregate_cube(data):
+    """
+    Aggregate the dataset once over every cube dimension it has.
+
+    Each cell holds the row count, and for every measure its sum and non-null count,
+    plus the number of complete records. Missing dimension values form their own
+    cells, so any rollup of the cube covers exactly the rows a groupby over the data
+    would.
+
+    Args:
+        data: Rounded merged dataset
+
+    Returns:
+        DataFrame with the dimension columns, 'rows', 'complete_records' and
+            '<measure>_sum' / '<measure>_count' for each measure present
+    """
+    dimensions = [col for col in CUBE_DIMENSIONS if col in data.columns]
+    measures = [col for col in CUBE_MEASURES if col in data.columns]
+
+    values = data[dimensions + measures].copy()
+    values["rows"] = 1
+    values["complete_records"] = (
+        data[COMPLETE_RECORD_COLUMNS].notna().all(axis=1).astype("int64")
+        if set(COMPLETE_RECORD_COLUMNS) <= set(data.columns)
+        else 0
+    )
+
+    grouped = values.groupby(dimensions, dropna=False, observed=True, sort=False)
+    stats = grouped[measures].agg(["sum", "count"])
+    stats.columns = [f"{measure}_{stat}" for measure, stat in stats.columns]
+    counts = grouped[["rows", "complete_records"]].sum()
+    return pd.concat([counts, stats], axis=1).reset_index()
+
+
+def rollup_cube(cube, by):
+    """
+    Roll the cube up to a grouping set.
+
+    Sums and counts are added across the dimensions not in the grouping set and
+    each measure's mean is derived as sum / count. Cells whose grouping values are
+    missing are left out, as in a groupby over the data.
+
+    Args:
+        cube: Output of build_aggregate_cube
+        by: Dimensions to keep, in output order
+
+    Returns:
+        DataFrame sorted by the grouping dimensions, with 'rows', 'complete_records',
+            and '<measure>_sum', '<measure>_count' and '<measure>' (mean) per measure
+    """
+    totals = cube.groupby(by, observed=True).sum(numeric_only=True)
+    totals = totals.drop(columns=[col for col in CUBE_DIMENSIONS if col in totals])
+    for column in list(totals.columns):
+        if column.endswith("_sum"):
+            measure = column[: -len("_sum")]
+            totals[measure] = totals[column] / totals[f"{measure}_count"]
+    return totals.reset_index()
+
+
+def summarize_by_continent(cube):
+    """Summary statistics by continent and year"""
+    rollup = rollup_cube(cube, ["continent", "year"])
+    summary = rollup[
+        [
+            "continent",
+            "year",
+            "score",
+            "gdp_per_capita",
+            "social_support",
+            "life_expectancy",
+            "freedom",
+            "corruption",
+            "generosity",
+            "hdi",
+        ]
+    ].copy()
+    # Populations are exported to 3 decimals; rounding the total keeps it independent
+    # of the order in which the cube cells were added up
+    summary["population"] = rollup["population_sum"].round(3)
+    return summary
+
+
+def summarize_global_trends(cube):
+    """Global averages by year"""
+    return rollup_cube(cube, ["year"])[
+        [
+            "year",
+            "score",
+            "gdp_per_capita",
+            "social_support",
+            "life_expectancy",
+            "freedom",
+            "corruption",
+            "generosity",
+            "hdi",
+        ]
+    ]
+
+
+def summarize_population_categories(cube):
+    """Population category analysis, or None if the data has no population categories"""
+    if "population_category" not in cube.columns:
+        return None
+
+    return rollup_cube(cube, ["population_category", "year"])[
+        ["population_category", "year", "score", "hdi", "rows"]
+    ].rename(columns={"rows": "num_countries"})
+
+
+def summarize_completeness(cube):
+    """Data completeness information per year, keyed by the year as a string"""
+    rollup = rollup_cube(cube, ["year"])
+    data_completeness = {}
+    for row in rollup.itertuples(index=False):
+        # Convert numpy values to Python integers to avoid JSON serialization issues
+        data_completeness[str(row.year)] = {
+            "year": int(row.year),
+            "total_countries": int(row.rows),
+            "has_happiness": int(row.score_count),
+            "has_hdi": int(getattr(row, "hdi_count", 0)),
+            "has_population": int(getattr(row, "population_count", 0)),
+            "complete_records": int(row.complete_records),
+        }
+    return data_completeness
+
+
+# Factors correlated in correlations.json and correlations_by_group.json
+CORRELATION_COLUMNS = [
+    "score",
+    "gdp_per_capita",
+    "social_support",
+    "life_expectancy",
+    "freedom",
+    "corruption",
+    "generosity",
+    "hdi",
+]
+
+
+# Columns of the co-moment accumulator written by correlation_moments
+MOMENT_COLUMNS = ["n", "mean_x", "mean_y", "m2_x", "m2_y", "c_xy"]
+
+
+def correlation_moments(data):
+    """
+    Accumulate pairwise co-moments of the correlation factors per (year, continent).
+
+    For every ordered pair of factors (x, y) and every cell, the accumulator holds,
+    over the rows of the cell where both are present, their number, the means of x
+    and y, the sums of squared deviations of x and y from their means and the sum of
+    the products of their deviations. The moments are centered within the cell, so
+    correlations do not lose precision to the cancellation of large raw sums, and the
+    moments of any set of cells combine exactly (see combine_moments), so pairwise-
+    complete correlations for any grouping follow without another pass over the
+    data. Each row is visited once; cells are computed with array operations over
+    the mask of present values.
+
+    Args:
+        data: Rounded merged dataset, or a subset of its years
+
+    Returns:
+        DataFrame with one row per (year, continent, x, y) and columns 'n',
+            'mean_x', 'mean_y', 'm2_x', 'm2_y' and 'c_xy'
+    """
+    columns = [col for col in CORRELATION_COLUMNS if col in data.columns]
+    values = data[columns].to_numpy(dtype="float64")
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    mask = present.astype("float64")
+
+    cells = []
+    grouped = data.groupby(
+        ["year", "continent"], dropna=False, observed=True, sort=True
+    ).indices
+    for (year, continent), rows in grouped.items():
+        x, m = filled[rows], mask[rows]
+        n = m.T @ m
+        # Means of x over the rows where y is also present, and the other way round
+        mean_x = np.divide(x.T @ m, n, out=np.zeros_like(n), where=n > 0)
+        mean_y = mean_x.T
+        # Deviations from the pair means, zero where either value is missing
+        both = m[:, :, None] * m[:, None, :]
+        dev_x = (x[:, :, None] - mean_x[None, :, :]) * both
+        dev_y = (x[:, None, :] - mean_y[None, :, :]) * both
+        cells.append(
+            pd.DataFrame(
+                {
+                    "year": year,
+                    "continent": continent,
+                    "x": np.repeat(columns, len(columns)),
+                    "y": np.tile(columns, len(columns)),
+                    "n": n.ravel(),
+                    "mean_x": mean_x.ravel(),
+                    "mean_y": mean_y.ravel(),
+                    "m2_x": (dev_x * dev_x).sum(axis=0).ravel(),
+                    "m2_y": (dev_y * dev_y).sum(axis=0).ravel(),
+                    "c_xy": (dev_x * dev_y).sum(axis=0).ravel(),
+                }
+            )
+        )
+
+    if not cells:
+        return pd.DataFrame(columns=["year", "continent", "x", "y"] + MOMENT_COLUMNS)
+    return pd.concat(cells, ignore_index=True)
+
+
+def combine_moments(moments, keys):
+    """
+    Combine the co-moments of the cells sharing the same keys.
+
+    This is the pairwise update of Chan, Golub and LeVeque applied to all cells of a
+    group at once: the combined means are the count-weighted means of the cell
+    means, and the combined sums of squared deviations and of products of
+    deviations are the sums over the cells plus the terms for the spread of the
+    cell means around the combined means. No raw sums of squares are formed.
+
+    Args:
+        moments: Output of correlation_moments (or several of them concatenated)
+        keys: Columns identifying the combined groups
+
+    Returns:
+        DataFrame indexed by the keys with the columns of MOMENT_COLUMNS
+    """
+    moments = moments.assign(
+        weighted_x=moments["n"] * moments["mean_x"],
+        weighted_y=moments["n"] * moments["mean_y"],
+    )
+    grouped = moments.groupby(keys, sort=False)
+    n = grouped["n"].transform("sum")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_x = (grouped["weighted_x"].transform("sum") / n).fillna(0.0)
+        mean_y = (grouped["weighted_y"].transform("sum") / n).fillna(0.0)
+    delta_x = moments["mean_x"] - mean_x
+    delta_y = moments["mean_y"] - mean_y
+    moments = moments.assign(
+        m2_x=moments["m2_x"] + moments["n"] * delta_x * delta_x,
+        m2_y=moments["m2_y"] + moments["n"] * delta_y * delta_y,
+        c_xy=moments["c_xy"] + moments["n"] * delta_x * delta_y,
+        mean_x=mean_x,
+        mean_y=mean_y,
+    )
+    return moments.groupby(keys, sort=False).agg(
+        n=("n", "sum"),
+        mean_x=("mean_x", "first"),
+        mean_y=("mean_y", "first"),
+        m2_x=("m2_x", "sum"),
+        m2_y=("m2_y", "sum"),
+        c_xy=("c_xy", "sum"),
+    )
+
+
+def correlation_matrices(moments, by=()):
+    """
+    Derive pairwise-complete correlation matrices from accumulated co-moments.
+
+    Args:
+        moments: Output of correlation_moments (or several of them concatenated)
+        by: Grouping columns ('year' and/or 'continent'); empty for one matrix over
+            all rows
+
+    Returns:
+        dict: Maps each group key (a tuple of the 'by' values) to a DataFrame matrix
+            indexed by factor in both directions; NaN where a pair has fewer than two
+            rows or a factor does not vary
+    """
+    by = list(by)
+    columns = list(dict.fromkeys(moments["x"]))
+    totals = combine_moments(moments, by + ["x", "y"])
+
+    n = totals["n"]
+    variance_x = totals["m2_x"]
+    variance_y = totals["m2_y"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlation = totals["c_xy"] / np.sqrt(variance_x * variance_y)
+    correlation = correlation.where((n >= 2) & (variance_x > 0) & (variance_y > 0))
+    correlation = correlation.clip(-1, 1)
+
+    if not by:
+        return {(): correlation.unstack("y").reindex(index=columns, columns=columns)}
+    return {
+        key if isinstance(key, tuple) else (key,): group.droplevel(by)
+        .unstack("y")
+        .reindex(index=columns, columns=columns)
+        for key, group in correlation.groupby(
+            level=by if len(by) > 1 else by[0], sort=True
+        )
+    }
+
+
+def grouped_correlations(moments):
+    """
+    Correlation matrices per year, per continent and per year and continent.
+
+    Args:
+        moments: Output of correlation_moments
+
+    Returns:
+        dict: JSON-ready matrices rounded to 3 decimals, with null for undefined
+            coefficients
+    """
+
+    def matrix_values(matrix):
+        rounded = matrix.round(3).astype(object)
+        return rounded.where(rounded.notna(), None).values.tolist()
+
+    by_year_continent = {}
+    for (year, continent), matrix in correlation_matrices(
+        moments.dropna(subset=["continent"]), ["year", "continent"]
+    ).items():
+        by_year_continent.setdefault(str(year), {})[continent] = matrix_values(matrix)
+
+    return {
+        "columns": list(dict.fromkeys(moments["x"])),
+        "by_year": {
+            str(year): matrix_values(matrix)
+            for (year,), matrix in correlation_matrices(moments, ["year"]).items()
+        },
+        "by_continent": {
+            continent: matrix_values(matrix)
+            for (continent,), matrix in correlation_matrices(
+                moments.dropna(subset=["continent"]), ["continent"]
+            ).items()
+        },
+        "by_year_continent": by_year_continent,
+    }
+
+
+def build_aggregates(data):
+    """
+    Compute the per-year aggregate outputs.
+
+    The data is aggregated once into a cube (see build_aggregate_cube) and every
+    output is a rollup of it. Every aggregate is grouped by year (among other keys),
+    so aggregates computed on a subset of years are exactly the matching rows of the
+    full aggregates.
+
+    Args:
+        data: Rounded merged dataset, or a subset of its years
+
+    Returns:
+        dict: Aggregate name -> DataFrame (or dict for data_completeness)
+    """
+    cube = build_aggregate_cube(data)
+    return {
+        "summary_by_continent": summarize_by_continent(cube),
+        "global_trends": summarize_global_trends(cube),
+        "population_category_analysis": summarize_population_categories(cube),
+        "data_completeness": summarize_completeness(cube),
+        "correlation_moments": correlation_moments(data),
+    }
 
-        # Create a new population size category column for analysis
-        pop_bins = [0, 10e3, 50e3, 100e3, 500e3, float("inf")]
-        pop_labels = [
-            "Very Small (<10M)",
-            "Small (10-50M)",
-            "Medium (50-100M)",
-            "Large (100-500M)",
-            "Very Large (>500M)",
-        ]
-        merged_df["population_category"] = pd.cut(
-            merged_df["population"], bins=pop_bins, labels=pop_labels
-        )
 
-    # Add development category based on HDI if available
-    if "hdi" in merged_df.columns:
-        hdi_bins = [0, 0.55, 0.7, 0.8, 1.0]
-        hdi_labels = ["Low", "Medium", "High", "Very High"]
-        merged_df["development_category"] = pd.cut(
-            merged_df["hdi"], bins=hdi_bins, labels=hdi_labels
-        )
+# Panel columns each group of outputs is built from (None: every column). Outputs
+# that do not use any column provided by a changed input are not rebuilt by watch
+# mode (see watch_inputs).
+OUTPUT_DEPENDENCIES = {
+    # happiness_data.json with its columnar, sharded and time series offset forms
+    "dataset": None,
+    "time_series": None,
+    # rankings.json and leaderboards.json
+    "rankings": ["year", "continent", *RANK_FIELDS],
+    "similar_countries": ["year", *SIMILARITY_FIELDS],
+    "maps": ["country", "country_code", "year", *MAP_FIELDS],
+    "countries": ["country", "continent", "country_code", "year", "score", "hdi"],
+    # The summaries, correlations and completeness built by build_aggregates
+    "aggregates": [*CUBE_DIMENSIONS, *CUBE_MEASURES, *CORRELATION_COLUMNS],
+}
 
-    # Convert year column to integer to avoid int64 serialization issues
-    merged_df["year"] = merged_df["year"].astype(int)
 
-    return merged_df
+def export_data(
+    data=None,
+    aggregates=None,
+    columnar=False,
+    sharded=False,
+    time_series_offsets=False,
+    outputs=None,
+):
+    """
+    Export data to JSON files for web application
+
+    Files whose content has not changed are not rewritten. Every file gets .gz (and,
+    with brotli installed, .br) siblings, and all of them are listed with their
+    content hashes in export_manifest.json (see open_output).
 
+    Args:
+        data: Merged dataset to export (default: the output of merge_datasets)
+        aggregates: Precomputed output of build_aggregates for the rounded data;
+            computed here when omitted
+        columnar: Also write happiness_data.columnar.json (see encode_columnar)
+        sharded: Also write per-year and per-country shards (see export_shards)
+        time_series_offsets: Write time_series_offsets.json, row ranges into
+            happiness_data.json, instead of the full copy in time_series.json
+        outputs: Names of the outputs to write, keys of OUTPUT_DEPENDENCIES
+            (default: all); the others keep their files and manifest entries
 
-def export_data():
-    """Export data to JSON files for web application"""
+    Returns:
+        dict: The aggregates that were exported
+    """
     print("Exporting data to JSON...")
+    _exported_files.clear()
+    if outputs is not None:
+        _exported_files.update(previous_manifest_entries())
+
+    def wanted(output):
+        return outputs is None or output in outputs
 
     # Get merged data
-    data = merge_datasets()
+    data = merge_datasets() if data is None else data.copy()
 
     # For numerical columns, round to 3 decimal places to reduce file size
-    numeric_cols = data.select_dtypes(include=["float64"]).columns
-    for col in numeric_cols:
-        data[col] = data[col].round(3)
+    data = round_for_export(data)
+
+    if aggregates is None and wanted("aggregates"):
+        with profile_stage("build_aggregates", len(data)):
+            aggregates = build_aggregates(data)
+
+    # Offsets require each country's rows to be contiguous and in year order
+    if time_series_offsets:
+        order, _, _ = country_series_bounds(data)
+        data = data.iloc[order].reset_index(drop=True)
 
     # Export full dataset
-    data_json = data.to_json(orient="records")
-    with open(OUTPUT_DIR / "happiness_data.json", "w") as f:
-        f.write(data_json)
+    if wanted("dataset"):
+        with profile_stage("export:happiness_data.json", len(data)) as stage:
+            stage["rows_out"] = len(data)
+            write_output("happiness_data.json", data.to_json(orient="records"))
+
+    # Export ranks and percentiles, row-aligned with happiness_data.json, and the
+    # leaderboards indexing its best ranked rows
+    if wanted("rankings"):
+        with profile_stage("export:rankings.json", len(data)) as stage:
+            rankings = build_rankings(data)
+            stage["rows_out"] = len(rankings)
+            write_output(
+                "rankings.json",
+                json.dumps(
+                    {col: rankings[col].tolist() for col in rankings.columns},
+                    separators=(",", ":"),
+                ),
+            )
+        with profile_stage("export:leaderboards.json", len(data)) as stage:
+            leaderboards = build_leaderboards(data, rankings)
+            stage["rows_out"] = len(leaderboards)
+            write_output(
+                "leaderboards.json", json.dumps(leaderboards, separators=(",", ":"))
+            )
+
+    # Export the most similar countries of every row, by position in
+    # happiness_data.json
+    if wanted("similar_countries"):
+        with profile_stage("export:similar_countries.json", len(data)) as stage:
+            neighbours, distances = build_similar_countries(data)
+            stage["rows_out"] = sum(near is not None for near in neighbours)
+            write_output(
+                "similar_countries.json",
+                json.dumps(
+                    {
+                        "fields": SIMILARITY_FIELDS,
+                        "neighbours": neighbours,
+                        "distances": distances,
+                    },
+                    separators=(",", ":"),
+                ),
+            )
+
+    # Optional compact column-oriented copy of the full dataset
+    if columnar and wanted("dataset"):
+        with profile_stage("export:happiness_data.columnar.json", len(data)) as stage:
+            stage["rows_out"] = len(data)
+            write_output(
+                "happiness_data.columnar.json",
+                json.dumps(encode_columnar(data), separators=(",", ":")),
+            )
+
+    # Optional per-year and per-country slices for lazy loading
+    if sharded and wanted("dataset"):
+        with profile_stage("export:shards", len(data)) as stage:
+            manifest = export_shards(data)
+            stage["rows_out"] = sum(len(v) for v in manifest["shards"].values())
 
     # Export time series data by country
-    time_series = {}
-    for country in data["country"].unique():
-        country_data = data[data["country"] == country].sort_values("year")
-        time_series[country] = country_data.to_dict(orient="records")
+    if time_series_offsets and wanted("dataset"):
+        with profile_stage("export:time_series_offsets.json", len(data)):
+            write_time_series_offsets(data, "time_series_offsets.json")
+    elif not time_series_offsets and wanted("time_series"):
+        with profile_stage("export:time_series.json", len(data)) as stage:
+            write_time_series(data, "time_series.json")
+            stage["rows_out"] = len(data)
 
-    with open(OUTPUT_DIR / "time_series.json", "w") as f:
-        json.dump(time_series, f)
+    # Export the choropleth map, joined with the values it displays
+    if wanted("maps"):
+        with profile_stage("export:maps", len(data)) as stage:
+            index = export_choropleth_maps(data)
+            stage["rows_out"] = len(index["levels"]) if index else 0
 
     # Export country list with additional metadata (continent, latest scores)
-    countries_df = data.sort_values("year", ascending=False).drop_duplicates("country")
-    countries = countries_df[
-        ["country", "continent", "country_code", "score", "hdi"]
-    ].sort_values("country")
-    countries_json = countries.to_dict(orient="records")
-    with open(OUTPUT_DIR / "countries.json", "w") as f:
-        json.dump(countries_json, f)
+    if wanted("countries"):
+        with profile_stage("export:countries.json", len(data)) as stage:
+            countries_df = data.sort_values("year", ascending=False).drop_duplicates(
+                "country"
+            )
+            countries = countries_df[
+                ["country", "continent", "country_code", "score", "hdi"]
+            ].sort_values("country")
+            stage["rows_out"] = len(countries)
+            write_output("countries.json", json.dumps(json_records(countries)))
+
+    if wanted("aggregates"):
+        export_aggregates(data, aggregates)
+
+    # List every published file with its content hash for cache-friendly hosting
+    write_export_manifest()
+
+    print(f"Data export complete. Files saved to {OUTPUT_DIR}")
+    return aggregates
 
-    # Export summary statistics by continent and year
-    summary = (
-        data.groupby(["continent", "year"])
-        .agg(
-            {
-                "score": "mean",
-                "gdp_per_capita": "mean",
-                "social_support": "mean",
-                "life_expectancy": "mean",
-                "freedom": "mean",
-                "corruption": "mean",
-                "generosity": "mean",
-                "hdi": "mean",
-                "population": "sum",
-            }
-        )
-        .reset_index()
-    )
 
-    summary_json = summary.to_json(orient="records")
-    with open(OUTPUT_DIR / "summary_by_continent.json", "w") as f:
-        f.write(summary_json)
+def export_aggregates(data, aggregates):
+    """Write the files built from the per-year aggregates (see build_aggregates)"""
+    # Export summary statistics by continent and year
+    summary = aggregates["summary_by_continent"]
+    with profile_stage("export:summary_by_continent.json", len(data)) as stage:
+        stage["rows_out"] = len(summary)
+        write_output("summary_by_continent.json", summary.to_json(orient="records"))
 
     # Export global averages by year
-    global_avg = (
-        data.groupby("year")
-        .agg(
-            {
-                "score": "mean",
-                "gdp_per_capita": "mean",
-                "social_support": "mean",
-                "life_expectancy": "mean",
-                "freedom": "mean",
-                "corruption": "mean",
-                "generosity": "mean",
-                "hdi": "mean",
-            }
+    global_avg = aggregates["global_trends"]
+    with profile_stage("export:global_trends.json", len(data)) as stage:
+        stage["rows_out"] = len(global_avg)
+        write_output("global_trends.json", global_avg.to_json(orient="records"))
+
+    # Export correlation matrix for happiness factors, pooled over all years
+    moments = aggregates["correlation_moments"]
+    with profile_stage("export:correlations.json", len(moments)) as stage:
+        correlation = correlation_matrices(moments)[()].round(3)
+        stage["rows_out"] = len(correlation)
+        write_output("correlations.json", correlation.to_json(orient="split"))
+
+    # Export correlation matrices per year, per continent and per year and continent
+    with profile_stage("export:correlations_by_group.json", len(moments)):
+        write_output(
+            "correlations_by_group.json", json.dumps(grouped_correlations(moments))
         )
-        .reset_index()
+
+    # Export population category analysis
+    pop_category_summary = aggregates["population_category_analysis"]
+    if pop_category_summary is not None:
+        with profile_stage(
+            "export:population_category_analysis.json", len(data)
+        ) as stage:
+            stage["rows_out"] = len(pop_category_summary)
+            write_output(
+                "population_category_analysis.json",
+                pop_category_summary.to_json(orient="records"),
+            )
+
+    # Export data completeness information
+    completeness = aggregates["data_completeness"]
+    with profile_stage("export:data_completeness.json", len(data)) as stage:
+        stage["rows_out"] = len(completeness)
+        write_output("data_completeness.json", json.dumps(completeness))
+
+
+# Incremental mode: state from the previous incremental run lets a new or changed
+# year file be folded into the merged panel without reprocessing everything else
+INCREMENTAL_STATE_DIR = CACHE_DIR / "incremental"
+
+
+def load_incremental_state():
+    """
+    Load the state saved by the previous incremental run.
+
+    Returns:
+        dict or None: Manifest, panel and aggregates, or None if no usable state exists
+    """
+    manifest_path = INCREMENTAL_STATE_DIR / "manifest.json"
+    if not manifest_path.exists():
+        return None
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != TRANSFORM_VERSION:
+        return None
+
+    artifacts = {
+        name: INCREMENTAL_STATE_DIR / filename
+        for name, filename in manifest["artifacts"].items()
+    }
+    if not all(path.exists() for path in artifacts.values()):
+        return None
+
+    aggregates = {
+        name: read_stage_artifact(path)
+        for name, path in artifacts.items()
+        if name != "panel"
+    }
+    aggregates.setdefault("population_category_analysis", None)
+    aggregates["data_completeness"] = manifest["data_completeness"]
+
+    return {
+        "manifest": manifest,
+        "panel": read_stage_artifact(artifacts["panel"]),
+        "aggregates": aggregates,
+    }
+
+
+def save_incremental_state(panel, aggregates, digests, file_countries, year_span):
+    """Persist the panel, its aggregates and the input fingerprints for the next run"""
+    os.makedirs(INCREMENTAL_STATE_DIR, exist_ok=True)
+
+    suffix = ".parquet" if CACHE_FORMAT == "parquet" else ".pkl"
+    frames = {"panel": panel}
+    frames.update(
+        (name, value)
+        for name, value in aggregates.items()
+        if isinstance(value, pd.DataFrame)
     )
+    artifacts = {}
+    for name, df in frames.items():
+        artifacts[name] = f"{name}-{TRANSFORM_VERSION[:12]}{suffix}"
+        write_stage_artifact(df, INCREMENTAL_STATE_DIR / artifacts[name])
+
+    manifest = {
+        "version": TRANSFORM_VERSION,
+        "digests": digests,
+        "file_countries": file_countries,
+        "year_span": [int(year) for year in year_span],
+        "artifacts": artifacts,
+        "data_completeness": aggregates["data_completeness"],
+    }
+    tmp_path = INCREMENTAL_STATE_DIR / "manifest.json.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, INCREMENTAL_STATE_DIR / "manifest.json")
+
 
-    global_json = global_avg.to_json(orient="records")
-    with open(OUTPUT_DIR / "global_trends.json", "w") as f:
-        f.write(global_json)
-
-    # Export correlation matrix for happiness factors
-    correlation_cols = [
-        "score",
-        "gdp_per_capita",
-        "social_support",
-        "life_expectancy",
-        "freedom",
-        "corruption",
-        "generosity",
-        "hdi",
+def countries_by_input_file(happiness_reports, population_reports):
+    """Map each yearly input file to the standardized countries it contains"""
+    file_countries = {}
+    sources = [
+        (happiness_reports, HAPPINESS_DIR, "{year}_report.csv"),
+        (population_reports, POPULATION_DIR, "population_{year}.csv"),
     ]
-    corr_cols = [col for col in correlation_cols if col in data.columns]
-    correlation = data[corr_cols].corr().round(3)
-    correlation_json = correlation.to_json(orient="split")
-    with open(OUTPUT_DIR / "correlations.json", "w") as f:
-        f.write(correlation_json)
-
-    # Export population category analysis with observed=True to avoid FutureWarning
-    if "population_category" in data.columns:
-        pop_category_summary = (
-            data.groupby(["population_category", "year"], observed=True)
-            .agg({"score": "mean", "hdi": "mean", "country": "count"})
-            .rename(columns={"country": "num_countries"})
-            .reset_index()
+    for reports, directory, pattern in sources:
+        if reports.empty:
+            continue
+        for year, countries in reports.groupby("year")["country"]:
+            path = directory / pattern.format(year=year)
+            file_countries[input_file_key(path)] = sorted(countries.unique())
+    return file_countries
+
+
+def same_country_names(countries, frames):
+    """
+    Extend a set of country names with the other names the frames give to the same
+    countries, i.e. the names sharing a country code with one of them (see
+    build_country_dimension)
+    """
+    keys = [df[["country", "country_code"]] for df in frames if not df.empty]
+    if not keys:
+        return set(countries)
+    keys = pd.concat([df.astype(object) for df in keys], ignore_index=True)
+    codes = keys.loc[keys["country"].isin(countries), "country_code"].dropna()
+    return set(countries) | set(keys.loc[keys["country_code"].isin(codes), "country"])
+
+
+def changed_panel_years(old_rows, new_rows):
+    """
+    Find the years in which two versions of a set of panel rows differ.
+
+    Args:
+        old_rows: Rows of the previous panel
+        new_rows: Recomputed rows for the same countries
+
+    Returns:
+        set: Years with an added, removed or modified row
+    """
+    columns = [col for col in new_rows.columns if col in old_rows.columns]
+
+    def row_fingerprints(rows):
+        hashes = pd.util.hash_pandas_object(rows[columns], index=False)
+        return set(zip(rows["year"], hashes))
+
+    return {
+        int(year)
+        for year, _ in row_fingerprints(old_rows) ^ row_fingerprints(new_rows)
+    }
+
+
+def splice_aggregates(previous, updated, changed_years, panel_years):
+    """
+    Replace the changed years of previously exported aggregates.
+
+    Args:
+        previous: Aggregates from the previous run
+        updated: Aggregates computed over the changed years only
+        changed_years: Years whose aggregate rows must be replaced
+        panel_years: Years present in the updated panel
+
+    Returns:
+        dict: Aggregates identical to those of a full rebuild
+    """
+    keys = {
+        "summary_by_continent": ["continent", "year"],
+        "global_trends": ["year"],
+        "population_category_analysis": ["population_category", "year"],
+        "correlation_moments": ["year", "continent"],
+    }
+
+    spliced = {}
+    for name, sort_keys in keys.items():
+        if previous[name] is None or updated[name] is None:
+            spliced[name] = updated[name]
+            continue
+        kept = previous[name][
+            ~previous[name]["year"].isin(changed_years)
+            & previous[name]["year"].isin(panel_years)
+        ]
+        if updated[name].empty:
+            spliced[name] = kept.reset_index(drop=True)
+            continue
+        spliced[name] = (
+            pd.concat([kept, updated[name]], ignore_index=True)
+            .sort_values(sort_keys, kind="mergesort")
+            .reset_index(drop=True)
         )
 
-        pop_cat_json = pop_category_summary.to_json(orient="records")
-        with open(OUTPUT_DIR / "population_category_analysis.json", "w") as f:
-            f.write(pop_cat_json)
+    completeness = {
+        year: record
+        for year, record in previous["data_completeness"].items()
+        if int(year) not in changed_years and int(year) in panel_years
+    }
+    completeness.update(updated["data_completeness"])
+    spliced["data_completeness"] = dict(
+        sorted(completeness.items(), key=lambda item: int(item[0]))
+    )
+    return spliced
 
-    # Export data completeness information
-    data_completeness = {}
-    for year in sorted(data["year"].unique()):
-        year_data = data[data["year"] == year]
-        completeness = {
-            "year": int(year),
-            "total_countries": int(len(year_data)),
-            "has_happiness": int(sum(~year_data["score"].isna())),
-            "has_hdi": int(
-                sum(~year_data["hdi"].isna()) if "hdi" in year_data.columns else 0
-            ),
-            "has_population": int(
-                sum(~year_data["population"].isna())
-                if "population" in year_data.columns
-                else 0
-            ),
-            "complete_records": int(
-                sum(
-                    year_data[["score", "gdp_per_capita", "social_support", "freedom"]]
-                    .notna()
-                    .all(axis=1)
-                )
-            ),
-        }
-        # Convert all int64/float64 values to Python integers to avoid JSON serialization issues
-        data_completeness[str(year)] = completeness
 
-    with open(OUTPUT_DIR / "data_completeness.json", "w") as f:
-        json.dump(data_completeness, f)
+def update_incremental(**export_options):
+    """
+    Bring the exported data up to date with new or changed year files.
 
-    print(f"Data export complete. Files saved to {OUTPUT_DIR}")
+    Only year files whose content changed since the previous incremental run are
+    parsed. The merged panel is patched by recomputing just the countries those files
+    contain (or all countries when the report year range changes), and the per-year
+    aggregates are recomputed only for years whose rows changed. The exported files
+    are identical to those of a full rebuild. Without usable state (first run, changed
+    transform code or a changed HDI file) a full rebuild is performed.
 
+    Args:
+        export_options: Keyword arguments forwarded to export_data
 
-def validate_data():
-    """Run data validation checks and print summary statistics"""
-    print("Validating transformed data...")
+    Returns:
+        DataFrame: The up-to-date merged panel
+    """
+    print("Running incremental update...")
 
-    # Get merged data
-    data = merge_datasets()
+    state = load_incremental_state()
+    digests = {input_file_key(path): file_digest(path) for path in all_input_files()}
+
+    happiness_reports = load_happiness_reports(
+        discover_years(HAPPINESS_DIR, "{year}_report.csv")
+    )
+    population_reports = load_population_reports(
+        discover_years(POPULATION_DIR, "population_{year}.csv")
+    )
+    file_countries = countries_by_input_file(happiness_reports, population_reports)
+    year_span = (
+        int(happiness_reports["year"].min()),
+        int(happiness_reports["year"].max()),
+    )
+    hdi_key = input_file_key(hdi_input_files()[0])
 
-    # Basic stats
-    total_countries = data["country"].nunique()
-    years_covered = sorted(data["year"].unique())
+    def rebuild(reason):
+        print(f"{reason}; rebuilding everything")
+        panel = merge_frames(
+            complete_happiness_panel(happiness_reports),
+            process_hdi_data(*year_span),
+            population_reports,
+        )
+        aggregates = export_data(panel, **export_options)
+        save_incremental_state(panel, aggregates, digests, file_countries, year_span)
+        return panel
 
-    print(f"Total unique countries: {total_countries}")
-    print(f"Years covered: {years_covered[0]} to {years_covered[-1]}")
+    if state is None:
+        return rebuild("No reusable state from a previous incremental run")
+    if state["manifest"]["digests"].get(hdi_key) != digests[hdi_key]:
+        return rebuild("HDI data changed")
 
-    # Completeness by year
-    completeness = data.groupby("year").apply(
-        lambda x: pd.Series(
-            {
-                "num_countries": len(x),
-                "happiness_data_pct": (100 * (~x["score"].isna()).sum() / len(x)),
-                "hdi_data_pct": (
-                    (100 * (~x["hdi"].isna()).sum() / len(x))
-                    if "hdi" in x.columns
-                    else 0
-                ),
-                "population_data_pct": (
-                    (100 * (~x["population"].isna()).sum() / len(x))
-                    if "population" in x.columns
-                    else 0
-                ),
-            }
+    manifest = state["manifest"]
+    previous_panel = state["panel"]
+    changed_files = sorted(
+        key
+        for key in set(digests) | set(manifest["digests"])
+        if digests.get(key) != manifest["digests"].get(key)
+    )
+    if not changed_files:
+        print("All input files are unchanged since the last run; nothing to update")
+        return previous_panel
+
+    print(f"Changed input files: {', '.join(changed_files)}")
+
+    # Countries whose rows may change: those in the old or new version of a changed
+    # file, or every country when the year grid used for gap filling changes
+    if list(year_span) != manifest["year_span"]:
+        affected = set(happiness_reports["country"]) | set(previous_panel["country"])
+    else:
+        affected = set()
+        for key in changed_files:
+            affected.update(file_countries.get(key, []))
+            affected.update(manifest["file_countries"].get(key, []))
+
+    # Sources may spell a country differently; the merge joins them by country code
+    hdi_df = process_hdi_data(*year_span)
+    affected = same_country_names(
+        affected, [happiness_reports, hdi_df, population_reports]
+    )
+
+    happiness_subset = happiness_reports[happiness_reports["country"].isin(affected)]
+    if not happiness_subset.empty:
+        recomputed = merge_frames(
+            complete_happiness_panel(happiness_subset, year_span),
+            hdi_df[hdi_df["country"].isin(affected)],
+            population_reports[population_reports["country"].isin(affected)],
         )
+    else:
+        recomputed = previous_panel.iloc[:0]
+
+    if list(recomputed.columns) != list(previous_panel.columns):
+        return rebuild("Panel columns changed")
+
+    previous_rows = previous_panel[previous_panel["country"].isin(affected)]
+    changed_years = changed_panel_years(previous_rows, recomputed)
+
+    # Reassemble in the order of a full build: country first appearance, then year
+    panel = pd.concat(
+        [previous_panel[~previous_panel["country"].isin(affected)], recomputed],
+        ignore_index=True,
+    )
+    country_rank = pd.Series(
+        np.arange(happiness_reports["country"].nunique()),
+        index=happiness_reports["country"].unique(),
     )
+    order = np.lexsort(
+        (panel["year"].to_numpy(), panel["country"].map(country_rank).to_numpy())
+    )
+    # Concatenating categoricals with different categories falls back to object
+    panel = compact_panel(panel.iloc[order].reset_index(drop=True))
 
-    print("\nData completeness by year:")
-    print(completeness)
+    print(
+        f"Recomputed {len(recomputed)} rows for "
+        f"{recomputed['country'].nunique()} countries; "
+        f"aggregates updated for years {sorted(changed_years)}"
+    )
 
-    # Countries with missing data
-    countries_missing_happiness = data[data["score"].isna()]["country"].unique()
-    countries_missing_hdi = (
-        data[data["hdi"].isna()]["country"].unique() if "hdi" in data.columns else []
+    rounded = round_for_export(panel.copy())
+    aggregates = splice_aggregates(
+        state["aggregates"],
+        build_aggregates(rounded[rounded["year"].isin(changed_years)]),
+        changed_years,
+        set(rounded["year"]),
     )
+    export_data(panel, aggregates, **export_options)
+    save_incremental_state(panel, aggregates, digests, file_countries, year_span)
+    return panel
 
-    if len(countries_missing_happiness) > 0:
-        print(
-            f"\nCountries missing happiness data: {', '.join(countries_missing_happiness[:10])}"
-            + (
-                f" and {len(countries_missing_happiness)-10} more"
-                if len(countries_missing_happiness) > 10
-                else ""
-            )
+
+# Watch mode: the input directories are polled for changed files, and each changed
+# file is mapped through WATCH_SOURCE_COLUMNS (the panel columns its source
+# provides) and OUTPUT_DEPENDENCIES to the outputs to rebuild. The happiness reports
+# define the rows of the panel, so every output depends on them.
+WATCH_SOURCE_COLUMNS = {
+    HAPPINESS_DIR.name: None,
+    HDI_DIR.name: ["hdi", "development_category"],
+    POPULATION_DIR.name: [
+        "population",
+        "pop_male",
+        "pop_female",
+        "population_density",
+        "weighted_score",
+        "population_category",
+    ],
+}
+WATCH_POLL_SECONDS = 0.5
+WATCH_DEBOUNCE_SECONDS = 0.25
+
+
+def input_snapshot():
+    """Modification time and size of every input file, keyed by input_file_key"""
+    snapshot = {}
+    for path in all_input_files():
+        with contextlib.suppress(FileNotFoundError):
+            stat = path.stat()
+            snapshot[input_file_key(path)] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def affected_outputs(changed_files):
+    """
+    Find the outputs built from a column provided by the source of a changed file.
+
+    Args:
+        changed_files: input_file_key of every changed file
+
+    Returns:
+        set: Keys of OUTPUT_DEPENDENCIES
+    """
+    columns = set()
+    for key in changed_files:
+        source_columns = WATCH_SOURCE_COLUMNS[key.split("/")[0]]
+        if source_columns is None:
+            return set(OUTPUT_DEPENDENCIES)
+        columns.update(source_columns)
+    return {
+        output
+        for output, dependencies in OUTPUT_DEPENDENCIES.items()
+        if dependencies is None or columns & set(dependencies)
+    }
+
+
+def watch_inputs(validate=True, validation_report=None, **export_options):
+    """
+    Keep the exported data up to date with the input files until interrupted.
+
+    The input directories are polled every WATCH_POLL_SECONDS. Once a change is
+    seen, the files must stay unchanged for WATCH_DEBOUNCE_SECONDS (editors and
+    copies often write a file in several steps) before the changed files are folded
+    in by update_incremental, which then exports only their affected_outputs. The
+    pipeline stays loaded between rebuilds.
+
+    Args:
+        validate: Validate the merged data after each run
+        validation_report: Path of the validation report to rewrite after each run
+        export_options: Keyword arguments forwarded to export_data
+    """
+    merged = update_incremental(**export_options)
+    if validate:
+        validate_data(merged, validation_report)
+    snapshot = input_snapshot()
+    watched = ", ".join(path.name for path in (HAPPINESS_DIR, HDI_DIR, POPULATION_DIR))
+    print(f"Watching {watched} for changes (Ctrl+C to stop)")
+
+    while True:
+        time.sleep(WATCH_POLL_SECONDS)
+        current = input_snapshot()
+        if current == snapshot:
+            continue
+
+        # Wait for the files to settle
+        settled = None
+        while current != settled:
+            settled = current
+            time.sleep(WATCH_DEBOUNCE_SECONDS)
+            current = input_snapshot()
+
+        changed = sorted(
+            key
+            for key in current.keys() | snapshot.keys()
+            if current.get(key) != snapshot.get(key)
         )
+        snapshot = current
 
-    if len(countries_missing_hdi) > 0:
+        start = time.perf_counter()
+        outputs = affected_outputs(changed)
+        merged = update_incremental(outputs=outputs, **export_options)
+        if validate:
+            validate_data(merged, validation_report)
         print(
-            f"\nCountries missing HDI data: {', '.join(countries_missing_hdi[:10])}"
-            + (
-                f" and {len(countries_missing_hdi)-10} more"
-                if len(countries_missing_hdi) > 10
-                else ""
-            )
+            f"Rebuilt {', '.join(sorted(outputs))} in "
+            f"{time.perf_counter() - start:.2f} s"
         )
 
-    # Check for data anomalies
-    if "score" in data.columns:
-        min_score = data["score"].min()
-        max_score = data["score"].max()
-        print(f"\nHappiness score range: {min_score:.2f} to {max_score:.2f}")
 
-        # Check for potential outliers
-        low_outliers = data[data["score"] < 2.5]["country"].unique()
-        high_outliers = data[data["score"] > 8.5]["country"].unique()
+# Validation rules. Value ranges are declared per field in FIELD_RANGES of
+# data_dictionary.py: values outside the valid range are errors, values outside the
+# expected range are warnings. Completeness minimums are shares of the rows of each
+# year, and year-over-year limits bound the change between consecutive years of a
+# country, either absolute or relative to the earlier value.
+VALIDATION_KEYS = ["country", "year"]
+COMPLETENESS_MINIMUMS = {"score": 1.0, "hdi": 0.9, "population": 0.9}
+YEAR_OVER_YEAR_LIMITS = {
+    "score": {"absolute": 1.5},
+    "hdi": {"absolute": 0.05},
+    "population": {"relative": 0.1},
+}
+VALIDATION_EXAMPLES = 10
+VALIDATION_REPORT_PATH = BASE_DIR / "validation_report.json"
 
-        if len(low_outliers) > 0:
-            print(
-                f"Countries with unusually low happiness scores (<2.5): {', '.join(low_outliers)}"
+
+def rule_result(rule, field, severity, limit, rows, examples):
+    """One entry of the validation report, keeping the first VALIDATION_EXAMPLES"""
+    return {
+        "rule": rule,
+        "field": field,
+        "severity": severity,
+        "limit": limit,
+        "violations": int(rows),
+        "examples": examples[:VALIDATION_EXAMPLES],
+    }
+
+
+def evaluate_validation_rules(data):
+    """
+    Evaluate every declared validation rule on a merged panel.
+
+    The rules are evaluated in one pass over the columns they cover, each column
+    read once for its range, completeness and year-over-year rules. All of them are
+    array operations: comparisons for the ranges, a per-year bincount of the
+    non-missing mask for completeness, and neighbour differences on the rows in
+    country and year order for key uniqueness and year-over-year changes. The
+    merged panel is already in that order, so it is only sorted for other inputs.
+
+    Args:
+        data: Merged dataset
+
+    Returns:
+        dict: JSON-serializable report with the row, country and year counts, the
+            completeness of each year and one result per rule
+    """
+    country_ids, country_names = pd.factorize(data["country"])
+    country_names = np.asarray(country_names, dtype=object)
+    years = data["year"].to_numpy().astype(np.int64)
+    first_year = int(years.min()) if len(years) else 0
+    year_index = years - first_year
+    span = int(year_index.max()) + 1 if len(years) else 0
+    rows_per_year = np.bincount(year_index, minlength=span)
+
+    # Row order by country, then year
+    sort_key = country_ids.astype(np.int64) * max(span, 1) + year_index
+    order = None
+    if not np.all(sort_key[1:] >= sort_key[:-1]):
+        order = np.argsort(sort_key)
+
+    def in_order(values):
+        return values if order is None else values[order]
+
+    def row_number(position):
+        return position if order is None else order[position]
+
+    sorted_ids = in_order(country_ids)
+    sorted_years = in_order(years)
+    same_country = sorted_ids[1:] == sorted_ids[:-1]
+    year_steps = sorted_years[1:] - sorted_years[:-1]
+
+    def example(row, **values):
+        return {
+            "country": str(country_names[country_ids[row]]),
+            "year": int(years[row]),
+        } | {name: round(float(value), 3) for name, value in values.items()}
+
+    results = {
+        "range": [],
+        "completeness": [],
+        "unique_key": [],
+        "year_over_year": [],
+    }
+
+    duplicates = np.flatnonzero(same_country & (year_steps == 0)) + 1
+    results["unique_key"].append(
+        rule_result(
+            "unique_key",
+            ", ".join(VALIDATION_KEYS),
+            "error",
+            None,
+            len(duplicates),
+            [example(row_number(i)) for i in duplicates[:VALIDATION_EXAMPLES]],
+        )
+    )
+    consecutive = same_country & (year_steps == 1)
+
+    fields = dict.fromkeys(
+        list(FIELD_RANGES) + list(COMPLETENESS_MINIMUMS) + list(YEAR_OVER_YEAR_LIMITS)
+    )
+    shares = {}
+    for field in fields:
+        if field not in data.columns:
+            continue
+        values = data[field].to_numpy(dtype=np.float64)
+
+        ranges = FIELD_RANGES.get(field, {})
+        for kind, rule, severity in (
+            ("valid", "range", "error"),
+            ("expected", "expected_range", "warning"),
+        ):
+            if kind not in ranges:
+                continue
+            low, high = ranges[kind]
+            outside = np.zeros(len(values), dtype=bool)
+            if low is not None:
+                outside |= values < low
+            if high is not None:
+                outside |= values > high
+            rows = np.flatnonzero(outside)
+            results["range"].append(
+                rule_result(
+                    rule,
+                    field,
+                    severity,
+                    [low, high],
+                    len(rows),
+                    [
+                        example(row, value=values[row])
+                        for row in rows[:VALIDATION_EXAMPLES]
+                    ],
+                )
+            )
+
+        if field in COMPLETENESS_MINIMUMS:
+            missing = np.isnan(values)
+            present = rows_per_year - np.bincount(
+                year_index[missing], minlength=span
+            )
+            shares[field] = present / np.maximum(rows_per_year, 1)
+            minimum = COMPLETENESS_MINIMUMS[field]
+            below = np.flatnonzero((shares[field] < minimum) & (rows_per_year > 0))
+            result = rule_result(
+                "completeness",
+                field,
+                "warning",
+                minimum,
+                len(below),
+                [
+                    {
+                        "year": first_year + int(i),
+                        "share": round(float(shares[field][i]), 4),
+                    }
+                    for i in below
+                ],
+            )
+            missing_ids = pd.unique(country_ids[missing])
+            result["missing_countries"] = [
+                str(name) for name in country_names[missing_ids]
+            ]
+            results["completeness"].append(result)
+
+        if field in YEAR_OVER_YEAR_LIMITS:
+            limit = YEAR_OVER_YEAR_LIMITS[field]
+            sorted_values = in_order(values)
+            change = sorted_values[1:] - sorted_values[:-1]
+            if "relative" in limit:
+                change = change / np.abs(sorted_values[:-1])
+            bound = limit.get("relative", limit.get("absolute"))
+            jumps = np.flatnonzero(consecutive & (np.abs(change) > bound)) + 1
+            results["year_over_year"].append(
+                rule_result(
+                    "year_over_year",
+                    field,
+                    "warning",
+                    limit,
+                    len(jumps),
+                    [
+                        example(
+                            row_number(i),
+                            previous=sorted_values[i - 1],
+                            value=sorted_values[i],
+                        )
+                        for i in jumps[:VALIDATION_EXAMPLES]
+                    ],
+                )
             )
 
-        if len(high_outliers) > 0:
+    rules = [result for kind in results.values() for result in kind]
+    completeness = {
+        str(first_year + i): {"rows": int(rows_per_year[i])}
+        | {field: round(float(share[i]), 4) for field, share in shares.items()}
+        for i in np.flatnonzero(rows_per_year)
+    }
+    return {
+        "rows": len(data),
+        "countries": len(country_names),
+        "years": [first_year, first_year + span - 1] if len(years) else [],
+        "errors": sum(r["violations"] for r in rules if r["severity"] == "error"),
+        "warnings": sum(r["violations"] for r in rules if r["severity"] == "warning"),
+        "completeness": completeness,
+        "rules": rules,
+    }
+
+
+def describe_rule_result(result):
+    """One-line console summary of a failed rule"""
+    field, limit = result["field"], result["limit"]
+    if result["rule"] in ("range", "expected_range"):
+        low, high = ("" if bound is None else bound for bound in limit)
+        kind = "valid" if result["rule"] == "range" else "expected"
+        what = f"{field} outside the {kind} range [{low}, {high}]"
+    elif result["rule"] == "completeness":
+        what = f"years with under {limit:.0%} of rows having {field}"
+    elif result["rule"] == "unique_key":
+        what = f"duplicate ({field}) rows"
+    else:
+        bound = (
+            f"{limit['relative']:.0%}" if "relative" in limit else limit["absolute"]
+        )
+        what = f"year-over-year changes of {field} above {bound}"
+
+    examples = ", ".join(
+        " ".join(
+            str(example[key]) for key in ("country", "year", "value") if key in example
+        )
+        if "country" in example
+        else f"{example['year']} ({example['share']:.1%})"
+        for example in result["examples"]
+    )
+    more = result["violations"] - len(result["examples"])
+    return (
+        f"{result['severity'].upper()}: {result['violations']} {what}: {examples}"
+        + (f" and {more} more" if more > 0 else "")
+    )
+
+
+@profiled_stage
+def validate_data(data=None, report_path=None):
+    """
+    Evaluate the validation rules on the merged dataset and print a summary
+
+    Args:
+        data: Merged dataset to validate (default: the output of merge_datasets)
+        report_path: Also write the report as JSON to this path
+
+    Returns:
+        dict: The validation report (see evaluate_validation_rules)
+    """
+    print("Validating transformed data...")
+
+    # Get merged data
+    if data is None:
+        data = merge_datasets()
+    profile_note(rows_in=len(data))
+
+    report = evaluate_validation_rules(data)
+
+    print(f"Total unique countries: {report['countries']}")
+    print(f"Years covered: {report['years'][0]} to {report['years'][1]}")
+
+    print("\nData completeness by year:")
+    print(pd.DataFrame.from_dict(report["completeness"], orient="index"))
+
+    for result in report["rules"]:
+        missing = result.get("missing_countries", [])
+        if missing:
             print(
-                f"Countries with unusually high happiness scores (>8.5): {', '.join(high_outliers)}"
+                f"\nCountries missing {result['field']} data: {', '.join(missing[:10])}"
+                + (f" and {len(missing)-10} more" if len(missing) > 10 else "")
             )
 
-    # Return the data for further processing
-    return data
+    failed = [result for result in report["rules"] if result["violations"]]
+    if failed:
+        print()
+    for result in failed:
+        print(describe_rule_result(result))
+    print(f"\nValidation: {report['errors']} errors, {report['warnings']} warnings")
+
+    if report_path:
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Validation report written to {report_path}")
+
+    return report
+
+
+def run_pipeline(args, validate=True):
+    """
+    Run the pipeline as configured by the command-line options.
+
+    Args:
+        args: Options parsed with happiscope.add_export_arguments (and
+            add_validation_arguments when validating)
+        validate: Validate the merged data after exporting it
+
+    Returns:
+        dict or None: The validation report, if the data was validated once
+    """
+    global CACHE_ENABLED, DEFER_BROTLI
+
+    if args.no_cache:
+        CACHE_ENABLED = False
+    if args.watch:
+        DEFER_BROTLI = True
+    if args.profile:
+        start_profiling()
+
+    export_options = {
+        "columnar": args.columnar,
+        "sharded": args.sharded,
+        "time_series_offsets": args.time_series_offsets,
+    }
+    validation_report = getattr(args, "validation_report", None)
+
+    report = None
+    if args.watch:
+        with contextlib.suppress(KeyboardInterrupt):
+            watch_inputs(validate, validation_report, **export_options)
+    else:
+        if args.incremental:
+            merged = update_incremental(**export_options)
+        else:
+            merged = merge_datasets()
+            export_data(merged, **export_options)
+
+        # Run data validation to check for issues
+        if validate:
+            report = validate_data(merged, validation_report)
+
+    if args.profile:
+        write_profile_report(args.profile)
+    return report
 
 
 if __name__ == "__main__":
-    export_data()
-    # Run data validation to check for issues
-    validate_data()
+    from happiscope import add_export_arguments, add_validation_arguments
+
+    parser = argparse.ArgumentParser(
+        description="Transform HappiScope source data into JSON for the web application"
+    )
+    add_export_arguments(parser)
+    add_validation_arguments(parser)
+    run_pipeline(parser.parse_args())
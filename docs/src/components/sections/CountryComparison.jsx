@@ -5,6 +5,8 @@ import {
   RadarChart, PolarGrid, PolarAngleAxis, PolarRadiusAxis, Radar
 } from 'recharts'
 import happinessData from '../../data/happiness_data.json'
+import { rankOf } from '../../utils/rankings'
+import { similarCountries } from '../../utils/similarity'
 
 const CountryComparison = () => {
   const [selectedCountries, setSelectedCountries] = useState(['Finland', 'United States of America', 'Switzerland', 'China'])
@@ -102,16 +104,14 @@ const CountryComparison = () => {
     
     const latestYear = Math.max(...happinessData.map(d => d.year))
     
-    // Get all countries for the latest year to calculate ranks and find max values
+    // Get all countries for the latest year to find max values
     const allCountriesForYear = happinessData.filter(d => d.year === latestYear)
     
-    // Sort by happiness score to determine ranks
-    const rankedData = [...allCountriesForYear]
-      .sort((a, b) => (b.score || 0) - (a.score || 0))
-      .map((countryData, index) => ({
-        ...countryData,
-        calculatedRank: index + 1
-      }))
+    // Attach the precomputed happiness score ranks
+    const rankedData = allCountriesForYear.map(countryData => ({
+      ...countryData,
+      calculatedRank: rankOf(countryData)
+    }))
     
     // Find maximum values for each metric to normalize the display
     const maxValues = {
@@ -169,6 +169,17 @@ const CountryComparison = () => {
     }
   }
   
+  // Countries whose latest factor profile is closest to the first selected country's
+  const similarSuggestions = useMemo(() => {
+    if (selectedCountries.length === 0) return []
+    const latestRow = happinessData
+      .filter(d => d.country === selectedCountries[0])
+      .reduce((latest, d) => (!latest || d.year > latest.year ? d : latest), null)
+    return latestRow
+      ? similarCountries(latestRow).filter(d => !selectedCountries.includes(d.country))
+      : []
+  }, [selectedCountries])
+  
   const filteredCountries = availableCountries
     .filter(country => !selectedCountries.includes(country))
     .filter(country => country.toLowerCase().includes(searchTerm.toLowerCase()))
@@ -258,6 +269,23 @@ const CountryComparison = () => {
               )}
             </div>
             
+            {/* Countries most like the first selected one */}
+            {similarSuggestions.length > 0 && selectedCountries.length < 5 && (
+              <div className="flex flex-wrap gap-2 justify-center items-center mb-4 text-sm">
+                <span className="text-gray-500">Most similar to {selectedCountries[0]}:</span>
+                {similarSuggestions.map(d => (
+                  <button
+                    key={d.country}
+                    onClick={() => handleCountryToggle(d.country)}
+                    className="px-2.5 py-1 rounded-full border border-gray-200 bg-white/80 hover:bg-gray-100 transition duration-200"
+                    title={`Factor profile distance ${d.distance.toFixed(2)} in ${d.year}`}
+                  >
+                    + {d.country}
+                  </button>
+                ))}
+              </div>
+            )}
+            
             {/* Smart Dropdown Country Selector */}
             <div className="relative z-10">
               <div className="flex items-center border border-gray-200 rounded-lg bg-white/80 pr-2">
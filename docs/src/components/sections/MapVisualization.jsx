@@ -3,6 +3,7 @@ import { motion } from 'framer-motion'
 import WorldMap from '../visualizations/WorldMap'
 import CountryDetails from '../visualizations/CountryDetails'
 import happinessData from '../../data/happiness_data.json'
+import { rankOf, leaders } from '../../utils/rankings'
 
 const MapVisualization = () => {
   const [selectedYear, setSelectedYear] = useState(2020)
@@ -43,13 +44,11 @@ const MapVisualization = () => {
         } else {
           console.log(`Found ${yearData.length} countries with data for ${selectedYear}`);
           
-          // Calculate rankings for the selected year based on happiness score
-          const rankedData = [...yearData]
-            .sort((a, b) => (b.score || 0) - (a.score || 0))
-            .map((country, index) => ({
-              ...country,
-              rank: index + 1
-            }));
+          // Attach the precomputed happiness score rankings for the selected year
+          const rankedData = yearData.map(country => ({
+            ...country,
+            rank: rankOf(country)
+          }));
           
           // Pre-select a default country (Finland - often in top happiness rankings)
           const defaultCountry = rankedData.find(d => d.country === "Finland") || 
@@ -80,20 +79,12 @@ const MapVisualization = () => {
       // Get countries for the selected year
       const yearData = happinessData.filter(d => d.year === selectedYear);
       
-      // Calculate rankings for the current year
-      const rankedData = [...yearData]
-        .sort((a, b) => (b.score || 0) - (a.score || 0))
-        .map((country, index) => ({
-          ...country,
-          rank: index + 1
-        }));
-      
-      // Find the same country in the new year's data with rank
-      const updatedCountry = rankedData.find(d => 
+      // Find the same country in the new year's data with its precomputed rank
+      const updatedCountry = yearData.find(d => 
         d.country_code === selectedCountry.country_code
       );
       
-      setSelectedCountry(updatedCountry || null);
+      setSelectedCountry(updatedCountry ? { ...updatedCountry, rank: rankOf(updatedCountry) } : null);
     }
   }, [selectedYear])
   
@@ -147,9 +138,7 @@ const MapVisualization = () => {
       const maxRegionScore = sortedRegions.length > 0 ? sortedRegions[0].score : 0;
       
       // Get top 10 countries
-      const top10Countries = [...currentYearData]
-        .sort((a, b) => (b.score || 0) - (a.score || 0))
-        .slice(0, 10);
+      const top10Countries = leaders(year).slice(0, 10);
       
       // Count countries by region in top 10
       const regionCounts = {};
@@ -443,18 +432,11 @@ const MapVisualization = () => {
   // Function to handle when a country is selected from the map
   const handleSelectCountry = (country) => {
     if (country) {
-      // Get all countries for the selected year with rankings
-      const yearData = happinessData.filter(d => d.year === selectedYear);
-      const rankedData = [...yearData]
-        .sort((a, b) => (b.score || 0) - (a.score || 0))
-        .map((countryData, index) => ({
-          ...countryData,
-          rank: index + 1
-        }));
-      
-      // Find the selected country with its rank
-      const rankedCountry = rankedData.find(d => d.country_code === country.country_code);
-      setSelectedCountry(rankedCountry || country);
+      // Find the selected country in the selected year, with its precomputed rank
+      const countryData = happinessData.find(d =>
+        d.year === selectedYear && d.country_code === country.country_code
+      );
+      setSelectedCountry(countryData ? { ...countryData, rank: rankOf(countryData) } : country);
     } else {
       setSelectedCountry(null);
     }
@@ -1,6 +1,7 @@
 import { motion } from 'framer-motion';
 import { useState, useEffect } from 'react';
 import happinessData from '../../data/happiness_data.json';
+import { isImputed, imputedFields } from '../../utils/imputed';
 
 const CountryDetails = ({ country, metric }) => {
   const [maxValues, setMaxValues] = useState({});
@@ -100,12 +101,12 @@ const CountryDetails = ({ country, metric }) => {
   ];
 
   const metadataItems = [
-    { name: 'Population', value: country.population ? `${(country.population * 1000).toLocaleString()}` : 'Unknown' },
+    { name: 'Population', value: country.population ? `${(country.population * 1000).toLocaleString()}` : 'Unknown', key: 'population' },
     { name: 'Population Category', value: country.population_category || 'Unknown' },
     { name: 'Development', value: country.development_category || 'Unknown' },
     { name: 'Region', value: country.region || 'Unknown' },
     { name: 'Continent', value: country.continent || 'Unknown' },
-    { name: 'Human Development Index (HDI)', value: formatMetric(country.hdi) },
+    { name: 'Human Development Index (HDI)', value: formatMetric(country.hdi), key: 'hdi' },
   ];
 
   return (
@@ -128,7 +129,9 @@ const CountryDetails = ({ country, metric }) => {
             </div>
           </div>
           <div className="flex flex-col items-end">
-            <div className="text-sm text-blue-100">Happiness Score</div>
+            <div className="text-sm text-blue-100">
+              Happiness Score{isImputed(country, 'score') && ' (estimated)'}
+            </div>
             <div className="text-2xl font-bold">{formatMetric(country.score)}</div>
           </div>
         </div>
@@ -161,6 +164,11 @@ const CountryDetails = ({ country, metric }) => {
                       <span className="ml-2 text-xs px-2 py-0.5 rounded-full bg-gray-100 text-gray-600">
                         {getRatingDescription(factor.key, factor.value)}
                       </span>
+                      {isImputed(country, factor.key) && (
+                        <span className="ml-1 text-xs text-gray-400" title="Not reported this year; filled in from other years">
+                          estimated
+                        </span>
+                      )}
                     </div>
                     <span className="text-sm font-semibold" style={getMetricStyle(factor.key, factor.value)}>
                       {formatMetric(factor.value)}
@@ -204,7 +212,10 @@ const CountryDetails = ({ country, metric }) => {
             <div className="grid grid-cols-2 gap-3">
               {metadataItems.map((item) => (
                 <div key={item.name} className="bg-gray-50 rounded-lg p-3">
-                  <div className="text-xs text-gray-500 mb-1">{item.name}</div>
+                  <div className="text-xs text-gray-500 mb-1">
+                    {item.name}
+                    {item.key && isImputed(country, item.key) && ' (estimated)'}
+                  </div>
                   <div className="font-medium text-gray-900">{item.value}</div>
                 </div>
               ))}
@@ -235,6 +246,9 @@ const CountryDetails = ({ country, metric }) => {
                 Data for {country.country} is from the World Happiness Report {country.year}. 
                 The happiness score ranges from 0 to 10 and is based on survey responses to the main life evaluation question 
                 asked in the Gallup World Poll.
+                {imputedFields(country).length > 0 && (
+                  ' Values marked as estimated were not reported for this year and are filled in from other years of the same country.'
+                )}
               </p>
               <div className="flex justify-between items-center mt-3 text-xs text-gray-400">
                 <span>Year: {country.year}</span>
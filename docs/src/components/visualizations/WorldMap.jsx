@@ -1,4 +1,4 @@
-import { useState, useEffect, memo } from 'react';
+import { useState, useEffect, useMemo, memo } from 'react';
 import { 
   ComposableMap, 
   Geographies, 
@@ -10,78 +10,77 @@ import {
 import { scaleLinear } from 'd3-scale';
 import { motion } from 'framer-motion';
 import { feature } from 'topojson-client';
-import happinessData from '../../data/happiness_data.json';
-import countriesData from '../../data/countries.json';
-import worldMapData from '../../data/world-map.json';
+import mapIndex from '../../data/maps/index.json';
+import mapValues from '../../data/maps/values.json';
 
-// Process TopoJSON data into GeoJSON for simpler usage
-const { countries, land } = {
-  countries: feature(worldMapData, worldMapData.objects.countries),
-  land: feature(worldMapData, worldMapData.objects.land)
-};
+// Map artifacts written by data/transform_data.py (export_choropleth_maps): the world
+// topology at several simplification levels, each geometry tagged with its country
+// code, and the per-year metric values keyed by country code, shared by all levels.
+// Only the level for the current zoom is loaded.
+const mapLevels = import.meta.glob('../../data/maps/world-*.json', { import: 'default' });
 
-// Create lookup tables for country codes and names
-const createLookupTables = () => {
-  const nameToCodeMap = new Map();
-  const codeToNameMap = new Map();
-  const countryAliases = {
-    'United States': 'United States of America',
-    'Russia': 'Russian Federation',
-    'South Korea': 'Korea, Republic of',
-    'North Korea': 'Korea, Democratic People\'s Republic of',
-    'Congo': 'Republic of Congo',
-    'DRC': 'Democratic Republic of the Congo',
-    'Tanzania': 'Tanzania, United Republic of',
-    'UAE': 'United Arab Emirates',
-    'UK': 'United Kingdom',
-    'USA': 'United States of America',
-    // Add more aliases as needed
-  };
-
-  // First, populate with country data from countries.json
-  countriesData.forEach(country => {
-    if (country.country && country.country_code) {
-      nameToCodeMap.set(country.country.toLowerCase(), country.country_code);
-      codeToNameMap.set(country.country_code, country.country);
-    }
-  });
-
-  // Add aliases
-  Object.entries(countryAliases).forEach(([alias, official]) => {
-    const code = nameToCodeMap.get(official.toLowerCase());
-    if (code) {
-      nameToCodeMap.set(alias.toLowerCase(), code);
-    }
-  });
-
-  return { nameToCodeMap, codeToNameMap };
-};
-
-const { nameToCodeMap, codeToNameMap } = createLookupTables();
+// Most detailed level whose minimum zoom has been reached
+const levelForZoom = (zoom) =>
+  mapIndex.levels.reduce(
+    (chosen, level) => (zoom >= level.min_zoom ? level : chosen),
+    mapIndex.levels[0]
+  );
 
 const WorldMap = memo(({ year = 2024, metric = 'score', setSelectedCountry }) => {
-  const [data, setData] = useState([]);
+  const [topology, setTopology] = useState(null);
   const [tooltipContent, setTooltipContent] = useState("");
   const [tooltipPosition, setTooltipPosition] = useState({ x: 0, y: 0 });
   const [showTooltip, setShowTooltip] = useState(false);
   // Initialize with a better default position and zoom level
   const [position, setPosition] = useState({ coordinates: [10, 20], zoom: 1.2 });
-  const [mapReady, setMapReady] = useState(false);
   const [error, setError] = useState(null);
 
-  // Filter data for the selected year
+  const level = levelForZoom(position.zoom);
+  const mapReady = topology !== null;
+
+  // Load the map level for the current zoom; the previous level stays shown meanwhile
   useEffect(() => {
-    try {
-      console.log("Filtering data for year:", year);
-      const filteredData = happinessData.filter(d => d.year === year);
-      console.log(`Found ${filteredData.length} data points for year ${year}`);
-      setData(filteredData);
-      setMapReady(true);
-    } catch (err) {
-      console.error("Error filtering data:", err);
-      setError(err.message);
-    }
-  }, [year]);
+    let cancelled = false;
+    mapLevels[`../../data/maps/${level.file}`]()
+      .then((loaded) => {
+        if (!cancelled) {
+          setTopology(loaded);
+        }
+      })
+      .catch((err) => {
+        console.error("Error loading map:", err);
+        setError(err.message);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [level.file]);
+
+  // Process TopoJSON data into GeoJSON for simpler usage
+  const { countries, land } = useMemo(() => (
+    topology
+      ? {
+          countries: feature(topology, topology.objects.countries),
+          land: feature(topology, topology.objects.land)
+        }
+      : { countries: null, land: null }
+  ), [topology]);
+
+  // Values of the selected metric for the selected year, keyed by country code
+  const data = useMemo(() => {
+    const values = new Map();
+    const { years, fields, countries: entries } = mapValues;
+    const yearIndex = years.indexOf(year);
+    const fieldIndex = fields.indexOf(metric);
+    if (yearIndex < 0 || fieldIndex < 0) return values;
+    Object.entries(entries).forEach(([code, entry]) => {
+      const value = entry.values[fieldIndex][yearIndex];
+      if (value !== null) {
+        values.set(code, { country: entry.name, country_code: code, year, [metric]: value });
+      }
+    });
+    return values;
+  }, [year, metric]);
 
   // Setup color scale with more distinct colors
   const getColorScale = () => {
@@ -90,7 +89,7 @@ const WorldMap = memo(({ year = 2024, metric = 'score', setSelectedCountry }) =>
     let max = 10;
     
     if (metric !== 'score') {
-      const metricValues = data.filter(d => d[metric] !== undefined).map(d => d[metric] || 0);
+      const metricValues = [...data.values()].map(d => d[metric]);
       if (metricValues.length > 0) {
         min = Math.min(...metricValues);
         max = Math.max(...metricValues);
@@ -126,37 +125,8 @@ const WorldMap = memo(({ year = 2024, metric = 'score', setSelectedCountry }) =>
     setPosition({ coordinates: [10, 20], zoom: 1.2 }); // Reset to initial values
   };
 
-  // Find country data using multiple matching strategies
-  const findCountryData = (geo) => {
-    if (!geo.properties) return null;
-    
-    // Try to match by the country name
-    const countryName = geo.properties.name;
-    if (!countryName) return null;
-    
-    // Look for direct country match
-    let countryData = data.find(d => 
-      d.country && d.country.toLowerCase() === countryName.toLowerCase()
-    );
-    
-    // If not found, try through our country code mappings
-    if (!countryData) {
-      const countryCode = nameToCodeMap.get(countryName.toLowerCase());
-      if (countryCode) {
-        countryData = data.find(d => d.country_code === countryCode);
-      }
-    }
-    
-    // Last resort: fuzzy name matching
-    if (!countryData) {
-      countryData = data.find(d => 
-        d.country && (countryName.toLowerCase().includes(d.country.toLowerCase()) || 
-        d.country.toLowerCase().includes(countryName.toLowerCase()))
-      );
-    }
-    
-    return countryData;
-  };
+  // Country data is joined by the ISO code the pipeline attached to each shape
+  const findCountryData = (geo) => data.get(geo.properties?.code) || null;
 
   // Handle country interactions
   const handleCountryClick = (geo, countryData) => {
@@ -274,7 +244,7 @@ const WorldMap = memo(({ year = 2024, metric = 'score', setSelectedCountry }) =>
       return [0, 2, 4, 6, 8, 10];
     }
     
-    const metricValues = data.filter(d => d[metric] !== undefined).map(d => d[metric] || 0);
+    const metricValues = [...data.values()].map(d => d[metric]);
     if (metricValues.length === 0) return [0, 2, 4, 6, 8, 10];
     
     let min = Math.min(...metricValues);
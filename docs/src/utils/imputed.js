@@ -0,0 +1,16 @@
+// Reader for the `imputed` bitmask of happiness_data.json rows, written by
+// data/transform_data.py (fill_gaps). Bit i is set when the row's value of the i-th
+// entry of `imputed_fields` in data_dictionary.json was filled in from other years
+// of the same country rather than reported.
+
+import { imputed_fields as IMPUTED_FIELDS } from '../data/data_dictionary.json';
+
+// Whether a row's value of `field` was imputed
+export const isImputed = (row, field) => {
+  const bit = IMPUTED_FIELDS.indexOf(field);
+  return bit >= 0 && ((row.imputed ?? 0) & (1 << bit)) !== 0;
+};
+
+// Names of all imputed fields of a row
+export const imputedFields = (row) =>
+  IMPUTED_FIELDS.filter((field, bit) => ((row.imputed ?? 0) & (1 << bit)) !== 0);
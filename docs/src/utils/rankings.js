@@ -0,0 +1,30 @@
+// Readers for rankings.json and leaderboards.json, written by data/transform_data.py
+// (build_rankings, build_leaderboards). rankings.json holds, for the score and each
+// factor, rank and percentile columns aligned with the rows of happiness_data.json:
+// `${field}_rank` among all countries of the year and `${field}_continent_rank`
+// within the continent, 0 where the value is missing. leaderboards.json lists, per
+// year, scope ('World' or a continent) and field, the positions of the best ranked
+// rows of happiness_data.json.
+
+import happinessData from '../data/happiness_data.json';
+import rankings from '../data/rankings.json';
+import leaderboards from '../data/leaderboards.json';
+
+const rowPositions = new Map(happinessData.map((row, position) => [row, position]));
+
+const rankingValue = (column, row) => {
+  const value = rankings[column]?.[rowPositions.get(row)];
+  return value ? value : null;
+};
+
+// Rank of a happiness_data.json row (1 = highest), or null if it is not ranked
+export const rankOf = (row, field = 'score', withinContinent = false) =>
+  rankingValue(`${field}${withinContinent ? '_continent' : ''}_rank`, row);
+
+// Percentile (1-100) of a happiness_data.json row, or null if it is not ranked
+export const percentileOf = (row, field = 'score', withinContinent = false) =>
+  rankingValue(`${field}${withinContinent ? '_continent' : ''}_percentile`, row);
+
+// Best ranked rows of a year, globally or within a continent, best first
+export const leaders = (year, field = 'score', continent = 'World') =>
+  (leaderboards[year]?.[continent]?.[field] ?? []).map(position => happinessData[position]);
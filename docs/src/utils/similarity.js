@@ -0,0 +1,19 @@
+// Reader for similar_countries.json, written by data/transform_data.py
+// (build_similar_countries). For every row of happiness_data.json with a complete
+// factor profile it lists the rows of the same year with the nearest standardized
+// profiles, nearest first, as positions in happiness_data.json, with their distances.
+
+import happinessData from '../data/happiness_data.json';
+import similarity from '../data/similar_countries.json';
+
+const rowPositions = new Map(happinessData.map((row, position) => [row, position]));
+
+// Countries of the same year most similar to a happiness_data.json row, nearest first
+export const similarCountries = (row) => {
+  const position = rowPositions.get(row);
+  const neighbours = similarity.neighbours[position] ?? [];
+  return neighbours.map((neighbour, i) => ({
+    ...happinessData[neighbour],
+    distance: similarity.distances[position][i]
+  }));
+};